@@ -2,8 +2,15 @@
 simpleAgents package
 """
 
-# Import important modules for easier access
-from agents.rag_agent import internal_document_agent
-from agents.calendar_agent import calendar_agent
-from teams.discussion_team import stock_research_team
-from workflows.employee_recruiter_workflow import employee_recruiter_workflow
+# Agents, teams and workflows are built on first access through the registry,
+# so importing the package stays cheap.
+from registry import registry
+
+__all__ = registry.names()
+
+
+def __getattr__(name):
+    try:
+        return registry.get(name)
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
@@ -0,0 +1,267 @@
+"""
+Semantic answer cache for the internal document agent.
+
+Users ask the same questions in slightly different wording (「入札書の提出場所はどこですか」,
+「入札書はどこに提出すればいいですか」, ...). `AnswerCache` embeds each question and returns
+the stored answer of a previous question whose cosine similarity is above
+`threshold`, skipping both retrieval and generation. Entries expire after
+`ttl_seconds`, the least recently used ones are evicted beyond `max_entries`, and
+every entry remembers the documents its references came from so that
+`KnowledgeSync(answer_cache=...)` drops the answers built on re-ingested documents.
+
+`CachedAnswerAgent` checks the cache in `run` / `arun` (streamed or not) and stores
+answers that were grounded on references.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+from uuid import uuid4
+
+import numpy as np
+from agno.run.response import RunEvent, RunResponse
+from agno.utils.log import log_debug
+
+from agents.context_compression import CompactReferencesAgent
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        embedder,
+        path: str = "tmp/answer_cache.db",
+        threshold: float = 0.9,
+        ttl_seconds: float = 24 * 3600,
+        max_entries: int = 1000,
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                sources TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self.connection.commit()
+        self._lock = threading.RLock()
+        # Normalized question embeddings of every entry, loaded on first use and reloaded
+        # when another connection (agents.knowledge_sync, another worker) changed the table
+        self._ids: Optional[np.ndarray] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._data_version: Optional[int] = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def __copy__(self):
+        # Shared by the copies of an agent (Agent.deep_copy), like its knowledge base
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def _load(self):
+        # PRAGMA data_version changes when another connection commits to the database
+        data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        if self._ids is None or data_version != self._data_version:
+            self._data_version = data_version
+            rows = self.connection.execute("SELECT id, embedding FROM answers ORDER BY id").fetchall()
+            self._ids = np.array([id for id, _ in rows], dtype=np.int64)
+            vectors = [np.frombuffer(blob, dtype=np.float32) for _, blob in rows]
+            self._matrix = np.stack(vectors) if vectors else None
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embedder.get_embedding(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-12)
+
+    def _delete(self, ids: Iterable[int]):
+        ids = [int(id) for id in ids]
+        if not ids:
+            return
+        self.connection.executemany("DELETE FROM answers WHERE id = ?", [(id,) for id in ids])
+        self.connection.commit()
+        self._ids = None
+
+    def _forget(self, id: int):
+        """Drop an entry from the in-memory index."""
+        keep = self._ids != id
+        self._ids = self._ids[keep]
+        self._matrix = self._matrix[keep] if keep.any() else None
+
+    def lookup(self, question: str) -> Optional[str]:
+        """Stored answer of a fresh, similar enough question, if any."""
+        query = self._embed(question)
+        with self._lock:
+            self._load()
+            if self._matrix is None:
+                self.misses += 1
+                return None
+            similarities = self._matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            id = int(self._ids[best])
+            row = self.connection.execute("SELECT created, answer FROM answers WHERE id = ?", (id,)).fetchone()
+            if row is None:
+                # Deleted by another connection since the index was loaded
+                self._forget(id)
+                self.misses += 1
+                return None
+            created, answer = row
+            now = time.time()
+            if now - created > self.ttl_seconds:
+                self._delete([id])
+                self.misses += 1
+                return None
+            self.connection.execute("UPDATE answers SET last_used = ? WHERE id = ?", (now, id))
+            self.connection.commit()
+            self.hits += 1
+            log_debug(f"Answer cache hit ({similarities[best]:.3f})")
+            return answer
+
+    def put(self, question: str, answer: str, sources: Iterable[str]):
+        """Store an answer, with the names of the documents it was built from."""
+        vector = self._embed(question)
+        with self._lock:
+            now = time.time()
+            self.connection.execute(
+                "INSERT INTO answers (question, answer, embedding, sources, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (question, answer, vector.tobytes(), json.dumps(sorted(set(sources)), ensure_ascii=False), now, now),
+            )
+            expired = self.connection.execute(
+                "SELECT id FROM answers WHERE created < ?", (now - self.ttl_seconds,)
+            ).fetchall()
+            overflow = self.connection.execute(
+                "SELECT id FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?", (self.max_entries,)
+            ).fetchall()
+            self.connection.commit()
+            self._delete({id for id, in expired + overflow})
+            self._ids = None
+
+    def invalidate(self, names: Iterable[str]) -> int:
+        """Drop the answers built on any of the given documents, returns how many were dropped."""
+        names = set(names)
+        with self._lock:
+            rows = self.connection.execute("SELECT id, sources FROM answers").fetchall()
+            stale = [id for id, sources in rows if names & set(json.loads(sources))]
+            self._delete(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.connection.execute("DELETE FROM answers")
+            self.connection.commit()
+            self._ids = None
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0.0
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses, "hit_rate": hit_rate}
+
+
+def reference_sources(response: Optional[RunResponse]) -> List[str]:
+    """Names of the documents behind the references of a run, duplicates' sources included."""
+    if response is None or response.extra_data is None or not response.extra_data.references:
+        return []
+    names = set()
+    for references in response.extra_data.references:
+        for document in references.references or []:
+            names.add(document.get("name"))
+            names.update(source.get("name") for source in (document.get("meta_data") or {}).get("sources", []))
+    names.discard(None)
+    return sorted(names)
+
+
+@dataclass(init=False)
+class CachedAnswerAgent(CompactReferencesAgent):
+    """Agent answering from an `AnswerCache` when a similar question was already answered.
+
+    Cache hits skip retrieval and the model, and are not added to the session memory.
+    """
+
+    answer_cache: Optional[AnswerCache] = None
+
+    def __init__(self, *args, answer_cache: Optional[AnswerCache] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.answer_cache = answer_cache
+
+    def _cacheable(self, message: Any, kwargs: Dict[str, Any]) -> bool:
+        return self.answer_cache is not None and isinstance(message, str) and not kwargs.get("messages")
+
+    def _cached_response(self, answer: str, session_id: Optional[str]) -> RunResponse:
+        return RunResponse(
+            content=answer,
+            run_id=str(uuid4()),
+            agent_id=self.agent_id,
+            session_id=session_id or self.session_id,
+            model="answer-cache",
+            event=RunEvent.run_response,
+        )
+
+    def _store(self, question: str):
+        response = self.run_response
+        sources = reference_sources(response)
+        # Only answers grounded on the knowledge base can be invalidated when it changes
+        if response is not None and isinstance(response.content, str) and response.content and sources:
+            self.answer_cache.put(question, response.content, sources)
+
+    def _store_after(self, question: str, chunks: Iterator[RunResponse]) -> Iterator[RunResponse]:
+        yield from chunks
+        self._store(question)
+
+    async def _astore_after(self, question: str, chunks: AsyncIterator[RunResponse]) -> AsyncIterator[RunResponse]:
+        async for chunk in chunks:
+            yield chunk
+        await asyncio.to_thread(self._store, question)
+
+    def run(self, message=None, *, stream: Optional[bool] = None, **kwargs):
+        if not self._cacheable(message, kwargs):
+            return super().run(message, stream=stream, **kwargs)
+        stream = self.stream if stream is None else stream
+        answer = self.answer_cache.lookup(message)
+        if answer is not None:
+            response = self._cached_response(answer, kwargs.get("session_id"))
+            return iter([response]) if stream else response
+        result = super().run(message, stream=stream, **kwargs)
+        if stream:
+            return self._store_after(message, result)
+        self._store(message)
+        return result
+
+    async def arun(self, message=None, *, stream: Optional[bool] = None, **kwargs):
+        if not self._cacheable(message, kwargs):
+            return await super().arun(message, stream=stream, **kwargs)
+        stream = self.stream if stream is None else stream
+        answer = await asyncio.to_thread(self.answer_cache.lookup, message)
+        if answer is not None:
+            response = self._cached_response(answer, kwargs.get("session_id"))
+            if not stream:
+                return response
+
+            async def single() -> AsyncIterator[RunResponse]:
+                yield response
+
+            return single()
+        result = await super().arun(message, stream=stream, **kwargs)
+        if stream:
+            return self._astore_after(message, result)
+        await asyncio.to_thread(self._store, message)
+        return result
@@ -0,0 +1,399 @@
+"""
+In-process Japanese BM25 keyword index for the knowledge base chunks.
+
+Postgres full-text search does not segment Japanese, so the keyword half of the
+PgVector hybrid search rarely matches anything. `BM25Index` tokenizes chunks with
+fugashi (MeCab + unidic-lite), keeps compact array-backed postings (uint32 chunk
+slots and uint16 term frequencies per term) and scores queries with BM25 using
+numpy. It is updated incrementally by `KnowledgeSync` and persisted to a single
+.npz file, which other processes reload when it is replaced, so a running agent
+sees the chunks a `python -m agents.knowledge_sync` run added or removed.
+
+`HybridRetriever` is an agno Agent `retriever` that fuses the vector search and
+BM25 rankings with reciprocal rank fusion. Build the index from the existing
+vector db rows with:
+
+    python -m agents.bm25_index --rebuild
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from agno.document import Document
+from agno.knowledge import AgentKnowledge
+from agno.utils.log import logger
+
+# Parts of speech that carry no meaning for retrieval
+STOP_POS = {"助詞", "助動詞", "補助記号", "空白", "記号"}
+# Conjugating parts of speech, indexed by lemma so that 提出する / 提出した match
+LEMMA_POS = {"動詞", "形容詞"}
+
+_local = threading.local()
+
+
+def get_tagger():
+    """fugashi Tagger of the current thread (MeCab taggers are not thread-safe)."""
+    if not hasattr(_local, "tagger"):
+        try:
+            from fugashi import Tagger
+        except ImportError:
+            raise ImportError("fugashi is not installed. Please install it using `pip install fugashi unidic_lite`")
+        _local.tagger = Tagger()
+    return _local.tagger
+
+
+def tokenize(text: str) -> List[str]:
+    """Content words of a Japanese (or mixed) text, NFKC-normalized and lowercased."""
+    tokens = []
+    for word in get_tagger()(unicodedata.normalize("NFKC", text)):
+        pos = word.feature.pos1
+        if pos in STOP_POS:
+            continue
+        token = (word.feature.lemma or word.surface) if pos in LEMMA_POS else word.surface
+        tokens.append(token.lower())
+    return tokens
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], k: int = 60, weights: Optional[Sequence[float]] = None
+) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists, score(id) = sum(weight / (k + rank))."""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, id in enumerate(ranking, start=1):
+            scores[id] = scores.get(id, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    def __init__(self, path: Optional[str] = "tmp/bm25_index.npz", k1: float = 1.5, b: float = 0.75):
+        self.path = Path(path) if path else None
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._loaded = False
+        # Version of the file loaded or saved last, and whether the index changed since
+        self._version: Optional[Tuple[int, int, int]] = None
+        self._dirty = False
+        self._reset()
+
+    def _reset(self):
+        self.term_ids: Dict[str, int] = {}
+        self.postings_slots: List[array] = []
+        self.postings_tfs: List[array] = []
+        self.df = array("I")
+        # Per chunk slot; removed chunks are tombstoned until the next compaction
+        self.ids: List[str] = []
+        self.names: List[Optional[str]] = []
+        self.hashes: List[Optional[str]] = []
+        self.contents: List[str] = []
+        self.meta_data: List[str] = []
+        self.lengths = array("I")
+        self.alive = bytearray()
+        self.slot_of: Dict[str, int] = {}
+        self.total_length = 0
+
+    def _file_version(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.path.stat()
+        except (AttributeError, FileNotFoundError):
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _stale(self) -> bool:
+        """Not loaded yet, or the file was replaced by another process and there are no unsaved changes."""
+        return not self._loaded or (not self._dirty and self._file_version() != self._version)
+
+    def _ensure_loaded(self):
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    if self._file_version() is not None:
+                        self.load()
+                    else:
+                        self._reset()
+                    self._loaded = True
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.slot_of)
+
+    def add(self, id: str, content: str, name: Optional[str] = None, content_hash: Optional[str] = None, meta_data=None):
+        """Index one chunk, replacing the chunk with the same id."""
+        self._ensure_loaded()
+        tokens = tokenize(content)
+        with self._lock:
+            if id in self.slot_of:
+                self._remove_slot(self.slot_of[id])
+            self._dirty = True
+            slot = len(self.ids)
+            self.ids.append(id)
+            self.names.append(name)
+            self.hashes.append(content_hash)
+            self.contents.append(content)
+            self.meta_data.append(json.dumps(meta_data or {}, ensure_ascii=False))
+            self.lengths.append(len(tokens))
+            self.alive.append(1)
+            self.slot_of[id] = slot
+            self.total_length += len(tokens)
+
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                term = self.term_ids.get(token)
+                if term is None:
+                    term = self.term_ids[token] = len(self.postings_slots)
+                    self.postings_slots.append(array("I"))
+                    self.postings_tfs.append(array("H"))
+                    self.df.append(0)
+                self.postings_slots[term].append(slot)
+                self.postings_tfs[term].append(min(count, 65535))
+                self.df[term] += 1
+
+    def add_documents(self, documents: Iterable[Document]):
+        from agents.knowledge_sync import chunk_hash
+
+        for document in documents:
+            content_hash = chunk_hash(document.content)
+            self.add(document.id or content_hash, document.content, document.name, content_hash, document.meta_data)
+
+    def _remove_slot(self, slot: int):
+        if not self.alive[slot]:
+            return
+        self._dirty = True
+        self.alive[slot] = 0
+        del self.slot_of[self.ids[slot]]
+        self.total_length -= self.lengths[slot]
+        for token in set(tokenize(self.contents[slot])):
+            self.df[self.term_ids[token]] -= 1
+
+    def remove(self, id: str):
+        self._ensure_loaded()
+        with self._lock:
+            if id in self.slot_of:
+                self._remove_slot(self.slot_of[id])
+            self._maybe_compact()
+
+    def remove_chunks(self, name: str, content_hashes: Optional[Iterable[str]] = None):
+        """Remove the chunks of one document, or only those with the given content hashes."""
+        self._ensure_loaded()
+        hashes = set(content_hashes) if content_hashes is not None else None
+        with self._lock:
+            for slot in list(self.slot_of.values()):
+                if self.names[slot] == name and (hashes is None or self.hashes[slot] in hashes):
+                    self._remove_slot(slot)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        dead = len(self.ids) - len(self.slot_of)
+        if dead > 1000 and dead > len(self.ids) // 4:
+            self.compact()
+
+    def compact(self):
+        """Drop tombstoned chunks from the postings and renumber the slots."""
+        with self._lock:
+            alive = np.frombuffer(bytes(self.alive), dtype=np.uint8).astype(bool)
+            new_slot = np.cumsum(alive, dtype=np.int64) - 1
+            keep = np.flatnonzero(alive)
+            for term in range(len(self.postings_slots)):
+                slots = np.frombuffer(self.postings_slots[term], dtype=np.uint32)
+                mask = alive[slots]
+                self.postings_slots[term] = array("I", new_slot[slots[mask]].astype(np.uint32).tobytes())
+                self.postings_tfs[term] = array("H", np.frombuffer(self.postings_tfs[term], dtype=np.uint16)[mask].tobytes())
+            self.ids = [self.ids[i] for i in keep]
+            self.names = [self.names[i] for i in keep]
+            self.hashes = [self.hashes[i] for i in keep]
+            self.contents = [self.contents[i] for i in keep]
+            self.meta_data = [self.meta_data[i] for i in keep]
+            self.lengths = array("I", np.frombuffer(self.lengths, dtype=np.uint32)[keep].tobytes())
+            self.alive = bytearray(b"\x01" * len(keep))
+            self.slot_of = {id: slot for slot, id in enumerate(self.ids)}
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Top-`limit` chunk ids and BM25 scores for a query."""
+        self._ensure_loaded()
+        tokens = set(tokenize(query))
+        with self._lock:
+            count = len(self.slot_of)
+            if count == 0:
+                return []
+            lengths = np.frombuffer(self.lengths, dtype=np.uint32)
+            norm = self.k1 * (1 - self.b + self.b * lengths / (self.total_length / count or 1))
+            scores = np.zeros(len(self.ids), dtype=np.float32)
+            for token in tokens:
+                term = self.term_ids.get(token)
+                if term is None or self.df[term] == 0:
+                    continue
+                df = self.df[term]
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                slots = np.frombuffer(self.postings_slots[term], dtype=np.uint32)
+                tfs = np.frombuffer(self.postings_tfs[term], dtype=np.uint16).astype(np.float32)
+                scores[slots] += idf * tfs * (self.k1 + 1) / (tfs + norm[slots])
+            scores[np.frombuffer(bytes(self.alive), dtype=np.uint8) == 0] = 0
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > limit:
+                candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+            candidates = candidates[np.argsort(-scores[candidates])]
+            return [(self.ids[slot], float(scores[slot])) for slot in candidates]
+
+    def document(self, id: str) -> Optional[Document]:
+        self._ensure_loaded()
+        slot = self.slot_of.get(id)
+        if slot is None:
+            return None
+        return Document(
+            id=id, name=self.names[slot], content=self.contents[slot], meta_data=json.loads(self.meta_data[slot])
+        )
+
+    def save(self):
+        """Compact and write the index to `path` (atomically)."""
+        self._ensure_loaded()
+        with self._lock:
+            self.compact()
+            terms = sorted(self.term_ids, key=self.term_ids.get)
+            offsets = np.cumsum([0] + [len(postings) for postings in self.postings_slots], dtype=np.int64)
+            documents = {"terms": terms, "ids": self.ids, "names": self.names, "hashes": self.hashes}
+            text = {"contents": self.contents, "meta_data": self.meta_data}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.savez(
+                    f,
+                    offsets=offsets,
+                    slots=np.frombuffer(b"".join(p.tobytes() for p in self.postings_slots), dtype=np.uint32),
+                    tfs=np.frombuffer(b"".join(p.tobytes() for p in self.postings_tfs), dtype=np.uint16),
+                    df=np.frombuffer(self.df, dtype=np.uint32),
+                    lengths=np.frombuffer(self.lengths, dtype=np.uint32),
+                    documents=np.frombuffer(json.dumps(documents, ensure_ascii=False).encode(), dtype=np.uint8),
+                    text=np.frombuffer(json.dumps(text, ensure_ascii=False).encode(), dtype=np.uint8),
+                )
+            os.replace(tmp, self.path)
+            self._version = self._file_version()
+            self._dirty = False
+
+    def load(self):
+        # Before reading: a file replaced meanwhile is loaded again on the next call
+        version = self._file_version()
+        with self._lock, np.load(self.path) as data:
+            self._version = version
+            self._dirty = False
+            self._reset()
+            documents = json.loads(data["documents"].tobytes().decode())
+            text = json.loads(data["text"].tobytes().decode())
+            offsets, slots, tfs = data["offsets"], data["slots"], data["tfs"]
+            self.term_ids = {term: i for i, term in enumerate(documents["terms"])}
+            self.postings_slots = [array("I", slots[offsets[i] : offsets[i + 1]].tobytes()) for i in range(len(offsets) - 1)]
+            self.postings_tfs = [array("H", tfs[offsets[i] : offsets[i + 1]].tobytes()) for i in range(len(offsets) - 1)]
+            self.df = array("I", data["df"].tobytes())
+            self.lengths = array("I", data["lengths"].tobytes())
+            self.ids, self.names, self.hashes = documents["ids"], documents["names"], documents["hashes"]
+            self.contents, self.meta_data = text["contents"], text["meta_data"]
+            self.alive = bytearray(b"\x01" * len(self.ids))
+            self.slot_of = {id: slot for slot, id in enumerate(self.ids)}
+            self.total_length = int(np.frombuffer(self.lengths, dtype=np.uint32).sum())
+            self._loaded = True
+
+    def rebuild(self, vector_db) -> int:
+        """Re-index every chunk stored in a PgVector or LocalVectorDb."""
+        with self._lock:
+            self._reset()
+            self._loaded = True
+            if hasattr(vector_db, "connection"):
+                rows = vector_db.connection.execute("SELECT id, name, content, content_hash, meta_data FROM documents")
+                rows = [(id, name, content, content_hash, json.loads(meta or "{}")) for id, name, content, content_hash, meta in rows]
+            else:
+                from sqlalchemy import select
+
+                table = vector_db.table
+                with vector_db.Session() as sess:
+                    rows = sess.execute(
+                        select(table.c.id, table.c.name, table.c.content, table.c.content_hash, table.c.meta_data)
+                    ).fetchall()
+            for id, name, content, content_hash, meta_data in rows:
+                self.add(id, content, name, content_hash, meta_data)
+            return len(self.slot_of)
+
+
+class HybridRetriever:
+    """Agent retriever fusing vector search and BM25 with reciprocal rank fusion."""
+
+    def __init__(
+        self,
+        knowledge_base: AgentKnowledge,
+        keyword_index: BM25Index,
+        candidates: int = 30,
+        rrf_k: int = 60,
+        deduplicator=None,
+        compressor=None,
+    ):
+        self.knowledge_base = knowledge_base
+        self.keyword_index = keyword_index
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        # agents.dedup.Deduplicator: adds every original location of a chunk as meta_data["sources"]
+        self.deduplicator = deduplicator
+        # agents.context_compression.ContextCompressor: fits the agent's references in a token budget
+        self.compressor = compressor
+
+    def _attribute(self, documents: List[Document]) -> List[Document]:
+        if self.deduplicator is not None:
+            for document in documents:
+                sources = self.deduplicator.sources(document.id)
+                if sources:
+                    document.meta_data = {**document.meta_data, "sources": sources}
+        return documents
+
+    def search(self, query: str, num_documents: Optional[int] = None) -> List[Document]:
+        limit = num_documents or self.knowledge_base.num_documents
+        if len(self.keyword_index) == 0:
+            # Index not built yet, keep the vector db's own search
+            return self._attribute(self.knowledge_base.search(query=query, num_documents=limit))
+
+        vector_documents = self.knowledge_base.vector_db.vector_search(query, limit=max(self.candidates, limit))
+        keyword_hits = self.keyword_index.search(query, limit=max(self.candidates, limit))
+        by_id = {document.id: document for document in vector_documents}
+        fused = reciprocal_rank_fusion(
+            [[document.id for document in vector_documents], [id for id, _ in keyword_hits]], k=self.rrf_k
+        )
+        documents = []
+        for id, score in fused[:limit]:
+            document = by_id.get(id) or self.keyword_index.document(id)
+            if document is not None:
+                document.reranking_score = score
+                documents.append(document)
+        return self._attribute(documents)
+
+    def __call__(self, agent=None, query: str = "", num_documents: Optional[int] = None, **kwargs) -> Optional[List[Dict[str, Any]]]:
+        documents = self.search(query, num_documents)
+        if self.compressor is not None:
+            documents = self.compressor.compress(query, documents)
+        return [document.to_dict() for document in documents] or None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the BM25 index of the knowledge base")
+    parser.add_argument("--rebuild", action="store_true", help="Re-index every chunk of the vector db")
+    parser.add_argument("--query", help="Print the top BM25 and fused results for a query")
+    args = parser.parse_args()
+
+    from agents.rag_agent import keyword_index, knowledge_base, retriever
+
+    if args.rebuild:
+        count = keyword_index.rebuild(knowledge_base.vector_db)
+        keyword_index.save()
+        logger.info(f"Indexed {count} chunks into {keyword_index.path}")
+    if args.query:
+        for id, score in keyword_index.search(args.query):
+            print(f"bm25  {score:7.3f}  {id}")
+        for document in retriever.search(args.query):
+            print(f"fused {document.reranking_score:7.4f}  {document.id}  {document.content[:60]!r}")
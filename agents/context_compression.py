@@ -0,0 +1,212 @@
+"""
+Post-retrieval context compression for the internal document agent.
+
+`ContextCompressor.compress(query, documents)`:
+1. re-scores the retrieved chunks against the query (cosine similarity of the
+   embeddings, mixed with the share of the query's content words found in the chunk)
+   and drops the chunks scoring far below the best one,
+2. merges chunks that are adjacent in the same page, removing their overlap,
+3. drops chunks that are mostly contained in a better one,
+4. keeps the best chunks within `token_budget` tokens of serialized references,
+   the last one trimmed at a sentence boundary.
+
+`HybridRetriever(compressor=...)` applies it to the agent's references, and
+`CompactReferencesAgent` serializes them without escaping Japanese characters
+(`json.dumps` escapes every kana / kanji to a 6-character \\uXXXX sequence).
+"""
+
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from agno.agent import Agent
+from agno.document import Document
+from agno.utils.log import log_debug
+
+from agents.bm25_index import tokenize
+from agents.dedup import shingles
+from agents.ja_chunking import split_sentences
+
+# Kana, kanji and full-width forms: about one token per character for GPT and Llama tokenizers
+_CJK = re.compile(r"[　-ヿ㐀-䶿一-鿿豈-﫿＀-￯]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count of a text, with tiktoken's o200k_base (gpt-4o-mini) when installed."""
+    try:
+        import tiktoken
+    except ImportError:
+        cjk = len(_CJK.findall(text))
+        return cjk + (len(text) - cjk + 3) // 4
+    return len(tiktoken.get_encoding("o200k_base").encode(text, disallowed_special=()))
+
+
+def serialize(documents: List[Dict[str, Any]]) -> str:
+    """References as compact JSON, as `CompactReferencesAgent` adds them to the prompt."""
+    return json.dumps(documents, ensure_ascii=False, separators=(",", ":"))
+
+
+def _overlap(left: str, right: str, max_overlap: int = 400) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    for size in range(min(len(left), len(right), max_overlap), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class ContextCompressor:
+    """Re-score, merge, deduplicate and trim retrieved chunks to a token budget.
+
+    Args:
+        token_budget: Maximum tokens of the serialized references.
+        embedder: Embedder used for the semantic score, chunks without an embedding
+            are embedded (the embedding cache makes this a lookup). Lexical score only when None.
+        semantic_weight: Weight of the cosine similarity against the lexical score.
+        min_relative_score: Chunks scoring below this fraction of the best chunk are dropped
+            (below `best - (1 - min_relative_score) * |best|` when cosine scores are negative),
+            the best chunk is always kept.
+        redundancy: Share of a chunk's character 5-grams found in a better chunk above which it is dropped.
+        min_tokens: Smallest trimmed chunk worth adding at the end of the budget.
+        count_tokens: Token counter, `estimate_tokens` by default.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 1500,
+        embedder=None,
+        semantic_weight: float = 0.7,
+        min_relative_score: float = 0.5,
+        redundancy: float = 0.8,
+        min_tokens: int = 40,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ):
+        self.token_budget = token_budget
+        self.embedder = embedder
+        self.semantic_weight = semantic_weight
+        self.min_relative_score = min_relative_score
+        self.redundancy = redundancy
+        self.min_tokens = min_tokens
+        self.count_tokens = count_tokens
+
+    def tokens(self, document: Document) -> int:
+        return self.count_tokens(serialize([document.to_dict()]))
+
+    def score(self, query: str, documents: List[Document]) -> List[float]:
+        terms = set(tokenize(query))
+        lexical = [len(terms & set(tokenize(d.content))) / len(terms) if terms else 0.0 for d in documents]
+        if self.embedder is None:
+            return lexical
+        missing = [d.content for d in documents if d.embedding is None]
+        computed = iter(self.embedder.get_embeddings(missing) if missing else [])
+        vectors = np.asarray([d.embedding if d.embedding is not None else next(computed) for d in documents], np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        query_vector = np.asarray(self.embedder.get_embedding(query), dtype=np.float32)
+        semantic = vectors @ (query_vector / (np.linalg.norm(query_vector) + 1e-12))
+        return [self.semantic_weight * s + (1 - self.semantic_weight) * l for s, l in zip(semantic.tolist(), lexical)]
+
+    @staticmethod
+    def merge_adjacent(documents: List[Document]) -> List[Document]:
+        """Merge chunks of the same page whose chunk numbers follow each other."""
+        by_page: Dict[Any, List[Document]] = {}
+        for document in documents:
+            key = (document.name, document.meta_data.get("page"))
+            by_page.setdefault(key, []).append(document)
+
+        merged = []
+        for group in by_page.values():
+            if any(d.meta_data.get("chunk") is None for d in group):
+                merged.extend(group)
+                continue
+            group.sort(key=lambda d: d.meta_data["chunk"])
+            current = group[0]
+            for document in group[1:]:
+                chunks = current.meta_data.get("chunks", [current.meta_data["chunk"]])
+                if document.meta_data["chunk"] != chunks[-1] + 1:
+                    merged.append(current)
+                    current = document
+                    continue
+                content = current.content + document.content[_overlap(current.content, document.content) :]
+                current = Document(
+                    id=current.id,
+                    name=current.name,
+                    content=content,
+                    meta_data={**current.meta_data, "chunks": chunks + [document.meta_data["chunk"]]},
+                    reranking_score=max(current.reranking_score or 0.0, document.reranking_score or 0.0),
+                )
+            merged.append(current)
+        return merged
+
+    def drop_redundant(self, documents: List[Document]) -> List[Document]:
+        """Drop chunks mostly contained in a better-scored one (`documents` sorted by score)."""
+        kept, kept_shingles = [], []
+        for document in documents:
+            grams = set(shingles(document.content).tolist())
+            if any(len(grams & other) >= self.redundancy * len(grams) for other in kept_shingles):
+                continue
+            kept.append(document)
+            kept_shingles.append(grams)
+        return kept
+
+    def trim(self, document: Document, budget: int) -> Optional[Document]:
+        """The leading sentences of a document that fit in `budget` tokens."""
+        sentences = split_sentences(document.content)
+        while sentences:
+            trimmed = Document(
+                id=document.id,
+                name=document.name,
+                content="".join(sentences),
+                meta_data={**document.meta_data, "trimmed": True},
+                reranking_score=document.reranking_score,
+            )
+            if self.tokens(trimmed) <= budget:
+                return trimmed
+            sentences.pop()
+        return None
+
+    def compress(self, query: str, documents: List[Document]) -> List[Document]:
+        if not documents:
+            return documents
+        tokens_before = sum(self.tokens(d) for d in documents)
+
+        scores = self.score(query, documents)
+        best = max(scores)
+        for document, score in zip(documents, scores):
+            document.reranking_score = score
+        # A margin below the best score, `min_relative_score * best` would drop every chunk when best < 0
+        cutoff = best - (1 - self.min_relative_score) * abs(best)
+        top = documents[scores.index(best)]
+        relevant = [d for d in documents if d is top or d.reranking_score >= cutoff]
+        candidates = sorted(self.merge_adjacent(relevant), key=lambda d: d.reranking_score or 0.0, reverse=True)
+        candidates = self.drop_redundant(candidates)
+
+        selected, used = [], 0
+        for document in candidates:
+            tokens = self.tokens(document)
+            if used + tokens <= self.token_budget:
+                selected.append(document)
+                used += tokens
+                continue
+            if self.token_budget - used >= self.min_tokens:
+                trimmed = self.trim(document, self.token_budget - used)
+                if trimmed is not None:
+                    selected.append(trimmed)
+                    used += self.tokens(trimmed)
+            break
+
+        log_debug(
+            f"Context compression: {len(documents)} chunks / {tokens_before} tokens -> "
+            f"{len(selected)} chunks / {used} tokens"
+        )
+        return selected
+
+
+class CompactReferencesAgent(Agent):
+    """Agent that adds its references as compact JSON, without escaping non-ASCII characters."""
+
+    def convert_documents_to_string(self, docs: List[Dict[str, Any]]) -> str:
+        if docs is None or len(docs) == 0:
+            return ""
+        if self.references_format == "yaml":
+            return super().convert_documents_to_string(docs)
+        return serialize(docs)
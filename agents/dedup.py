@@ -0,0 +1,307 @@
+"""
+Near-duplicate chunk elimination before embedding.
+
+The PDFs of the knowledge base are versions of the same tender document: most pages,
+headers and footers repeat from one file to the next. `Deduplicator` keeps one
+canonical chunk per group of near-identical chunks (MinHash signatures of character
+5-grams, banded LSH, estimated Jaccard similarity >= `threshold`) and records every
+original location (file, page, chunk) of the collapsed chunks as its `sources`, so
+only the canonical chunk is embedded and stored. Like the BM25 index, the saved
+index is reloaded when another process (`KnowledgeSync`) replaces the file.
+
+- `KnowledgeSync(deduplicator=...)` collapses the chunks of agents/data, the index is
+  persisted next to the manifest,
+- `dedup_chunks` filters the LangChain chunk stream of agents/prepare.py.
+
+`DedupStats` reports the embeddings and bytes that were not computed and stored.
+"""
+
+import json
+import os
+import threading
+import unicodedata
+import zlib
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Mersenne prime of the universal hash family a * x + b mod P
+_PRIME = np.uint64((1 << 61) - 1)
+
+
+@dataclass
+class DedupStats:
+    chunks: int = 0
+    duplicates: int = 0
+    exact_duplicates: int = 0
+    text_bytes_saved: int = 0
+    vector_bytes_saved: int = 0
+
+    @property
+    def embeddings_saved(self) -> int:
+        return self.duplicates
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.text_bytes_saved + self.vector_bytes_saved
+
+    def as_dict(self) -> Dict[str, int]:
+        return {**asdict(self), "embeddings_saved": self.embeddings_saved, "bytes_saved": self.bytes_saved}
+
+    def __str__(self) -> str:
+        return (
+            f"{self.duplicates}/{self.chunks} chunks collapsed ({self.exact_duplicates} exact), "
+            f"{self.embeddings_saved} embeddings and {self.bytes_saved / 2**20:.2f} MiB saved"
+        )
+
+
+def shingles(text: str, size: int = 5) -> np.ndarray:
+    """crc32 hashes of the character n-grams of a text, whitespace and width normalized."""
+    text = "".join(unicodedata.normalize("NFKC", text).split())
+    if len(text) <= size:
+        return np.array([zlib.crc32(text.encode())], dtype=np.uint64)
+    encoded = {zlib.crc32(text[i : i + size].encode()) for i in range(len(text) - size + 1)}
+    return np.fromiter(encoded, dtype=np.uint64, count=len(encoded))
+
+
+class Deduplicator:
+    """MinHash / LSH index of the stored chunks, with the locations each one stands for.
+
+    Args:
+        threshold: Estimated Jaccard similarity above which two chunks are duplicates.
+        num_perm: MinHash signature length.
+        bands: LSH bands, `num_perm // bands` rows each. 16 bands of 8 rows find
+            pairs above 0.85 similarity with more than 99% probability.
+        shingle_size: Character n-gram length.
+        path: .npz file the index is saved to, None for an in-memory index.
+        dimensions: Embedding dimensions, to report the vector bytes saved.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 5,
+        path: Optional[str] = "tmp/dedup_index.npz",
+        dimensions: int = 768,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.path = Path(path) if path else None
+        self.dimensions = dimensions
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 61, size=num_perm, dtype=np.uint64)
+        self._lock = threading.RLock()
+        self._loaded = False
+        # Version of the file loaded or saved last, and whether the index changed since
+        self._version: Optional[Tuple[int, int, int]] = None
+        self._dirty = False
+        self.stats = DedupStats()
+        self._reset()
+
+    def _reset(self):
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.content_hashes: Dict[str, str] = {}
+        self.locations: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_hash: Dict[str, str] = {}
+        self._buckets: List[Dict[bytes, set]] = [{} for _ in range(self.bands)]
+
+    def _file_version(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.path.stat()
+        except (AttributeError, FileNotFoundError):
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _stale(self) -> bool:
+        """Not loaded yet, or the file was replaced by another process and there are no unsaved changes."""
+        return not self._loaded or (not self._dirty and self._file_version() != self._version)
+
+    def _ensure_loaded(self):
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    if self._file_version() is not None:
+                        self.load()
+                    else:
+                        self._reset()
+                    self._loaded = True
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = shingles(text, self.shingle_size)
+        values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+        return (values.min(axis=1) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [band.tobytes() for band in signature.reshape(self.bands, -1)]
+
+    def find(self, text: str, content_hash: Optional[str] = None, signature: Optional[np.ndarray] = None) -> Optional[str]:
+        """Key of the stored chunk `text` is a (near-)duplicate of, if any."""
+        self._ensure_loaded()
+        with self._lock:
+            if content_hash is not None and content_hash in self._by_hash:
+                return self._by_hash[content_hash]
+            signature = self.signature(text) if signature is None else signature
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates |= self._buckets[band].get(key, set())
+            best, best_similarity = None, self.threshold
+            for candidate in candidates:
+                similarity = float(np.mean(self.signatures[candidate] == signature))
+                if similarity >= best_similarity:
+                    best, best_similarity = candidate, similarity
+            return best
+
+    def add(
+        self,
+        key: str,
+        text: str,
+        location: Optional[Dict[str, Any]] = None,
+        content_hash: Optional[str] = None,
+        signature: Optional[np.ndarray] = None,
+    ):
+        """Store a canonical chunk."""
+        self._ensure_loaded()
+        signature = self.signature(text) if signature is None else signature
+        with self._lock:
+            if key in self.signatures:
+                self.remove(key)
+            self._dirty = True
+            self.signatures[key] = signature
+            self.locations[key] = [location] if location else []
+            if content_hash is not None:
+                self.content_hashes[key] = content_hash
+                self._by_hash.setdefault(content_hash, key)
+            for band, band_key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(band_key, set()).add(key)
+
+    def add_location(self, key: str, location: Dict[str, Any]):
+        with self._lock:
+            if location not in self.locations[key]:
+                self._dirty = True
+                self.locations[key].append(location)
+
+    def remove_locations(self, name: str, keys: Optional[Iterable[str]] = None):
+        """Drop the locations in document `name` from the given stored chunks (default: all)."""
+        self._ensure_loaded()
+        with self._lock:
+            self._dirty = True
+            for key in list(self.locations) if keys is None else keys:
+                if key in self.locations:
+                    self.locations[key] = [location for location in self.locations[key] if location.get("name") != name]
+
+    def remove(self, key: str) -> List[Dict[str, Any]]:
+        """Forget a canonical chunk, returns the locations it stood for."""
+        self._ensure_loaded()
+        with self._lock:
+            signature = self.signatures.pop(key, None)
+            if signature is None:
+                return []
+            self._dirty = True
+            for band, band_key in enumerate(self._band_keys(signature)):
+                bucket = self._buckets[band].get(band_key)
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+            content_hash = self.content_hashes.pop(key, None)
+            if content_hash is not None and self._by_hash.get(content_hash) == key:
+                del self._by_hash[content_hash]
+            return self.locations.pop(key, [])
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+            self._loaded = True
+            self._dirty = True
+
+    def sources(self, key: str) -> List[Dict[str, Any]]:
+        """Every original location of a stored chunk, its own included."""
+        self._ensure_loaded()
+        return list(self.locations.get(key, []))
+
+    def record(self, text: str, exact: bool):
+        """Count one collapsed chunk in `stats`."""
+        self.stats.duplicates += 1
+        self.stats.exact_duplicates += int(exact)
+        self.stats.text_bytes_saved += len(text.encode())
+        self.stats.vector_bytes_saved += 4 * self.dimensions
+
+    def save(self):
+        if self.path is None:
+            return
+        self._ensure_loaded()
+        with self._lock:
+            keys = list(self.signatures)
+            index = {
+                "keys": keys,
+                "content_hashes": [self.content_hashes.get(key) for key in keys],
+                "locations": [self.locations[key] for key in keys],
+            }
+            signatures = np.stack([self.signatures[key] for key in keys]) if keys else np.zeros((0, self.num_perm), np.uint32)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.savez(
+                    f,
+                    signatures=signatures,
+                    index=np.frombuffer(json.dumps(index, ensure_ascii=False).encode(), dtype=np.uint8),
+                )
+            os.replace(tmp, self.path)
+            self._version = self._file_version()
+            self._dirty = False
+
+    def load(self):
+        # Before reading: a file replaced meanwhile is loaded again on the next call
+        version = self._file_version()
+        with self._lock, np.load(self.path) as data:
+            self._reset()
+            index = json.loads(data["index"].tobytes().decode())
+            self._loaded = True
+            self._version = version
+            for key, content_hash, locations, signature in zip(
+                index["keys"], index["content_hashes"], index["locations"], data["signatures"]
+            ):
+                self.add(key, "", content_hash=content_hash, signature=signature)
+                self.locations[key] = locations
+            self._dirty = False
+
+
+def dedup_chunks(
+    chunks: Iterable[Any],
+    deduplicator: Deduplicator,
+    key: Callable[[Any], str],
+    location: Callable[[Any], Dict[str, Any]],
+    text: Callable[[Any], str] = lambda chunk: chunk.page_content,
+) -> Iterator[Any]:
+    """Yield the first chunk of every group of near-duplicates, as a stream.
+
+    The locations of the dropped chunks are added to the `sources` of the chunk they
+    duplicate in the deduplicator, see `Deduplicator.sources`.
+    """
+    from agents.knowledge_sync import chunk_hash
+
+    for chunk in chunks:
+        content = text(chunk)
+        content_hash = chunk_hash(content)
+        deduplicator.stats.chunks += 1
+        signature = deduplicator.signature(content)
+        canonical = deduplicator.find(content, content_hash, signature)
+        if canonical is not None:
+            deduplicator.add_location(canonical, location(chunk))
+            deduplicator.record(content, exact=deduplicator.content_hashes.get(canonical) == content_hash)
+            continue
+        deduplicator.add(key(chunk), content, location(chunk), content_hash, signature)
+        yield chunk
@@ -0,0 +1,69 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.embedder.base import Embedder
+
+from agents.embedding_cache import EmbeddingCache
+
+# One model instance per model id and process, shared by every embedder.
+_models: Dict[str, Any] = {}
+_models_lock = threading.Lock()
+
+
+def load_sentence_transformer(model_id: str):
+    """Load (once per process) and return the SentenceTransformer for `model_id`."""
+    if model_id not in _models:
+        with _models_lock:
+            if model_id not in _models:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError:
+                    raise ImportError(
+                        "sentence-transformers is not installed. Please install it using `pip install sentence-transformers`"
+                    )
+                _models[model_id] = SentenceTransformer(model_name_or_path=model_id)
+    return _models[model_id]
+
+
+@dataclass
+class LazySentenceTransformerEmbedder(Embedder):
+    """SentenceTransformer embedder that imports torch and loads the model on first use."""
+
+    id: str = "cl-nagoya/sup-simcse-ja-base"
+    dimensions: int = 768
+    # Checked before the model for both ingestion and query embeddings
+    cache: Optional[EmbeddingCache] = field(default=None, repr=False)
+    # Route cache misses through the shared micro-batching engine (agents.embedding_service)
+    batching: bool = False
+    _model: Optional[Any] = field(default=None, init=False, repr=False)
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = load_sentence_transformer(self.id)
+        return self._model
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        if self.batching:
+            from agents.embedding_service import get_engine
+
+            return get_engine(self.id).embed(texts)
+        return self.model.encode(texts).tolist()
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts at once, computing only those missing from the cache."""
+        cached = self.cache.get_many(texts) if self.cache is not None else [None] * len(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            computed = dict(zip(missing, self.encode(missing)))
+            if self.cache is not None:
+                self.cache.put_many(list(computed), list(computed.values()))
+            cached = [vector if vector is not None else computed[text] for text, vector in zip(texts, cached)]
+        return cached
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embeddings([text])[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
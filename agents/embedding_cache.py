@@ -0,0 +1,176 @@
+"""
+Persistent, content-addressed embedding cache.
+
+Vectors are stored in a memory-mapped float32 (or float16) array on disk and
+located through a SQLite offset index keyed by sha256(model id + text), so an
+embedding computed once is never recomputed by ingestion or by query time.
+The cache holds at most `max_entries` vectors and evicts the least recently
+used ones when it is full.
+
+The directory can be shared by several processes (prepare.py workers, the agent,
+the embedding service): slots are allocated in one `BEGIN IMMEDIATE` transaction,
+and every slot records a fingerprint of the key whose vector it holds, written
+after the vector, so a reader never returns a vector that is being replaced.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        model_id: str,
+        dimensions: int,
+        path: str = "tmp/embedding_cache",
+        dtype: str = "float32",
+        max_entries: int = 200_000,
+    ):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported dtype '{dtype}', expected float32 or float16")
+        self.model_id = model_id
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+
+        # One directory per model so that models with different dimensions never share a file
+        directory = Path(path) / re.sub(r"[^A-Za-z0-9_.-]", "_", model_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        vectors_path = directory / f"vectors.{dtype}"
+        shape = (max_entries, dimensions)
+        mode = "r+" if vectors_path.exists() else "w+"
+        self.vectors = np.memmap(vectors_path, dtype=dtype, mode=mode, shape=shape)
+        # Fingerprint of the key stored in every slot, 0 while a vector is being written
+        owners_path = directory / "owners.u64"
+        self.owners = np.memmap(owners_path, dtype=np.uint64, mode="r+" if owners_path.exists() else "w+", shape=(max_entries,))
+
+        self.connection = sqlite3.connect(directory / "index.db", timeout=30, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, slot INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used)")
+        self.connection.commit()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\x00{text}".encode()).hexdigest()
+
+    @staticmethod
+    def fingerprint(key: str) -> np.uint64:
+        return np.uint64(int(key[:16], 16) or 1)
+
+    def _read(self, key: str, slot: int) -> Optional[List[float]]:
+        """Vector of a slot, None when the slot does not (or no longer) hold the key."""
+        fingerprint = self.fingerprint(key)
+        if self.owners[slot] != fingerprint:
+            return None
+        vector = self.vectors[slot].astype(np.float32)
+        # Checked again: another process may have started replacing it while it was copied
+        return vector.tolist() if self.owners[slot] == fingerprint else None
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Return the cached vector of every text, or None where it is not cached."""
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            slots = self._slots(keys)
+            if slots:
+                now = time.time()
+                self.connection.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in slots]
+                )
+                self.connection.commit()
+            results = [self._read(key, slots[key]) if key in slots else None for key in keys]
+            self.hits += sum(1 for result in results if result is not None)
+            self.misses += sum(1 for result in results if result is None)
+        return results
+
+    def get(self, text: str) -> Optional[List[float]]:
+        return self.get_many([text])[0]
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Store vectors, evicting the least recently used entries when the cache is full."""
+        entries = dict(zip((self.key(text) for text in texts), vectors))
+        with self._lock:
+            # Allocate the slots under SQLite's write lock, so that other processes sharing
+            # the cache never pick the same free or evicted slots
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._slots(list(entries))
+                new_keys = [key for key in entries if key not in existing]
+                free = self._free_slots(len(new_keys), keep=existing)
+                slots = {**existing, **dict(zip(new_keys, free))}
+                now = time.time()
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                    [(key, slot, now) for key, slot in slots.items()],
+                )
+                self.connection.commit()
+            except BaseException:
+                self.connection.rollback()
+                raise
+
+            # The slots are ours: invalidate, write the vectors, then claim them
+            for slot in slots.values():
+                self.owners[slot] = 0
+            for key, slot in slots.items():
+                self.vectors[slot] = np.asarray(entries[key], dtype=self.vectors.dtype)
+            self.vectors.flush()
+            for key, slot in slots.items():
+                self.owners[slot] = self.fingerprint(key)
+            self.owners.flush()
+
+    def put(self, text: str, vector: Sequence[float]):
+        self.put_many([text], [vector])
+
+    def _slots(self, keys: List[str]) -> Dict[str, int]:
+        slots: Dict[str, int] = {}
+        # Stay below SQLite's limit on bound parameters
+        for start in range(0, len(keys), 500):
+            batch = keys[start : start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", batch)
+            slots.update(dict(rows))
+        return slots
+
+    def _free_slots(self, count: int, keep: Dict[str, int]) -> List[int]:
+        if count == 0:
+            return []
+        if count > self.max_entries:
+            raise ValueError(f"Cannot cache {count} vectors at once, max_entries is {self.max_entries}")
+        used = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        unused = list(range(used, min(used + count, self.max_entries)))
+        if len(unused) == count:
+            return unused
+
+        # Evict the least recently used entries (except those being written) and reuse their slots
+        needed = count - len(unused)
+        candidates = self.connection.execute(
+            "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (needed + len(keep),)
+        ).fetchall()
+        evicted = [(key, slot) for key, slot in candidates if key not in keep][:needed]
+        self.connection.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in evicted])
+        self.evictions += len(evicted)
+        return unused + [slot for _, slot in evicted]
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+        }
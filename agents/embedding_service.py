@@ -0,0 +1,240 @@
+"""
+Shared embedding service with dynamic micro-batching.
+
+`BatchingEngine` holds one model instance and coalesces concurrent embed calls:
+the first waiting request opens a batch, which is closed after `max_wait_ms`
+or once `max_batch_size` texts are collected, and is then encoded in a single
+model call. Requests larger than `max_batch_size` are split, so no model call
+encodes more than `max_batch_size` texts. It can be shared in-process (see `get_engine`) or served over HTTP
+so that every worker uses one copy of the model:
+
+    python -m agents.embedding_service --port 8100
+
+`EmbeddingServiceEmbedder` is a drop-in agno embedder that calls the server.
+"""
+
+import argparse
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agno.embedder.base import Embedder
+
+from agents.embedder import load_sentence_transformer
+from agents.embedding_cache import EmbeddingCache
+
+
+class BatchingEngine:
+    def __init__(
+        self,
+        encode: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        # Request that did not fit in the previous batch, opens the next one
+        self._carry: Optional[Tuple[List[str], Future]] = None
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self.batch_sizes: Counter = Counter()
+        self.encode_seconds = 0.0
+        self.wait_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts for embedding; the future resolves to one vector per text."""
+        texts = list(texts)
+        future: Future = Future()
+        future.enqueued_at = time.perf_counter()
+        if len(texts) <= self.max_batch_size:
+            self._queue.put((texts, future))
+            return future
+
+        # One request per `max_batch_size` texts, gathered back in order
+        parts = [self.submit(texts[i : i + self.max_batch_size]) for i in range(0, len(texts), self.max_batch_size)]
+        lock = threading.Lock()
+
+        def gather(_: Future):
+            with lock:
+                if future.done() or not all(part.done() for part in parts):
+                    return
+                errors = [part.exception() for part in parts if part.exception() is not None]
+                if errors:
+                    future.set_exception(errors[0])
+                else:
+                    future.set_result([vector for part in parts for vector in part.result()])
+
+        for part in parts:
+            part.add_done_callback(gather)
+        return future
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.submit(texts).result()
+
+    def _collect(self) -> List[Tuple[List[str], Future]]:
+        """Block for the first request, then gather more until the batch is full or the window closes."""
+        batch = [self._carry or self._queue.get()]
+        self._carry = None
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while size < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if size + len(request[0]) > self.max_batch_size:
+                self._carry = request
+                break
+            batch.append(request)
+            size += len(request[0])
+        return batch
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            texts = [text for request_texts, _ in requests for text in request_texts]
+            start = time.perf_counter()
+            try:
+                vectors = self.encode(texts) if texts else []
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+            end = time.perf_counter()
+
+            with self._lock:
+                self.requests += len(requests)
+                self.batches += 1
+                self.texts += len(texts)
+                self.batch_sizes[len(texts)] += 1
+                self.encode_seconds += end - start
+                self.wait_seconds += sum(start - future.enqueued_at for _, future in requests)
+
+            position = 0
+            for request_texts, future in requests:
+                future.set_result(vectors[position : position + len(request_texts)])
+                position += len(request_texts)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "requests": self.requests,
+                "batches": self.batches,
+                "texts": self.texts,
+                "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "avg_queue_wait_ms": 1000 * self.wait_seconds / self.requests if self.requests else 0.0,
+                "avg_encode_ms": 1000 * self.encode_seconds / self.batches if self.batches else 0.0,
+            }
+
+
+# Shared in-process engines, one per model id
+_engines: Dict[str, BatchingEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(model_id: str, max_batch_size: int = 64, max_wait_ms: float = 5.0) -> BatchingEngine:
+    """Return the process-wide batching engine for a SentenceTransformer model."""
+    if model_id not in _engines:
+        with _engines_lock:
+            if model_id not in _engines:
+
+                def encode(texts: List[str]) -> List[List[float]]:
+                    model = load_sentence_transformer(model_id)
+                    return model.encode(texts, batch_size=max_batch_size).tolist()
+
+                _engines[model_id] = BatchingEngine(encode, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    return _engines[model_id]
+
+
+def create_app(engine: BatchingEngine, model_id: str):
+    from fastapi import FastAPI
+    from pydantic import BaseModel
+
+    class EmbedRequest(BaseModel):
+        texts: List[str]
+
+    app = FastAPI(title="Embedding Service")
+
+    @app.post("/embed")
+    async def embed(request: EmbedRequest):
+        vectors = await asyncio.wrap_future(engine.submit(request.texts))
+        return {"model": model_id, "embeddings": vectors}
+
+    @app.get("/metrics")
+    async def metrics():
+        return engine.metrics()
+
+    return app
+
+
+@dataclass
+class EmbeddingServiceEmbedder(Embedder):
+    """Drop-in replacement for SentenceTransformerEmbedder that calls the embedding service."""
+
+    url: str = "http://localhost:8100"
+    id: str = "cl-nagoya/sup-simcse-ja-base"
+    dimensions: int = 768
+    timeout: float = 30.0
+    cache: Optional[EmbeddingCache] = field(default=None, repr=False)
+    _client: Optional[Any] = field(default=None, init=False, repr=False)
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.Client(base_url=self.url, timeout=self.timeout)
+        return self._client
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        cached = self.cache.get_many(texts) if self.cache is not None else [None] * len(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            response = self.client.post("/embed", json={"texts": missing})
+            response.raise_for_status()
+            computed = dict(zip(missing, response.json()["embeddings"]))
+            if self.cache is not None:
+                self.cache.put_many(missing, [computed[text] for text in missing])
+            cached = [vector if vector is not None else computed[text] for text, vector in zip(texts, cached)]
+        return cached
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embeddings([text])[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve one shared embedding model with micro-batching")
+    parser.add_argument("--model", default="cl-nagoya/sup-simcse-ja-base")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    engine = get_engine(args.model, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    # Load the model before accepting requests
+    engine.embed(["warm up"])
+    uvicorn.run(create_app(engine, args.model), host=args.host, port=args.port)
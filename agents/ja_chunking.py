@@ -0,0 +1,229 @@
+"""
+Lightweight Japanese sentence chunking.
+
+Sentence boundaries come from punctuation rules (。！？ outside of 「」/（） brackets,
+bullets and numbered headings at the start of a PDF line) instead of a spaCy
+pipeline, and sentences longer than a chunk are split between fugashi tokens,
+preferably after a comma or a particle, so words are never cut. Sentences are then
+packed up to `chunk_size` and consecutive chunks share whole trailing sentences up
+to `overlap`.
+
+- `JapaneseSentenceSplitter`: the framework-free splitter, `split_text(text)`,
+- `JapaneseSentenceChunking`: agno `ChunkingStrategy`, a drop-in for `FixedSizeChunking`.
+
+agents/prepare.py wraps the splitter as a LangChain `TextSplitter`. Compare with the
+other strategies with benchmarks/chunking_benchmark.py.
+"""
+
+import re
+from typing import Callable, List, Tuple
+
+from agno.document.base import Document
+from agno.document.chunking.strategy import ChunkingStrategy
+
+from agents.bm25_index import get_tagger
+
+TERMINATORS = "。！？!?｡"
+OPENING_BRACKETS = "「『（(【〈《〔［"
+CLOSING_BRACKETS = "」』）)】〉》〕］"
+# Characters after which a long sentence is preferably split
+SOFT_BREAKS = "、，,;；:："
+
+# A PDF line starting with a bullet or a numbered heading starts a new sentence even
+# when the previous line has no full stop: "• ...", "➢ ...", "3.1.1 ...", "（１）...", "第2章"
+_LINE_START = re.compile(
+    r"(?:[•・●○◆◇■□▪►➢※-]"
+    r"|[0-9０-９]+(?:[.．][0-9０-９]+)+\s"
+    r"|[0-9０-９]+[.．、)）]\s*\D"
+    r"|[（(][0-9０-９a-zA-Z一二三四五六七八九十]{1,3}[)）]"
+    r"|第[0-9０-９一二三四五六七八九十]+[章条節項])"
+)
+# A short numbered line without a full stop is a heading, kept apart from the text that follows
+_HEADING = re.compile(
+    r"(?:[0-9０-９]+(?:[.．][0-9０-９]+)*[.．]?|[（(][0-9０-９]{1,2}[)）]|第[0-9０-９一二三四五六七八九十]+[章条節項])"
+    r"\s*[^。．.]{1,20}"
+)
+# Page numbers printed in headers / footers: "2 / 6", "- 2 -"
+_PAGE_NUMBER = re.compile(r"(?:[0-9]+\s*/\s*[0-9]+|-\s*[0-9]+\s*-)")
+_SENTENCE_PUNCTUATION = re.compile(f"[{re.escape(TERMINATORS + OPENING_BRACKETS + CLOSING_BRACKETS)}]")
+_ASCII_WORD = re.compile(r"[0-9A-Za-z]")
+_LATIN_PUNCTUATION = re.compile(r"[.!?,;:]")
+
+
+def _join(left: str, right: str) -> str:
+    """Join two pieces of text, with a space only between two latin words or after latin punctuation."""
+    if left and right and _ASCII_WORD.match(left[-1]) and _ASCII_WORD.match(right[0]):
+        return f"{left} {right}"
+    # "test." + "Second", not "3." + "5"
+    if left and right and _LATIN_PUNCTUATION.match(left[-1]) and right[0].isascii() and right[0].isalpha():
+        return f"{left} {right}"
+    return left + right
+
+
+def _blocks(text: str) -> List[str]:
+    """Unwrap PDF lines into blocks: paragraphs, bullets and headings."""
+    blocks: List[str] = []
+    current = ""
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if _PAGE_NUMBER.fullmatch(line):
+            continue
+        if not line or _LINE_START.match(line) or _HEADING.fullmatch(line):
+            if current:
+                blocks.append(current)
+            current = line
+        else:
+            current = _join(current, line)
+        if _HEADING.fullmatch(line):
+            blocks.append(current)
+            current = ""
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def _sentences(block: str) -> List[str]:
+    """Split a block after sentence-final punctuation that is not inside brackets."""
+    sentences = []
+    start = 0
+    depth = 0
+    for match in _SENTENCE_PUNCTUATION.finditer(block):
+        char = match.group()
+        if char in OPENING_BRACKETS:
+            depth += 1
+        elif char in CLOSING_BRACKETS:
+            depth = max(depth - 1, 0)
+        elif depth == 0:
+            end = match.end()
+            # Keep runs like "！？" and closing brackets such as "。）" with the sentence
+            while end < len(block) and (block[end] in TERMINATORS or block[end] in CLOSING_BRACKETS):
+                end += 1
+            if end > start and block[start:end].strip():
+                sentences.append(block[start:end].strip())
+            start = end
+    if block[start:].strip():
+        sentences.append(block[start:].strip())
+    return sentences
+
+
+def split_sentences(text: str) -> List[str]:
+    """Japanese sentences (and bullets / headings) of a text, in order."""
+    return [sentence for block in _blocks(text) for sentence in _sentences(block)]
+
+
+class JapaneseSentenceSplitter:
+    """Pack Japanese sentences into chunks of about `chunk_size` with sentence overlap.
+
+    Args:
+        chunk_size: Maximum chunk length, in characters or in fugashi tokens (`unit`).
+        overlap: Maximum length of the trailing sentences repeated at the start of the next chunk.
+        unit: "chars" or "tokens".
+    """
+
+    def __init__(self, chunk_size: int = 200, overlap: int = 50, unit: str = "chars"):
+        if overlap >= chunk_size:
+            raise ValueError(f"Invalid parameters: overlap ({overlap}) must be less than chunk size ({chunk_size}).")
+        if unit not in ("chars", "tokens"):
+            raise ValueError(f"Unknown unit '{unit}', expected 'chars' or 'tokens'")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.unit = unit
+
+    def length(self, text: str) -> int:
+        if self.unit == "tokens":
+            return len(get_tagger()(text))
+        return len(text)
+
+    def _split_long(self, sentence: str) -> List[Tuple[str, int]]:
+        """Split a sentence longer than a chunk between tokens, preferably after 、 or a particle."""
+        measure: Callable[[str], int] = (lambda surface: 1) if self.unit == "tokens" else len
+        pieces: List[Tuple[str, int]] = []
+        current, size = "", 0
+        # Position in `current` after the last comma / particle, and the size up to it
+        soft_break, soft_size = 0, 0
+        after_soft_break = False
+        for word in get_tagger()(sentence):
+            surface = (" " if word.white_space else "") + word.surface
+            n = measure(surface)
+            # Break before the next word rather than between a particle and its comma
+            if after_soft_break and word.feature.pos1 != "補助記号":
+                soft_break, soft_size = len(current), size
+            if current and size + n > self.chunk_size:
+                if soft_size >= self.chunk_size // 2:
+                    pieces.append((current[:soft_break].strip(), soft_size))
+                    current, size = current[soft_break:].lstrip(), size - soft_size
+                else:
+                    pieces.append((current.strip(), size))
+                    current, size = "", 0
+                soft_break, soft_size = 0, 0
+            # A single token longer than a chunk (URL, formula, ...) is cut by characters
+            while self.unit == "chars" and n > self.chunk_size:
+                pieces.append((surface[: self.chunk_size], self.chunk_size))
+                surface, n = surface[self.chunk_size :], n - self.chunk_size
+            current += surface
+            size += n
+            after_soft_break = word.surface[-1] in SOFT_BREAKS or word.feature.pos1 == "助詞"
+        if current.strip():
+            pieces.append((current.strip(), size))
+        return pieces
+
+    def _pieces(self, text: str) -> List[Tuple[str, int]]:
+        pieces = []
+        for sentence in split_sentences(text):
+            n = self.length(sentence)
+            if n > self.chunk_size:
+                pieces.extend(self._split_long(sentence))
+            else:
+                pieces.append((sentence, n))
+        return pieces
+
+    def split_text(self, text: str) -> List[str]:
+        chunks: List[str] = []
+        current: List[Tuple[str, int]] = []
+        size = 0
+        for piece, n in self._pieces(text):
+            if current and size + n > self.chunk_size:
+                chunks.append(self._merge(current))
+                # Carry whole trailing sentences, as long as they fit in the overlap and next to the piece
+                carried: List[Tuple[str, int]] = []
+                carried_size = 0
+                for previous, m in reversed(current):
+                    if carried_size + m > self.overlap or carried_size + m + n > self.chunk_size:
+                        break
+                    carried.insert(0, (previous, m))
+                    carried_size += m
+                current, size = carried, carried_size
+            current.append((piece, n))
+            size += n
+        if current:
+            chunks.append(self._merge(current))
+        return chunks
+
+    @staticmethod
+    def _merge(pieces: List[Tuple[str, int]]) -> str:
+        text = ""
+        for piece, _ in pieces:
+            text = _join(text, piece)
+        return text
+
+
+class JapaneseSentenceChunking(ChunkingStrategy):
+    """Chunking strategy that packs whole Japanese sentences into chunks with sentence overlap"""
+
+    def __init__(self, chunk_size: int = 200, overlap: int = 50, unit: str = "chars"):
+        self.splitter = JapaneseSentenceSplitter(chunk_size=chunk_size, overlap=overlap, unit=unit)
+
+    def chunk(self, document: Document) -> List[Document]:
+        """Split document into sentence-aligned chunks, with the ids and meta data of FixedSizeChunking"""
+        chunked_documents: List[Document] = []
+        for chunk_number, chunk in enumerate(self.splitter.split_text(document.content), start=1):
+            meta_data = document.meta_data.copy()
+            meta_data["chunk"] = chunk_number
+            chunk_id = None
+            if document.id:
+                chunk_id = f"{document.id}_{chunk_number}"
+            elif document.name:
+                chunk_id = f"{document.name}_{chunk_number}"
+            meta_data["chunk_size"] = len(chunk)
+            chunked_documents.append(Document(id=chunk_id, name=document.name, meta_data=meta_data, content=chunk))
+        return chunked_documents
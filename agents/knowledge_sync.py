@@ -0,0 +1,287 @@
+"""
+Incremental, hash-based ingestion for a PDFKnowledgeBase.
+
+Instead of `knowledge_base.load(recreate=True)`, which re-parses, re-chunks and
+re-embeds every PDF, `KnowledgeSync.sync()` keeps a manifest of per-file and
+per-chunk content hashes and only:
+- embeds and upserts chunks that are new or changed,
+- deletes rows of chunks that disappeared from a changed file,
+- deletes all rows of files that were removed from the knowledge base path.
+
+With a `Deduplicator`, chunks that (nearly) repeat a stored chunk of any file are
+not embedded at all, their locations are recorded as sources of the stored chunk.
+Run a full sync (`sync(full=True)`) after enabling it on an existing knowledge base.
+With an `AnswerCache`, the cached answers built on changed or removed files are
+dropped, and the whole cache when a new file brings chunks it has never seen.
+
+Run it directly to sync the internal document knowledge base:
+
+    python -m agents.knowledge_sync
+"""
+
+import hashlib
+import json
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from agno.document import Document
+from agno.knowledge.pdf import PDFKnowledgeBase
+from agno.utils.log import logger
+
+from agents.answer_cache import AnswerCache
+from agents.bm25_index import BM25Index
+from agents.dedup import Deduplicator
+
+
+def chunk_hash(content: str) -> str:
+    """Same content hash as PgVector's `content_hash` column."""
+    return hashlib.md5(content.replace("\x00", "\ufffd").encode()).hexdigest()
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class KnowledgeSync:
+    def __init__(
+        self,
+        knowledge_base: PDFKnowledgeBase,
+        manifest_path: str = "tmp/documents_manifest.json",
+        keyword_index: Optional[BM25Index] = None,
+        deduplicator: Optional[Deduplicator] = None,
+        answer_cache: Optional[AnswerCache] = None,
+    ):
+        self.knowledge_base = knowledge_base
+        self.vector_db = knowledge_base.vector_db
+        # Kept in line with the vector db, saved together with the manifest
+        self.keyword_index = keyword_index
+        self.deduplicator = deduplicator
+        self.answer_cache = answer_cache
+        self.manifest_path = Path(manifest_path)
+        self.manifest: Dict[str, Dict] = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f).get("files", {})
+
+    def _save_manifest(self):
+        # Write to a temporary file first so a crash never leaves a truncated manifest
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": self.manifest}, f, ensure_ascii=False)
+        os.replace(tmp, self.manifest_path)
+
+    def _save(self):
+        # The keyword index first, so the manifest never lists chunks it is missing
+        if self.keyword_index is not None:
+            self.keyword_index.save()
+        if self.deduplicator is not None:
+            self.deduplicator.save()
+        self._save_manifest()
+
+    def pdf_files(self) -> List[Path]:
+        path = Path(self.knowledge_base.path)
+        files = sorted(path.glob("**/*.pdf")) if path.is_dir() else [path]
+        return [f for f in files if f.name not in self.knowledge_base.exclude_files]
+
+    def delete_chunks(self, name: str, content_hashes: Optional[Iterable[str]] = None):
+        """Delete the rows of one document, or only its rows with the given content hashes."""
+        if content_hashes is not None:
+            content_hashes = list(content_hashes)
+        if self.keyword_index is not None:
+            self.keyword_index.remove_chunks(name, content_hashes)
+        if hasattr(self.vector_db, "delete_chunks"):
+            self.vector_db.delete_chunks(name, content_hashes)
+            return
+
+        # PgVector: delete directly from its table
+        from sqlalchemy import delete
+
+        table = self.vector_db.table
+        statement = delete(table).where(table.c.name == name)
+        if content_hashes is not None:
+            if not content_hashes:
+                return
+            statement = statement.where(table.c.content_hash.in_(content_hashes))
+        with self.vector_db.Session() as sess, sess.begin():
+            sess.execute(statement)
+
+    def read_chunks(self, pdf: Path) -> Dict[str, List[Document]]:
+        """Read and chunk one PDF, keyed by chunk content hash.
+
+        Every chunk with the same content is listed, the first one is stored.
+        """
+        chunks: Dict[str, List[Document]] = {}
+        for document in self.knowledge_base.reader.read(pdf=pdf):
+            if not document.content or not document.content.strip():
+                continue
+            content_hash = chunk_hash(document.content)
+            # A stable, content-derived id so that unchanged chunks keep their row
+            # when chunks around them are added or removed
+            document.id = f"{document.name}_{content_hash}"
+            chunks.setdefault(content_hash, []).append(document)
+        return chunks
+
+    @staticmethod
+    def location(document: Document) -> Dict[str, Any]:
+        return {"name": document.name, "page": document.meta_data.get("page"), "chunk": document.meta_data.get("chunk")}
+
+    def _forget(self, ids: Iterable[str], queue: deque, current: Optional[str] = None):
+        """Drop deleted chunks from the dedup index, other files that pointed to them are synced again."""
+        if self.deduplicator is None:
+            return
+        ids = set(ids)
+        for id in ids:
+            self.deduplicator.remove(id)
+        for key, entry in self.manifest.items():
+            if key != current and ids & set(entry.get("duplicates", {}).values()):
+                entry["sha256"] = None
+                if key not in queue:
+                    queue.append(key)
+
+    def sync(self, full: bool = False) -> Dict[str, int]:
+        """Bring the vector db in line with the PDFs on disk.
+
+        Args:
+            full: Ignore the manifest and re-ingest every file.
+
+        Returns:
+            Counts of files and chunks added, deleted, deduplicated and left unchanged.
+        """
+        stats = dict.fromkeys(
+            [
+                "files_unchanged",
+                "files_updated",
+                "files_removed",
+                "chunks_added",
+                "chunks_deleted",
+                "chunks_kept",
+                "chunks_deduplicated",
+            ],
+            0,
+        )
+        self.vector_db.create()
+        if full:
+            self.manifest = {}
+            if self.deduplicator is not None:
+                self.deduplicator.clear()
+            if self.answer_cache is not None:
+                self.answer_cache.clear()
+
+        files = {pdf.as_posix(): pdf for pdf in self.pdf_files()}
+        queue = deque(files)
+        for key in [key for key in self.manifest if key not in files]:
+            entry = self.manifest.pop(key)
+            self.delete_chunks(entry["name"])
+            self._forget([f"{entry['name']}_{content_hash}" for content_hash in entry["chunks"]], queue)
+            if self.deduplicator is not None:
+                self.deduplicator.remove_locations(entry["name"], entry.get("duplicates", {}).values())
+            if self.answer_cache is not None:
+                self.answer_cache.invalidate([entry["name"]])
+            stats["chunks_deleted"] += len(entry["chunks"])
+            stats["files_removed"] += 1
+            logger.info(f"Removed {key} from the knowledge base")
+            self._save()
+
+        while queue:
+            key = queue.popleft()
+            pdf = files[key]
+            digest = file_hash(pdf)
+            entry = self.manifest.get(key)
+            if entry and entry["sha256"] == digest:
+                stats["files_unchanged"] += 1
+                continue
+
+            chunks = self.read_chunks(pdf)
+            name = next(iter(chunks.values()))[0].name if chunks else pdf.stem
+            if entry is None:
+                # Unknown file: clear rows left by an earlier full load(recreate=True)
+                self.delete_chunks(name)
+                if self.deduplicator is not None:
+                    self._forget([id for id in self.deduplicator.signatures if id.startswith(f"{name}_")], queue, key)
+                    self.deduplicator.remove_locations(name)
+                previous, removed = set(), set()
+            else:
+                previous = set(entry["chunks"])
+                removed = previous - chunks.keys()
+                self.delete_chunks(name, removed)
+                self._forget([f"{name}_{content_hash}" for content_hash in removed], queue, key)
+                previous -= removed
+                if self.deduplicator is not None:
+                    touched = [f"{name}_{content_hash}" for content_hash in previous]
+                    self.deduplicator.remove_locations(name, touched + list(entry.get("duplicates", {}).values()))
+                stats["chunks_deleted"] += len(removed)
+
+            added, duplicates = [], {}
+            for content_hash, documents in chunks.items():
+                document = documents[0]
+                if self.deduplicator is None:
+                    if content_hash not in previous:
+                        added.append(document)
+                    continue
+                if content_hash in previous:
+                    canonical = document.id
+                    if canonical not in self.deduplicator.signatures:
+                        # Stored before deduplication was enabled
+                        self.deduplicator.add(canonical, document.content, content_hash=content_hash)
+                else:
+                    self.deduplicator.stats.chunks += 1
+                    canonical = self.deduplicator.find(document.content, content_hash)
+                    if canonical is None:
+                        self.deduplicator.add(document.id, document.content, content_hash=content_hash)
+                        added.append(document)
+                        canonical = document.id
+                    else:
+                        duplicates[content_hash] = canonical
+                        exact = self.deduplicator.content_hashes.get(canonical) == content_hash
+                        self.deduplicator.record(document.content, exact=exact)
+                for copy in documents:
+                    self.deduplicator.add_location(canonical, self.location(copy))
+
+            if added:
+                if self.vector_db.upsert_available():
+                    self.vector_db.upsert(documents=added)
+                else:
+                    self.vector_db.insert(documents=added)
+                if self.keyword_index is not None:
+                    self.keyword_index.add_documents(added)
+            if self.answer_cache is not None and (added or removed):
+                if entry is None and added:
+                    # New content may answer any cached question better
+                    self.answer_cache.clear()
+                else:
+                    self.answer_cache.invalidate([name])
+            stored = set(chunks) - duplicates.keys()
+            stats["chunks_added"] += len(added)
+            stats["chunks_kept"] += len(stored) - len(added)
+            stats["chunks_deduplicated"] += len(duplicates)
+            stats["files_updated"] += 1
+            logger.info(
+                f"Synced {pdf.name}: {len(added)} chunks embedded, {len(stored) - len(added)} unchanged, "
+                f"{len(duplicates)} duplicates collapsed"
+            )
+
+            self.manifest[key] = {"sha256": digest, "name": name, "chunks": sorted(stored), "duplicates": duplicates}
+            self._save()
+
+        if self.deduplicator is not None:
+            stats["embeddings_saved"] = self.deduplicator.stats.embeddings_saved
+            stats["bytes_saved"] = self.deduplicator.stats.bytes_saved
+            logger.info(f"Deduplication: {self.deduplicator.stats}")
+        return stats
+
+
+if __name__ == "__main__":
+    from agents.rag_agent import answer_cache, deduplicator, keyword_index, knowledge_base
+
+    sync = KnowledgeSync(knowledge_base, keyword_index=keyword_index, deduplicator=deduplicator, answer_cache=answer_cache)
+    print(sync.sync())
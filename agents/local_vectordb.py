@@ -0,0 +1,571 @@
+"""
+In-process vector database for single-node deployments.
+
+`LocalVectorDb` is an agno `VectorDb` that can replace `PgVector` in a
+`PDFKnowledgeBase`. Vectors are L2-normalized and kept in a memory-mapped float32
+matrix on disk, documents and metadata in a SQLite file next to it. Retrieval is
+a vectorized cosine top-k over the matrix, so no database service or network
+round-trip is needed.
+
+For larger corpora an approximate index can be built with `optimize()`:
+- `IVF`: numpy spherical k-means, only the `probes` nearest lists are scanned,
+- `HNSW`: graph index from `hnswlib` (optional dependency).
+
+With `quantization="int8"` or `"binary"` the search scans compact in-memory codes and
+only reads the float32 vectors of the best candidates (see agents/quantization.py).
+
+    vector_db = LocalVectorDb(collection="documents", embedder=embedder, vector_index=IVF(lists=256))
+"""
+
+import asyncio
+import json
+import shutil
+import sqlite3
+import threading
+from dataclasses import dataclass
+from hashlib import md5
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from agno.document import Document
+from agno.embedder import Embedder
+from agno.reranker.base import Reranker
+from agno.utils.log import log_debug, logger
+from agno.vectordb.base import VectorDb
+
+from agents.quantization import QUANTIZATIONS, make_quantizer, rescore
+
+
+@dataclass
+class IVF:
+    lists: int = 100
+    probes: int = 10
+    iterations: int = 10
+    # Below this many rows the exact search is used, it is as fast as the index
+    min_rows: int = 10_000
+
+
+@dataclass
+class HNSW:
+    m: int = 16
+    ef_construction: int = 200
+    ef_search: int = 64
+    min_rows: int = 10_000
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Cluster normalized vectors by cosine similarity, return the normalized centroids."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=k)
+        # Reseed empty lists with random vectors
+        empty = counts == 0
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids.astype(np.float32)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, block: int = 65536) -> np.ndarray:
+    """Index of the nearest centroid of every vector, computed in blocks to bound memory."""
+    return np.concatenate(
+        [np.argmax(vectors[i : i + block] @ centroids.T, axis=1) for i in range(0, len(vectors), block)]
+        or [np.zeros(0, dtype=np.int64)]
+    ).astype(np.int32)
+
+
+class LocalVectorDb(VectorDb):
+    def __init__(
+        self,
+        collection: str = "documents",
+        path: str = "tmp/local_vectordb",
+        embedder: Optional[Embedder] = None,
+        dimensions: Optional[int] = None,
+        vector_index: Optional[Union[IVF, HNSW]] = None,
+        quantization: Optional[str] = None,
+        rescore_oversampling: float = 4.0,
+        reranker: Optional[Reranker] = None,
+    ):
+        """
+        Args:
+            quantization: "int8" or "binary" to search over compact codes kept in memory and
+                rescore the best `limit * rescore_oversampling` candidates with the float32
+                vectors on disk. Not used by the HNSW index, which keeps its own vectors.
+        """
+        if embedder is None:
+            from agno.embedder.openai import OpenAIEmbedder
+
+            embedder = OpenAIEmbedder()
+            log_debug("Embedder not provided, using OpenAIEmbedder as default.")
+        self.embedder: Embedder = embedder
+        self.dimensions: int = dimensions or embedder.dimensions
+        if not self.dimensions:
+            raise ValueError("Embedder.dimensions must be set.")
+        self.collection = collection
+        self.directory = Path(path) / collection
+        self.vector_index = vector_index
+        if quantization is not None and quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+        self.quantization = quantization
+        self.rescore_oversampling = rescore_oversampling
+        self.reranker = reranker
+
+        self._lock = threading.RLock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._vectors: Optional[np.memmap] = None
+        # Rows in use, slots of deleted rows are reused by the next inserts
+        self._valid = np.zeros(0, dtype=bool)
+        self._size = 0
+        # IVF: centroids and list of every slot (-1 when not assigned yet)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._hnsw = None
+        self._quantizer = None
+        self._codes: Optional[np.memmap] = None
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.create()
+        return self._connection
+
+    def create(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.directory / "documents.db", check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "slot INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, name TEXT, content TEXT, "
+                "content_hash TEXT, meta_data TEXT, filters TEXT, usage TEXT)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS idx_documents_name ON documents (name)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents (content_hash)")
+            self._connection.commit()
+
+            if self.vectors_path.exists():
+                capacity = self.vectors_path.stat().st_size // (4 * self.dimensions)
+                self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimensions))
+            else:
+                self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="w+", shape=(1024, self.dimensions))
+            slots = np.array([row[0] for row in self._connection.execute("SELECT slot FROM documents")], dtype=np.int64)
+            self._size = int(slots.max()) + 1 if len(slots) else 0
+            self._valid = np.zeros(len(self._vectors), dtype=bool)
+            self._valid[slots] = True
+            self._load_index()
+            if self.quantization:
+                self._open_codes()
+
+    def _open_codes(self):
+        """Open (or create) the memory-mapped codes and the quantizer calibration."""
+        codes_path = self.directory / f"codes.{self.quantization}"
+        state_path = self.directory / f"quantizer.{self.quantization}.npz"
+        state = dict(np.load(state_path)) if state_path.exists() else None
+        self._quantizer = make_quantizer(self.quantization, state) if state else None
+        shape = (len(self._vectors), make_quantizer(self.quantization).code_size(self.dimensions))
+        mode = "r+" if codes_path.exists() else "w+"
+        self._codes = np.memmap(codes_path, dtype=np.uint8, mode=mode, shape=shape)
+        if self._quantizer is None and self._size > 0:
+            self._fit_quantizer()
+
+    def _fit_quantizer(self):
+        """Calibrate the quantizer on (a sample of) the stored vectors and re-encode them all."""
+        slots = np.flatnonzero(self._valid[: self._size])
+        if len(slots) == 0:
+            return
+        sample = np.sort(np.random.default_rng(0).choice(slots, size=min(len(slots), 100_000), replace=False))
+        self._quantizer = make_quantizer(self.quantization).fit(np.asarray(self._vectors[sample]))
+        np.savez(self.directory / f"quantizer.{self.quantization}.npz", **self._quantizer.state())
+        for start in range(0, len(slots), 65536):
+            block = slots[start : start + 65536]
+            self._codes[block] = self._quantizer.encode(np.asarray(self._vectors[block])).view(np.uint8)
+        self._codes.flush()
+
+    def _grow(self, capacity: int):
+        """Enlarge the memory-mapped matrix to at least `capacity` rows."""
+        if capacity <= len(self._vectors):
+            return
+        capacity = max(capacity, 2 * len(self._vectors))
+        self._vectors.flush()
+        self._vectors = None
+        with open(self.vectors_path, "r+b") as f:
+            f.truncate(capacity * self.dimensions * 4)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimensions))
+        self._valid = np.concatenate([self._valid, np.zeros(capacity - len(self._valid), dtype=bool)])
+        if self._centroids is not None:
+            self._lists = np.concatenate([self._lists, np.full(capacity - len(self._lists), -1, dtype=np.int32)])
+        if self._hnsw is not None:
+            self._hnsw.resize_index(capacity)
+        if self._codes is not None:
+            self._codes.flush()
+            code_size = self._codes.shape[1]
+            self._codes = None
+            codes_path = self.directory / f"codes.{self.quantization}"
+            with open(codes_path, "r+b") as f:
+                f.truncate(capacity * code_size)
+            self._codes = np.memmap(codes_path, dtype=np.uint8, mode="r+", shape=(capacity, code_size))
+
+    def _clean_content(self, content: str) -> str:
+        return content.replace("\x00", "\ufffd")
+
+    def _embed(self, documents: List[Document]):
+        """Embed the documents without an embedding, in one batch when the embedder supports it."""
+        pending = [document for document in documents if document.embedding is None]
+        if not pending:
+            return
+        if hasattr(self.embedder, "get_embeddings"):
+            for document, embedding in zip(pending, self.embedder.get_embeddings([d.content for d in pending])):
+                document.embedding = embedding
+        else:
+            for document in pending:
+                document.embed(embedder=self.embedder)
+
+    def doc_exists(self, document: Document) -> bool:
+        content_hash = md5(self._clean_content(document.content).encode()).hexdigest()
+        return self.connection.execute(
+            "SELECT 1 FROM documents WHERE content_hash = ? LIMIT 1", (content_hash,)
+        ).fetchone() is not None
+
+    def name_exists(self, name: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM documents WHERE name = ? LIMIT 1", (name,)).fetchone() is not None
+
+    def id_exists(self, id: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM documents WHERE id = ? LIMIT 1", (id,)).fetchone() is not None
+
+    def upsert_available(self) -> bool:
+        return True
+
+    def insert(self, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        self.upsert(documents, filters)
+
+    def upsert(self, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        """Insert documents, replacing the rows that have the same id."""
+        if not documents:
+            return
+        self._embed(documents)
+        with self._lock:
+            connection = self.connection
+            records = {}
+            for document in documents:
+                content = self._clean_content(document.content)
+                content_hash = md5(content.encode()).hexdigest()
+                records[document.id or content_hash] = (document, content, content_hash)
+
+            ids = list(records)
+            existing: Dict[str, int] = {}
+            for start in range(0, len(ids), 500):
+                batch = ids[start : start + 500]
+                rows = connection.execute(
+                    f"SELECT id, slot FROM documents WHERE id IN ({','.join('?' * len(batch))})", batch
+                )
+                existing.update(dict(rows))
+
+            new_ids = [id for id in ids if id not in existing]
+            free = np.flatnonzero(~self._valid[: self._size])[: len(new_ids)].tolist()
+            free += list(range(self._size, self._size + len(new_ids) - len(free)))
+            slots = {**existing, **dict(zip(new_ids, free))}
+            self._grow(max(slots.values()) + 1)
+            self._size = max(self._size, max(slots.values()) + 1)
+
+            slot_array = np.array([slots[id] for id in ids], dtype=np.int64)
+            matrix = _normalize(np.asarray([records[id][0].embedding for id in ids], dtype=np.float32))
+            self._vectors[slot_array] = matrix
+            self._vectors.flush()
+            self._valid[slot_array] = True
+            self._index_add(slot_array, matrix)
+            if self._codes is not None:
+                if self._quantizer is None:
+                    # First rows: calibrate on them, optimize() recalibrates on the whole collection
+                    self._fit_quantizer()
+                else:
+                    self._codes[slot_array] = self._quantizer.encode(matrix).view(np.uint8)
+                    self._codes.flush()
+
+            connection.executemany(
+                "INSERT OR REPLACE INTO documents (slot, id, name, content, content_hash, meta_data, filters, usage) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        slots[id],
+                        id,
+                        document.name,
+                        content,
+                        content_hash,
+                        json.dumps(document.meta_data, ensure_ascii=False),
+                        json.dumps(filters, ensure_ascii=False) if filters else None,
+                        json.dumps(document.usage) if document.usage else None,
+                    )
+                    for id, (document, content, content_hash) in records.items()
+                ],
+            )
+            connection.commit()
+            log_debug(f"Upserted {len(records)} documents into {self.directory}")
+
+    def delete_chunks(self, name: str, content_hashes: Optional[List[str]] = None) -> None:
+        """Delete the rows of one document, or only its rows with the given content hashes."""
+        with self._lock:
+            if content_hashes is None:
+                rows = self.connection.execute("SELECT slot FROM documents WHERE name = ?", (name,)).fetchall()
+            else:
+                content_hashes = list(content_hashes)
+                rows = []
+                for start in range(0, len(content_hashes), 500):
+                    batch = content_hashes[start : start + 500]
+                    rows += self.connection.execute(
+                        f"SELECT slot FROM documents WHERE name = ? AND content_hash IN ({','.join('?' * len(batch))})",
+                        [name, *batch],
+                    ).fetchall()
+            self._delete_slots([row[0] for row in rows])
+
+    def _delete_slots(self, slots: List[int]):
+        if not slots:
+            return
+        self.connection.executemany("DELETE FROM documents WHERE slot = ?", [(slot,) for slot in slots])
+        self.connection.commit()
+        self._valid[slots] = False
+        if self._hnsw is not None:
+            for slot in slots:
+                self._hnsw.mark_deleted(slot)
+
+    def _filter_mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Rows whose filters contain every key/value of `filters`, like PgVector's JSONB containment."""
+        mask = np.zeros(len(self._valid), dtype=bool)
+        for slot, row_filters in self.connection.execute("SELECT slot, filters FROM documents WHERE filters IS NOT NULL"):
+            values = json.loads(row_filters)
+            mask[slot] = all(values.get(key) == value for key, value in filters.items())
+        return mask
+
+    def search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        return self.vector_search(query, limit, filters)
+
+    def vector_search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        query_embedding = self.embedder.get_embedding(query)
+        if query_embedding is None:
+            logger.error(f"Error getting embedding for Query: {query}")
+            return []
+        slots, scores = self.search_vectors(np.asarray(query_embedding, dtype=np.float32), limit, filters)
+        documents = self._documents(slots, scores)
+        if self.reranker:
+            documents = self.reranker.rerank(query=query, documents=documents)
+        return documents
+
+    def search_vectors(
+        self, query: np.ndarray, limit: int = 5, filters: Optional[Dict[str, Any]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-`limit` slots and cosine scores for a query vector."""
+        query = _normalize(query.astype(np.float32))
+        with self._lock:
+            self.create()
+            if self._size == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            if filters:
+                # The indexes do not support filtering, use the exact search
+                candidates = np.flatnonzero(self._valid[: self._size] & self._filter_mask(filters)[: self._size])
+                return self._top_k(candidates, query, limit)
+            if self._hnsw is not None and self._valid.sum() >= self.vector_index.min_rows:
+                labels, distances = self._hnsw.knn_query(query, k=min(limit, int(self._valid.sum())))
+                return labels[0].astype(np.int64), 1 - distances[0]
+            if self._centroids is not None and self._valid.sum() >= self.vector_index.min_rows:
+                probes = np.argsort(-(self._centroids @ query))[: self.vector_index.probes]
+                in_lists = np.isin(self._lists[: self._size], probes) | (self._lists[: self._size] < 0)
+                return self._top_k(np.flatnonzero(self._valid[: self._size] & in_lists), query, limit)
+            return self._top_k(None, query, limit)
+
+    def _top_k(self, candidates: Optional[np.ndarray], query: np.ndarray, limit: int):
+        if self._quantizer is not None:
+            return self._top_k_quantized(candidates, query, limit)
+        if candidates is None:
+            scores = self._vectors[: self._size] @ query
+            scores[~self._valid[: self._size]] = -np.inf
+            slots = np.arange(self._size)
+            limit = min(limit, int(self._valid[: self._size].sum()))
+        else:
+            scores = self._vectors[candidates] @ query
+            slots = candidates
+            limit = min(limit, len(candidates))
+        if limit <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return slots[top], scores[top]
+
+    def _top_k_quantized(self, candidates: Optional[np.ndarray], query: np.ndarray, limit: int):
+        """Shortlist with the codes, then rescore the shortlist with the float32 vectors."""
+        if candidates is None:
+            candidates = np.flatnonzero(self._valid[: self._size])
+        codes = np.asarray(self._codes[candidates]).view(self._quantizer.dtype)
+        approximate = self._quantizer.scores(codes, query)
+        shortlist = min(len(candidates), max(limit, int(limit * self.rescore_oversampling)))
+        if shortlist <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = np.argpartition(-approximate, shortlist - 1)[:shortlist]
+        return rescore(candidates[top], self._vectors, query, limit)
+
+    def _documents(self, slots: np.ndarray, scores: np.ndarray) -> List[Document]:
+        if len(slots) == 0:
+            return []
+        rows = {
+            row[0]: row
+            for row in self.connection.execute(
+                "SELECT slot, id, name, content, meta_data, usage FROM documents "
+                f"WHERE slot IN ({','.join('?' * len(slots))})",
+                [int(slot) for slot in slots],
+            )
+        }
+        documents = []
+        for slot in slots:
+            if int(slot) not in rows:
+                continue
+            _, id, name, content, meta_data, usage = rows[int(slot)]
+            documents.append(
+                Document(
+                    id=id,
+                    name=name,
+                    meta_data=json.loads(meta_data or "{}"),
+                    content=content,
+                    embedder=self.embedder,
+                    embedding=self._vectors[int(slot)].tolist(),
+                    usage=json.loads(usage) if usage else None,
+                )
+            )
+        return documents
+
+    def optimize(self, force_recreate: bool = False) -> None:
+        """Build (or rebuild) the IVF or HNSW index over the current rows and recalibrate the quantizer."""
+        with self._lock:
+            self.create()
+            if self._codes is not None:
+                self._fit_quantizer()
+            if self.vector_index is None:
+                return
+            slots = np.flatnonzero(self._valid[: self._size])
+            if len(slots) == 0:
+                return
+            vectors = np.asarray(self._vectors[slots])
+            if isinstance(self.vector_index, IVF):
+                self._centroids = spherical_kmeans(vectors, self.vector_index.lists, self.vector_index.iterations)
+                self._lists = np.full(len(self._valid), -1, dtype=np.int32)
+                self._lists[slots] = _assign(vectors, self._centroids)
+            else:
+                self._hnsw = self._new_hnsw(len(self._valid))
+                self._hnsw.add_items(vectors, slots)
+            self._save_index()
+            logger.info(f"Built {type(self.vector_index).__name__} index over {len(slots)} vectors")
+
+    def _new_hnsw(self, capacity: int, path: Optional[Path] = None):
+        try:
+            import hnswlib
+        except ImportError:
+            raise ImportError("hnswlib is not installed. Please install it using `pip install hnswlib`")
+        index = hnswlib.Index(space="cosine", dim=self.dimensions)
+        if path is not None:
+            index.load_index(str(path), max_elements=capacity, allow_replace_deleted=True)
+            index.set_ef(self.vector_index.ef_search)
+            return index
+        index.init_index(
+            max_elements=capacity,
+            M=self.vector_index.m,
+            ef_construction=self.vector_index.ef_construction,
+            allow_replace_deleted=True,
+        )
+        index.set_ef(self.vector_index.ef_search)
+        return index
+
+    def _index_add(self, slots: np.ndarray, vectors: np.ndarray):
+        """Keep a built index up to date with upserted rows."""
+        if self._centroids is not None:
+            self._lists[slots] = _assign(vectors, self._centroids)
+        if self._hnsw is not None:
+            self._hnsw.add_items(vectors, slots, replace_deleted=True)
+        if self._centroids is not None or self._hnsw is not None:
+            self._save_index()
+
+    def _save_index(self):
+        if self._centroids is not None:
+            np.save(self.directory / "ivf_centroids.npy", self._centroids)
+            np.save(self.directory / "ivf_lists.npy", self._lists)
+        if self._hnsw is not None:
+            self._hnsw.save_index(str(self.directory / "hnsw.bin"))
+
+    def _load_index(self):
+        if isinstance(self.vector_index, IVF) and (self.directory / "ivf_centroids.npy").exists():
+            self._centroids = np.load(self.directory / "ivf_centroids.npy")
+            lists = np.load(self.directory / "ivf_lists.npy")
+            self._lists = np.full(len(self._valid), -1, dtype=np.int32)
+            self._lists[: min(len(lists), len(self._lists))] = lists[: len(self._lists)]
+        elif isinstance(self.vector_index, HNSW) and (self.directory / "hnsw.bin").exists():
+            self._hnsw = self._new_hnsw(len(self._valid), self.directory / "hnsw.bin")
+
+    def get_count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def exists(self) -> bool:
+        return (self.directory / "documents.db").exists()
+
+    def drop(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = None
+            self._vectors = None
+            self._valid = np.zeros(0, dtype=bool)
+            self._size = 0
+            self._centroids = None
+            self._lists = np.zeros(0, dtype=np.int32)
+            self._hnsw = None
+            self._quantizer = None
+            self._codes = None
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def delete(self) -> bool:
+        """Delete every row but keep the collection."""
+        with self._lock:
+            self.create()
+            self._delete_slots(np.flatnonzero(self._valid).tolist())
+            return True
+
+    def __deepcopy__(self, memo):
+        # Agent copies share the same on-disk collection and in-memory state
+        memo[id(self)] = self
+        return self
+
+    async def async_create(self) -> None:
+        await asyncio.to_thread(self.create)
+
+    async def async_doc_exists(self, document: Document) -> bool:
+        return await asyncio.to_thread(self.doc_exists, document)
+
+    async def async_name_exists(self, name: str) -> bool:
+        return await asyncio.to_thread(self.name_exists, name)
+
+    async def async_insert(self, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        await asyncio.to_thread(self.insert, documents, filters)
+
+    async def async_upsert(self, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        await asyncio.to_thread(self.upsert, documents, filters)
+
+    async def async_search(
+        self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        return await asyncio.to_thread(self.search, query, limit, filters)
+
+    async def async_drop(self) -> None:
+        await asyncio.to_thread(self.drop)
+
+    async def async_exists(self) -> bool:
+        return await asyncio.to_thread(self.exists)
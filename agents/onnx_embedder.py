@@ -0,0 +1,211 @@
+"""
+CPU-optimized ONNX Runtime backend for the SentenceTransformer embedders.
+
+Export the model once (optionally with dynamic int8 quantization of the weights):
+
+    python -m agents.onnx_embedder --model cl-nagoya/sup-simcse-ja-base --out tmp/onnx/sup-simcse-ja-base
+
+The export directory holds the ONNX graph(s), the tokenizer and the pooling settings
+of the SentenceTransformer model, so `OnnxEmbedder` produces the same 768-dim vectors
+without importing torch. tests/test_onnx_embedder.py checks the parity with the
+PyTorch model, benchmarks/onnx_embedder_benchmark.py also compares the throughput.
+"""
+
+import argparse
+import inspect
+import json
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from agno.embedder.base import Embedder
+
+from agents.embedding_cache import EmbeddingCache
+
+FP32_MODEL = "model.onnx"
+INT8_MODEL = "model.int8.onnx"
+POOLING_CONFIG = "pooling.json"
+
+
+def _pooling_config(model) -> Dict[str, Any]:
+    """Read the pooling mode and normalization of a loaded SentenceTransformer."""
+    from sentence_transformers.models import Normalize, Pooling
+
+    config = {"pooling": "cls", "normalize": False}
+    for module in model:
+        if isinstance(module, Pooling):
+            # sentence-transformers >= 6 names the mode, older versions have one flag per mode
+            mode = getattr(module, "pooling_mode", None)
+            cls = mode == "cls" if isinstance(mode, str) else module.pooling_mode_cls_token
+            config["pooling"] = "cls" if cls else "mean"
+        elif isinstance(module, Normalize):
+            config["normalize"] = True
+    return config
+
+
+def export_onnx(model_id: str, out_dir: str, quantize: bool = True, opset: int = 17) -> Path:
+    """Export the transformer of a SentenceTransformer model to ONNX, plus an int8 copy if `quantize`."""
+    try:
+        import torch
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        raise ImportError(
+            "sentence-transformers is not installed. Please install it using `pip install sentence-transformers`"
+        )
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    model = SentenceTransformer(model_name_or_path=model_id, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    inputs = tokenizer(["ダミーの入力です"], return_tensors="pt")
+    input_names = list(inputs.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, module):
+            super().__init__()
+            self.module = module
+
+        def forward(self, *args):
+            return self.module(**dict(zip(input_names, args))).last_hidden_state
+
+    # torch >= 2.9 exports with dynamo by default, which does not take dynamic_axes
+    legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(transformer),
+            tuple(inputs[name] for name in input_names),
+            str(out / FP32_MODEL),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            **legacy,
+        )
+    tokenizer.save_pretrained(out)
+    config = {
+        **_pooling_config(model),
+        "model_id": model_id,
+        "dimensions": transformer.config.hidden_size,
+        "max_seq_length": model.max_seq_length,
+    }
+    (out / POOLING_CONFIG).write_text(json.dumps(config, indent=2))
+
+    if quantize:
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError:
+            raise ImportError("onnxruntime is not installed. Please install it using `pip install onnxruntime`")
+        quantize_dynamic(str(out / FP32_MODEL), str(out / INT8_MODEL), weight_type=QuantType.QInt8)
+    return out
+
+
+@dataclass
+class OnnxEmbedder(Embedder):
+    """Embedder running an exported (optionally int8-quantized) ONNX graph on CPU."""
+
+    id: str = "cl-nagoya/sup-simcse-ja-base"
+    dimensions: int = 768
+    model_dir: str = "tmp/onnx/sup-simcse-ja-base"
+    quantized: bool = True
+    batch_size: int = 32
+    # Tokens kept per text, defaults to the max_seq_length of the exported SentenceTransformer
+    max_length: Optional[int] = None
+    # Defaults to ONNX Runtime's choice (all physical cores)
+    num_threads: Optional[int] = None
+    cache: Optional[EmbeddingCache] = field(default=None, repr=False)
+    _session: Optional[Any] = field(default=None, init=False, repr=False)
+    _tokenizer: Optional[Any] = field(default=None, init=False, repr=False)
+    _config: Dict[str, Any] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def _load(self):
+        if self._session is not None:
+            return
+        with self._lock:
+            if self._session is not None:
+                return
+            try:
+                import onnxruntime as ort
+            except ImportError:
+                raise ImportError("onnxruntime is not installed. Please install it using `pip install onnxruntime`")
+            try:
+                from transformers import AutoTokenizer
+            except ImportError:
+                raise ImportError("transformers is not installed. Please install it using `pip install transformers`")
+
+            directory = Path(self.model_dir)
+            model_path = directory / (INT8_MODEL if self.quantized else FP32_MODEL)
+            if not model_path.exists():
+                raise FileNotFoundError(
+                    f"{model_path} not found, export it with `python -m agents.onnx_embedder --out {self.model_dir}`"
+                )
+            self._config = json.loads((directory / POOLING_CONFIG).read_text())
+            if self._config.get("dimensions", self.dimensions) != self.dimensions:
+                raise ValueError(f"{model_path} outputs {self._config['dimensions']} dims, expected {self.dimensions}")
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.num_threads:
+                options.intra_op_num_threads = self.num_threads
+            self._tokenizer = AutoTokenizer.from_pretrained(directory)
+            self._session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        input_names = {i.name for i in self._session.get_inputs()}
+        # Exports without max_seq_length predate it, 512 is the BERT limit
+        max_length = self.max_length or self._config.get("max_seq_length") or 512
+        outputs = []
+        for start in range(0, len(texts), self.batch_size):
+            inputs = self._tokenizer(
+                texts[start : start + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=max_length,
+                return_tensors="np",
+            )
+            feed = {name: value.astype(np.int64) for name, value in inputs.items() if name in input_names}
+            hidden = self._session.run(None, feed)[0]
+            if self._config["pooling"] == "cls":
+                pooled = hidden[:, 0]
+            else:
+                mask = inputs["attention_mask"][..., None].astype(hidden.dtype)
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self._config["normalize"]:
+                pooled = pooled / np.linalg.norm(pooled, axis=1, keepdims=True)
+            outputs.append(pooled.astype(np.float32))
+        return np.concatenate(outputs) if outputs else np.zeros((0, self.dimensions), dtype=np.float32)
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts at once, computing only those missing from the cache."""
+        cached = self.cache.get_many(texts) if self.cache is not None else [None] * len(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            self._load()
+            computed = dict(zip(missing, self._encode(missing).tolist()))
+            if self.cache is not None:
+                self.cache.put_many(missing, [computed[text] for text in missing])
+            cached = [vector if vector is not None else computed[text] for text, vector in zip(texts, cached)]
+        return cached
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embeddings([text])[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a SentenceTransformer model to ONNX for OnnxEmbedder")
+    parser.add_argument("--model", default="cl-nagoya/sup-simcse-ja-base")
+    parser.add_argument("--out", default="tmp/onnx/sup-simcse-ja-base")
+    parser.add_argument("--no-quantize", action="store_true", help="Only export the fp32 graph")
+    args = parser.parse_args()
+
+    out = export_onnx(args.model, args.out, quantize=not args.no_quantize)
+    print(f"Exported {args.model} to {out}")
@@ -0,0 +1,350 @@
+"""
+ANN index management for the PgVector `documents` table.
+
+`PgVector` only creates its HNSW/IVFFlat index through `optimize()` (which nothing
+calls), ships with `hnsw.ef_search = 5` and orders hybrid results by a combined
+score that no index can serve, so every hybrid query is a sequential scan.
+`IndexedPgVector` fixes this:
+- `create_index()` builds (or rebuilds, without blocking writes) the HNSW or
+  IVFFlat index described by `vector_index`,
+- `ef_search` / `probes` are set per query and can be changed at runtime with
+  `set_search_params()`,
+- `hybrid_search()` re-scores the `hybrid_candidates` nearest neighbours found
+  through the index with the same vector + full-text score as PgVector,
+- with `quantization` ("halfvec" or "binary") the index is built over quantized
+  vectors and its candidates are rescored with the full vectors of the table.
+
+The index is configured from the environment (see `vector_index_from_env`) and
+managed from the command line:
+
+    python -m agents.pgvector_index --info
+    python -m agents.pgvector_index --create            # no-op if it already exists
+    python -m agents.pgvector_index --create --rebuild  # e.g. after changing PGVECTOR_M
+"""
+
+import argparse
+import os
+from math import sqrt
+from typing import Any, Dict, List, Optional, Sequence
+
+from agno.document import Document
+from agno.utils.log import log_debug, log_info, logger
+from agno.vectordb.distance import Distance
+from agno.vectordb.pgvector import PgVector
+from agno.vectordb.pgvector.index import HNSW, Ivfflat
+from pgvector.sqlalchemy import BIT, HALFVEC, Vector
+from sqlalchemy.sql.expression import bindparam, cast, desc, func, select, text
+
+OPERATOR_CLASSES = {
+    Distance.l2: "l2_ops",
+    Distance.max_inner_product: "ip_ops",
+    Distance.cosine: "cosine_ops",
+}
+
+# pgvector has no int8 type: halfvec halves the index, binary codes divide it by 32
+PGVECTOR_QUANTIZATIONS = ("halfvec", "binary")
+
+
+def vector_index_from_env():
+    """HNSW or IVFFlat settings from PGVECTOR_* environment variables, None for no index."""
+    index_type = os.getenv("PGVECTOR_INDEX", "hnsw").lower()
+    if index_type == "hnsw":
+        return HNSW(
+            m=int(os.getenv("PGVECTOR_M", "16")),
+            ef_construction=int(os.getenv("PGVECTOR_EF_CONSTRUCTION", "64")),
+            ef_search=int(os.getenv("PGVECTOR_EF_SEARCH", "40")),
+        )
+    if index_type == "ivfflat":
+        lists = os.getenv("PGVECTOR_LISTS")
+        return Ivfflat(
+            lists=int(lists or 100),
+            dynamic_lists=lists is None,
+            probes=int(os.getenv("PGVECTOR_PROBES", "10")),
+        )
+    if index_type == "none":
+        return None
+    raise ValueError(f"Unknown PGVECTOR_INDEX '{index_type}', expected hnsw, ivfflat or none")
+
+
+class IndexedPgVector(PgVector):
+    def __init__(
+        self,
+        *args,
+        hybrid_candidates: int = 100,
+        iterative_scan: Optional[str] = None,
+        quantization: Optional[str] = None,
+        rescore_oversampling: float = 4.0,
+        **kwargs,
+    ):
+        """
+        Args:
+            hybrid_candidates: Nearest neighbours fetched through the index and re-scored by hybrid_search.
+            iterative_scan: pgvector >= 0.8 iterative index scan ("strict_order" or "relaxed_order"),
+                keeps filtered queries from returning fewer than `limit` rows.
+            quantization: "halfvec" or "binary" to index quantized vectors (an expression index)
+                and rescore the best `limit * rescore_oversampling` rows with the full vectors.
+        """
+        super().__init__(*args, **kwargs)
+        if quantization is not None and quantization not in PGVECTOR_QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {PGVECTOR_QUANTIZATIONS}")
+        self.hybrid_candidates = hybrid_candidates
+        self.iterative_scan = iterative_scan
+        self.quantization = quantization
+        self.rescore_oversampling = rescore_oversampling
+        if self.vector_index is not None and self.vector_index.name is None:
+            # PgVector's default HNSW() instance is shared, do not name it for every table
+            self.vector_index = self.vector_index.model_copy()
+            index_type = "ivfflat" if isinstance(self.vector_index, Ivfflat) else "hnsw"
+            suffix = f"_{quantization}" if quantization else ""
+            self.vector_index.name = f"{self.table_name}_{index_type}{suffix}_index"
+
+    def set_search_params(self, ef_search: Optional[int] = None, probes: Optional[int] = None):
+        """Change the query-time recall/latency trade-off without rebuilding the index."""
+        if isinstance(self.vector_index, HNSW) and ef_search is not None:
+            self.vector_index.ef_search = ef_search
+        if isinstance(self.vector_index, Ivfflat) and probes is not None:
+            self.vector_index.probes = probes
+
+    def _apply_search_params(self, sess):
+        if isinstance(self.vector_index, HNSW):
+            sess.execute(text(f"SET LOCAL hnsw.ef_search = {int(self.vector_index.ef_search)}"))
+            if self.iterative_scan:
+                sess.execute(text("SELECT set_config('hnsw.iterative_scan', :mode, true)"), {"mode": self.iterative_scan})
+        elif isinstance(self.vector_index, Ivfflat):
+            sess.execute(text(f"SET LOCAL ivfflat.probes = {int(self.vector_index.probes)}"))
+            if self.iterative_scan:
+                sess.execute(text("SELECT set_config('ivfflat.iterative_scan', :mode, true)"), {"mode": self.iterative_scan})
+
+    def _distance(self, query_embedding: Sequence[float], column=None):
+        column = self.table.c.embedding if column is None else column
+        if self.distance == Distance.l2:
+            return column.l2_distance(query_embedding)
+        if self.distance == Distance.max_inner_product:
+            return column.max_inner_product(query_embedding)
+        return column.cosine_distance(query_embedding)
+
+    def _index_distance(self, query_embedding: Sequence[float]):
+        """The distance expression served by the (quantized) index."""
+        query = bindparam("query_embedding", value=query_embedding, type_=Vector(self.dimensions))
+        if self.quantization == "binary":
+            codes = cast(func.binary_quantize(self.table.c.embedding), BIT(self.dimensions))
+            return codes.hamming_distance(cast(func.binary_quantize(query), BIT(self.dimensions)))
+        if self.quantization == "halfvec":
+            return self._distance(
+                cast(query, HALFVEC(self.dimensions)), cast(self.table.c.embedding, HALFVEC(self.dimensions))
+            )
+        return self._distance(query_embedding)
+
+    def _nearest(self, query_embedding: Sequence[float], limit: int, filters: Optional[Dict[str, Any]] = None):
+        """Select the ids of the `limit` nearest rows through the index, rescoring quantized candidates."""
+        stmt = select(self.table.c.id, self.table.c.embedding).order_by(self._index_distance(query_embedding))
+        if filters is not None:
+            stmt = stmt.where(self.table.c.filters.contains(filters))
+        if not self.quantization:
+            return select(stmt.limit(limit).subquery().c.id)
+        shortlist = stmt.limit(max(limit, int(limit * self.rescore_oversampling))).subquery("shortlist")
+        return select(shortlist.c.id).order_by(self._distance(query_embedding, shortlist.c.embedding)).limit(limit)
+
+    def _documents(self, results) -> List[Document]:
+        return [
+            Document(
+                id=result.id,
+                name=result.name,
+                meta_data=result.meta_data,
+                content=result.content,
+                embedder=self.embedder,
+                embedding=result.embedding,
+                usage=result.usage,
+            )
+            for result in results
+        ]
+
+    def vector_search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        if not self.quantization:
+            return super().vector_search(query, limit, filters)
+        query_embedding = self.embedder.get_embedding(query)
+        if query_embedding is None:
+            logger.error(f"Error getting embedding for Query: {query}")
+            return []
+        nearest = self._nearest(query_embedding, limit, filters).subquery("nearest")
+        stmt = (
+            select(
+                self.table.c.id,
+                self.table.c.name,
+                self.table.c.meta_data,
+                self.table.c.content,
+                self.table.c.embedding,
+                self.table.c.usage,
+            )
+            .where(self.table.c.id.in_(select(nearest.c.id)))
+            .order_by(self._distance(query_embedding))
+        )
+        try:
+            with self.Session() as sess, sess.begin():
+                self._apply_search_params(sess)
+                results = sess.execute(stmt).fetchall()
+        except Exception as e:
+            logger.error(f"Error performing semantic search: {e}")
+            return []
+        search_results = self._documents(results)
+        if self.reranker:
+            search_results = self.reranker.rerank(query=query, documents=search_results)
+        return search_results
+
+    def _vector_score(self, query_embedding: Sequence[float]):
+        """Same similarity score as PgVector.hybrid_search."""
+        if self.distance == Distance.max_inner_product:
+            return (self.table.c.embedding.max_inner_product(query_embedding) + 1) / 2
+        return 1 / (1 + self._distance(query_embedding))
+
+    def hybrid_search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Hybrid search over the nearest neighbours found through the vector index."""
+        if not 0 <= self.vector_score_weight <= 1:
+            raise ValueError("vector_score_weight must be between 0 and 1")
+        query_embedding = self.embedder.get_embedding(query)
+        if query_embedding is None:
+            logger.error(f"Error getting embedding for Query: {query}")
+            return []
+
+        # ORDER BY distance LIMIT n is what the HNSW/IVFFlat index can serve
+        candidates = self._nearest(query_embedding, max(self.hybrid_candidates, limit), filters).cte("candidates")
+
+        processed_query = self.enable_prefix_matching(query) if self.prefix_match else query
+        ts_query = func.websearch_to_tsquery(self.content_language, bindparam("query", value=processed_query))
+        text_rank = func.ts_rank_cd(func.to_tsvector(self.content_language, self.table.c.content), ts_query)
+        hybrid_score = (
+            self.vector_score_weight * self._vector_score(query_embedding)
+            + (1 - self.vector_score_weight) * text_rank
+        )
+        stmt = (
+            select(
+                self.table.c.id,
+                self.table.c.name,
+                self.table.c.meta_data,
+                self.table.c.content,
+                self.table.c.embedding,
+                self.table.c.usage,
+                hybrid_score.label("hybrid_score"),
+            )
+            .where(self.table.c.id.in_(select(candidates.c.id)))
+            .order_by(desc("hybrid_score"))
+            .limit(limit)
+        )
+        log_debug(f"Hybrid search query: {stmt}")
+
+        try:
+            with self.Session() as sess, sess.begin():
+                self._apply_search_params(sess)
+                results = sess.execute(stmt).fetchall()
+        except Exception as e:
+            logger.error(f"Error performing hybrid search: {e}")
+            return []
+
+        search_results = self._documents(results)
+        if self.reranker:
+            search_results = self.reranker.rerank(query=query, documents=search_results)
+        return search_results
+
+    def nearest_ids(self, query_embedding: Sequence[float], limit: int = 10, exact: bool = False) -> List[str]:
+        """Ids of the nearest rows, through the index or (`exact`) with a sequential scan."""
+        if exact:
+            stmt = select(self.table.c.id).order_by(self._distance(query_embedding)).limit(limit)
+        else:
+            stmt = self._nearest(query_embedding, limit)
+        with self.Session() as sess, sess.begin():
+            if exact:
+                sess.execute(text("SET LOCAL enable_indexscan = off"))
+                sess.execute(text("SET LOCAL enable_bitmapscan = off"))
+            else:
+                self._apply_search_params(sess)
+            return [row.id for row in sess.execute(stmt)]
+
+    def _index_definition(self, name: str) -> str:
+        operator_class = OPERATOR_CLASSES.get(self.distance, "cosine_ops")
+        if self.quantization == "binary":
+            column = f"(binary_quantize(embedding)::bit({self.dimensions})) bit_hamming_ops"
+        elif self.quantization == "halfvec":
+            column = f"(embedding::halfvec({self.dimensions})) halfvec_{operator_class}"
+        else:
+            column = f"embedding vector_{operator_class}"
+        if isinstance(self.vector_index, Ivfflat):
+            lists = self.vector_index.lists
+            if self.vector_index.dynamic_lists:
+                # pgvector's guidance: rows / 1000 up to 1M rows, sqrt(rows) above
+                rows = self.get_count()
+                lists = max(int(rows / 1000), 1) if rows < 1_000_000 else max(int(sqrt(rows)), 1)
+            return (
+                f'"{name}" ON {self.table.fullname} USING ivfflat ({column}) '
+                f"WITH (lists = {int(lists)})"
+            )
+        return (
+            f'"{name}" ON {self.table.fullname} USING hnsw ({column}) '
+            f"WITH (m = {int(self.vector_index.m)}, ef_construction = {int(self.vector_index.ef_construction)})"
+        )
+
+    def create_index(self, rebuild: bool = False, concurrently: bool = True) -> None:
+        """Create the vector index, or rebuild it when `rebuild` and it already exists.
+
+        With `concurrently`, the index is built with CREATE INDEX CONCURRENTLY under a
+        temporary name and swapped in, so the table stays readable and writable.
+        """
+        if self.vector_index is None:
+            log_info("No vector index configured")
+            return
+        name = self.vector_index.name
+        exists = self._index_exists(name)
+        if exists and not rebuild:
+            log_info(f"Vector index '{name}' already exists")
+            return
+
+        build_name = f"{name}_rebuild" if exists else name
+        concurrently_sql = "CONCURRENTLY " if concurrently else ""
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        with self.db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            for key, value in self.vector_index.configuration.items():
+                connection.execute(text("SELECT set_config(:key, :value, false)"), {"key": key, "value": str(value)})
+            connection.execute(text(f'DROP INDEX {concurrently_sql}IF EXISTS "{self.schema}"."{build_name}"'))
+            log_info(f"Building vector index '{build_name}' on {self.table.fullname}")
+            connection.execute(text(f"CREATE INDEX {concurrently_sql}{self._index_definition(build_name)}"))
+            if exists:
+                connection.execute(text(f'DROP INDEX {concurrently_sql}"{self.schema}"."{name}"'))
+                connection.execute(text(f'ALTER INDEX "{self.schema}"."{build_name}" RENAME TO "{name}"'))
+        log_info(f"Vector index '{name}' is ready")
+
+    def drop_index(self) -> None:
+        if self.vector_index is not None:
+            self._drop_index(self.vector_index.name)
+
+    def index_info(self) -> List[Dict[str, Any]]:
+        """Name, definition and size of every index of the table."""
+        with self.Session() as sess, sess.begin():
+            rows = sess.execute(
+                text(
+                    "SELECT indexname, indexdef, pg_relation_size(format('%I.%I', schemaname, indexname)::regclass) "
+                    "AS bytes FROM pg_indexes WHERE schemaname = :schema AND tablename = :table"
+                ),
+                {"schema": self.schema, "table": self.table_name},
+            )
+            return [{"name": row.indexname, "definition": row.indexdef, "bytes": row.bytes} for row in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the vector index of the documents table")
+    parser.add_argument("--create", action="store_true", help="Create the index configured by PGVECTOR_* variables")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index if it already exists")
+    parser.add_argument("--drop", action="store_true")
+    parser.add_argument("--info", action="store_true")
+    args = parser.parse_args()
+
+    from agents.rag_agent import vector_db
+
+    if not isinstance(vector_db, IndexedPgVector):
+        raise SystemExit("agents.rag_agent is not configured with PgVector (VECTOR_DB=local?)")
+    if args.drop:
+        vector_db.drop_index()
+    if args.create:
+        vector_db.create_index(rebuild=args.rebuild)
+    if args.info or not (args.create or args.drop):
+        print(f"Configured index: {vector_db.vector_index!r}")
+        for index in vector_db.index_info():
+            print(f"{index['name']:<40} {index['bytes'] / 2**20:9.1f} MiB  {index['definition']}")
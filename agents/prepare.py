@@ -1,54 +1,251 @@
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance
+from qdrant_client.models import PointStruct, SetPayload, SetPayloadOperation, VectorParams, VectorParamsDiff, Distance
 from dotenv import dotenv_values
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 import glob
+import hashlib
 import os
-from langchain_text_splitters import SpacyTextSplitter
+import uuid
+from collections import deque
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import SpacyTextSplitter, TextSplitter
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_qdrant import QdrantVectorStore
+
+from agents.dedup import Deduplicator, dedup_chunks
+from agents.embedding_cache import EmbeddingCache
+from agents.ja_chunking import JapaneseSentenceSplitter
+from agents.quantization import qdrant_quantization_config
 
 config = dotenv_values(".env")
 
-def load_documents(directory="data"):
-    """Load documents from a directory of PDF files."""
-    pdf_files = glob.glob(os.path.join(directory, "*.PDF"))
-    documents = []
+# Namespace of the deterministic point ids, changing it re-keys the whole collection
+POINT_ID_NAMESPACE = uuid.UUID("6f1c4f3e-2b7a-4d0e-9a51-3c8e0b7d2a94")
+
+# Text splitter of the current worker process, created once by _init_worker
+_text_splitter = None
+
+
+class JapaneseTextSplitter(TextSplitter):
+    """LangChain splitter packing whole Japanese sentences, see agents/ja_chunking.py.
+
+    Needs only fugashi and unidic-lite instead of the spaCy ja_core_news_lg pipeline.
+    `length_function` is ignored, sizes are measured in characters or fugashi tokens (`unit`).
+    """
+
+    def __init__(self, chunk_size: int = 4000, chunk_overlap: int = 200, unit: str = "chars", **kwargs):
+        super().__init__(chunk_size=chunk_size, chunk_overlap=chunk_overlap, **kwargs)
+        self._splitter = JapaneseSentenceSplitter(chunk_size=chunk_size, overlap=chunk_overlap, unit=unit)
+
+    def split_text(self, text: str) -> List[str]:
+        return self._splitter.split_text(text)
+
+
+def _init_worker(pipeline: Optional[str]):
+    """Create the text splitter once per worker process instead of once per file.
+
+    `pipeline` names a spaCy pipeline to split with instead of the fugashi sentence splitter.
+    """
+    global _text_splitter
+    _text_splitter = SpacyTextSplitter(pipeline=pipeline) if pipeline else JapaneseTextSplitter()
+
+
+def _load_and_split(pdf_file: str) -> List[Document]:
+    """Parse one PDF and split it into chunks (runs in a worker process)."""
+    documents = PyMuPDFLoader(pdf_file).load()
+    return _text_splitter.split_documents(documents)
+
+
+def find_pdf_files(directory: str) -> List[str]:
+    """List the PDF files of a directory, whatever the case of the extension."""
+    return sorted(f for f in glob.glob(os.path.join(directory, "*")) if f.lower().endswith(".pdf"))
+
+
+def iter_file_chunks(
+    pdf_files: List[str],
+    max_workers: Optional[int] = None,
+    pipeline: Optional[str] = None,
+) -> Iterator[Document]:
+    """Parse and split PDF files in a process pool, yielding chunks as a stream.
+
+    Chunks are yielded file by file in `pdf_files` order, whatever order the workers
+    finish in: the deduplication keeps the first chunk of every group and derives
+    its point id from it, so the same files always give the same points. At most
+    two files per worker are in flight, so memory stays bounded when the consumer
+    (e.g. embedding) is slower than parsing.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(pipeline,)) as executor:
+        pending = deque()
+        remaining = iter(pdf_files)
+        while True:
+            for pdf_file in islice(remaining, 2 * max_workers - len(pending)):
+                pending.append((pdf_file, executor.submit(_load_and_split, pdf_file)))
+            if not pending:
+                break
+
+            pdf_file, future = pending.popleft()
+            try:
+                chunks = future.result()
+            except Exception as e:
+                print(f"Error loading {pdf_file}: {e}")
+                continue
+            print(f"Loaded document: {pdf_file} ({len(chunks)} chunks)")
+            yield from chunks
+
 
-    for pdf_file in pdf_files:
-        try:
-            loader = PyMuPDFLoader(pdf_file)
-            documents.extend(loader.load())
-            print(f"Loaded document: {pdf_file}")
-        except Exception as e:
-            print(f"Error loading {pdf_file}: {e}")
+def iter_chunks(
+    directory: str = "data",
+    max_workers: Optional[int] = None,
+    pipeline: Optional[str] = None,
+) -> Iterator[Document]:
+    """Stream the chunks of every PDF in a directory, see `iter_file_chunks`."""
+    return iter_file_chunks(find_pdf_files(directory), max_workers=max_workers, pipeline=pipeline)
 
-    # Split documents into chunks
-    text_splitter = SpacyTextSplitter(pipeline="ja_core_news_lg")
 
-    chunks = text_splitter.split_documents(documents)
+def load_documents(directory="data", max_workers: Optional[int] = None):
+    """Load documents from a directory of PDF files."""
+    chunks = list(iter_chunks(directory, max_workers=max_workers))
     print(f"Created {len(chunks)} document chunks")
     return chunks
 
-client = QdrantClient(url=config["QDRANT_URL"])
-embeddings = HuggingFaceEmbeddings(model_name="cl-nagoya/sup-simcse-ja-base")
 
-if not client.collection_exists(config["QDRANT_COLLECTION_NAME"]):
-    client.create_collection(
-        collection_name=config["QDRANT_COLLECTION_NAME"],
-        vectors_config=VectorParams(size=768, distance=Distance.COSINE),
-    )
+class CachedEmbeddings(Embeddings):
+    """LangChain embeddings that check the persistent EmbeddingCache before the model."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        cached = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if not missing:
+            return cached
+        computed = dict(zip(missing, self.embeddings.embed_documents(missing)))
+        self.cache.put_many(missing, [computed[text] for text in missing])
+        return [vector if vector is not None else computed[text] for text, vector in zip(texts, cached)]
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(text, vector)
+        return vector
+
+
+def point_id(chunk: Document) -> str:
+    """Deterministic point id from the chunk's file, page and content hash.
+
+    Re-running ingestion overwrites the same points instead of duplicating them.
+    """
+    content_hash = hashlib.sha256(chunk.page_content.encode()).hexdigest()
+    source = os.path.basename(str(chunk.metadata.get("source", "")))
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{source}:{chunk.metadata.get('page', '')}:{content_hash}"))
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
 
-docs = load_documents("simple/data")
+def upsert_chunks(
+    client: QdrantClient,
+    collection_name: str,
+    chunks: Iterable[Document],
+    embeddings: Embeddings,
+    batch_size: int = 64,
+    max_in_flight: int = 4,
+) -> int:
+    """Embed a stream of chunks in fixed-size batches and upsert them into Qdrant.
 
-docsearch = QdrantVectorStore.from_documents(
-    docs,
-    embeddings,
-    url=config["QDRANT_URL"],
-    api_key=config["QDRANT_API_KEY"],
-    collection_name=config["QDRANT_COLLECTION_NAME"],
-    prefer_grpc=True,
-    force_recreate=not client.collection_exists(config["QDRANT_COLLECTION_NAME"]),
-)
+    Embedding runs in the calling thread while at most `max_in_flight` upserts are
+    sent in the background, so only a few batches of chunks and vectors are ever
+    held in memory. The payload layout matches langchain_qdrant's QdrantVectorStore
+    ("page_content" and "metadata"), so the collection can be queried through it.
+
+    Returns:
+        The number of points upserted.
+    """
+    total = 0
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        in_flight = set()
+        for batch in batched(chunks, batch_size):
+            vectors = embeddings.embed_documents([chunk.page_content for chunk in batch])
+            points = [
+                PointStruct(
+                    id=point_id(chunk),
+                    vector=vector,
+                    payload={"page_content": chunk.page_content, "metadata": chunk.metadata},
+                )
+                for chunk, vector in zip(batch, vectors)
+            ]
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            in_flight.add(executor.submit(client.upsert, collection_name=collection_name, points=points, wait=True))
+            total += len(points)
+            print(f"Upserted {total} chunks")
+
+        for future in in_flight:
+            future.result()
+    return total
+
+
+def chunk_location(chunk: Document) -> dict:
+    return {"name": os.path.basename(str(chunk.metadata.get("source", ""))), "page": chunk.metadata.get("page")}
+
+
+def set_sources(client: QdrantClient, collection_name: str, deduplicator: Deduplicator, batch_size: int = 256) -> int:
+    """Write the locations of the collapsed duplicates into the kept points' metadata.sources.
+
+    Returns:
+        The number of points updated.
+    """
+    operations = [
+        SetPayloadOperation(set_payload=SetPayload(payload={"sources": sources}, points=[key], key="metadata"))
+        for key, sources in deduplicator.locations.items()
+        if len(sources) > 1
+    ]
+    for batch in batched(operations, batch_size):
+        client.batch_update_points(collection_name=collection_name, update_operations=batch)
+    return len(operations)
+
+
+if __name__ == "__main__":
+    client = QdrantClient(url=config["QDRANT_URL"], api_key=config.get("QDRANT_API_KEY"), prefer_grpc=True)
+    embeddings = CachedEmbeddings(
+        HuggingFaceEmbeddings(model_name="cl-nagoya/sup-simcse-ja-base"),
+        EmbeddingCache(model_id="cl-nagoya/sup-simcse-ja-base", dimensions=768),
+    )
 
+    # "int8" or "binary": codes in RAM, original vectors on disk for rescoring.
+    # Query with agents.quantization.qdrant_search_params(...) to rescore the candidates.
+    quantization = config.get("QDRANT_QUANTIZATION") or None
+    if not client.collection_exists(config["QDRANT_COLLECTION_NAME"]):
+        client.create_collection(
+            collection_name=config["QDRANT_COLLECTION_NAME"],
+            vectors_config=VectorParams(size=768, distance=Distance.COSINE, on_disk=quantization is not None),
+            quantization_config=qdrant_quantization_config(quantization),
+        )
+    elif quantization:
+        client.update_collection(
+            collection_name=config["QDRANT_COLLECTION_NAME"],
+            vectors_config={"": VectorParamsDiff(on_disk=True)},
+            quantization_config=qdrant_quantization_config(quantization),
+        )
 
+    # Versions of the same document repeat most pages: embed one chunk per group of near-duplicates
+    deduplicator = Deduplicator(path=None, dimensions=768)
+    chunks = dedup_chunks(iter_chunks("simple/data"), deduplicator, key=point_id, location=chunk_location)
+    total = upsert_chunks(client, config["QDRANT_COLLECTION_NAME"], chunks, embeddings)
+    print(f"Ingested {total} document chunks")
+    updated = set_sources(client, config["QDRANT_COLLECTION_NAME"], deduplicator)
+    print(f"Deduplication: {deduplicator.stats}, sources of {updated} points updated")
+    print(f"Embedding cache: {embeddings.cache.stats()}")
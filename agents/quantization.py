@@ -0,0 +1,142 @@
+"""
+Quantized vector codes for compact retrieval indexes.
+
+- `ScalarQuantizer` ("int8"): one signed byte per dimension, 4x smaller than float32,
+- `BinaryQuantizer` ("binary"): one bit per dimension, 32x smaller.
+
+The codes are only used to find `limit * oversampling` candidates cheaply, which are
+then rescored with the full-precision vectors kept on disk (see `rescore`).
+`LocalVectorDb(quantization=...)` uses these quantizers. `IndexedPgVector` and the
+Qdrant collection in agents/prepare.py use the server-side equivalents, configured
+through the helpers at the bottom of this module.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+QUANTIZATIONS = ("int8", "binary")
+
+# Number of set bits of every byte value, for numpy versions without bitwise_count
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _POPCOUNT[values]
+
+
+class ScalarQuantizer:
+    """Per-dimension int8 quantization calibrated on the stored vectors."""
+
+    name = "int8"
+    dtype = np.int8
+
+    def __init__(self, low: Optional[np.ndarray] = None, high: Optional[np.ndarray] = None):
+        self.low = low
+        self.high = high
+
+    @staticmethod
+    def code_size(dimensions: int) -> int:
+        return dimensions
+
+    def fit(self, vectors: np.ndarray, quantile: float = 0.999) -> "ScalarQuantizer":
+        # Quantiles instead of min/max so a few outliers do not waste the 256 levels
+        self.low = np.quantile(vectors, 1 - quantile, axis=0).astype(np.float32)
+        self.high = np.quantile(vectors, quantile, axis=0).astype(np.float32)
+        self.high = np.where(self.high > self.low, self.high, self.low + 1e-6)
+        return self
+
+    @property
+    def scale(self) -> np.ndarray:
+        return (self.high - self.low) / 255
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.round((np.clip(vectors, self.low, self.high) - self.low) / self.scale) - 128
+        return codes.astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return (codes.astype(np.float32) + 128) * self.scale + self.low
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Approximate dot products: q . (scale * (c + 128) + low) = (q * scale) . c + const."""
+        weights = (query * self.scale).astype(np.float32)
+        offset = float(query @ (self.low + 128 * self.scale))
+        return codes.astype(np.float32) @ weights + offset
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"low": self.low, "high": self.high}
+
+
+class BinaryQuantizer:
+    """One bit per dimension (above or below the dimension's mean), compared by Hamming distance."""
+
+    name = "binary"
+    dtype = np.uint8
+
+    def __init__(self, threshold: Optional[np.ndarray] = None):
+        self.threshold = threshold
+
+    @staticmethod
+    def code_size(dimensions: int) -> int:
+        return (dimensions + 7) // 8
+
+    def fit(self, vectors: np.ndarray) -> "BinaryQuantizer":
+        self.threshold = vectors.mean(axis=0).astype(np.float32)
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.packbits(vectors > self.threshold, axis=-1)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Negated Hamming distance, higher is more similar."""
+        query_code = self.encode(query[None, :])[0]
+        return -_popcount(np.bitwise_xor(codes, query_code)).sum(axis=1, dtype=np.int32).astype(np.float32)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"threshold": self.threshold}
+
+
+def make_quantizer(quantization: str, state: Optional[Dict[str, np.ndarray]] = None):
+    if quantization == "int8":
+        return ScalarQuantizer(**(state or {}))
+    if quantization == "binary":
+        return BinaryQuantizer(**(state or {}))
+    raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+
+
+def rescore(candidates: np.ndarray, vectors: np.ndarray, query: np.ndarray, limit: int):
+    """Exact top-`limit` among candidate slots, reading only their full-precision vectors."""
+    candidates = np.sort(candidates)  # sequential reads from the memory map
+    scores = np.asarray(vectors[candidates]) @ query
+    top = np.argsort(-scores)[:limit]
+    return candidates[top], scores[top]
+
+
+def qdrant_quantization_config(quantization: Optional[str]):
+    """Qdrant quantization config: codes in RAM, original vectors on disk for rescoring."""
+    from qdrant_client.models import (
+        BinaryQuantization,
+        BinaryQuantizationConfig,
+        ScalarQuantization,
+        ScalarQuantizationConfig,
+        ScalarType,
+    )
+
+    if not quantization:
+        return None
+    if quantization == "int8":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    if quantization == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+
+
+def qdrant_search_params(quantization: Optional[str], oversampling: float = 3.0):
+    """Search params that query the codes and rescore the candidates with the original vectors."""
+    from qdrant_client.models import QuantizationSearchParams, SearchParams
+
+    if not quantization:
+        return None
+    return SearchParams(quantization=QuantizationSearchParams(rescore=True, oversampling=oversampling))
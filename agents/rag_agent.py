@@ -1,10 +1,18 @@
-from agno.agent import Agent
 from agno.models.openai import OpenAIChat
 from agno.knowledge.pdf import PDFKnowledgeBase
-from agno.vectordb.pgvector import PgVector, SearchType
-from agno.document.chunking.fixed import FixedSizeChunking
-from agno.embedder.sentence_transformer import SentenceTransformerEmbedder
+from agno.vectordb.pgvector import SearchType
 from agno.models.ollama import Ollama
+from agents.bm25_index import BM25Index, HybridRetriever
+from agents.answer_cache import AnswerCache, CachedAnswerAgent
+from agents.context_compression import ContextCompressor
+from agents.dedup import Deduplicator
+from agents.embedder import LazySentenceTransformerEmbedder
+from agents.embedding_cache import EmbeddingCache
+from agents.embedding_service import EmbeddingServiceEmbedder
+from agents.ja_chunking import JapaneseSentenceChunking
+from agents.onnx_embedder import OnnxEmbedder
+from agents.local_vectordb import IVF, LocalVectorDb
+from agents.pgvector_index import IndexedPgVector, vector_index_from_env
 from textwrap import dedent
 from dotenv import load_dotenv
 import os
@@ -13,30 +21,94 @@ load_dotenv(override=True)
 
 db_url = "postgresql+psycopg://ai:ai@localhost:5532/ai"
 
-embedder = SentenceTransformerEmbedder(
-    id="cl-nagoya/sup-simcse-ja-base",
-    dimensions=768
-)
+# Share one model across worker processes: python -m agents.embedding_service --port 8100
+if os.getenv("EMBEDDING_SERVICE_URL"):
+    embedder = EmbeddingServiceEmbedder(
+        url=os.getenv("EMBEDDING_SERVICE_URL"),
+        id="cl-nagoya/sup-simcse-ja-base",
+        dimensions=768,
+        cache=EmbeddingCache(model_id="cl-nagoya/sup-simcse-ja-base", dimensions=768),
+    )
+elif os.getenv("EMBEDDING_BACKEND") == "onnx":
+    # Exported with: python -m agents.onnx_embedder --out tmp/onnx/sup-simcse-ja-base
+    quantized = os.getenv("EMBEDDING_QUANTIZED", "true") == "true"
+    embedder = OnnxEmbedder(
+        id="cl-nagoya/sup-simcse-ja-base",
+        dimensions=768,
+        model_dir="tmp/onnx/sup-simcse-ja-base",
+        quantized=quantized,
+        # ONNX vectors drift from the PyTorch ones (int8 the most), they are cached apart
+        cache=EmbeddingCache(
+            model_id=f"cl-nagoya/sup-simcse-ja-base@onnx-{'int8' if quantized else 'fp32'}", dimensions=768
+        ),
+    )
+else:
+    # The SimCSE model is only loaded when the first text is embedded, concurrent
+    # queries in this process are batched together
+    embedder = LazySentenceTransformerEmbedder(
+        id="cl-nagoya/sup-simcse-ja-base",
+        dimensions=768,
+        cache=EmbeddingCache(model_id="cl-nagoya/sup-simcse-ja-base", dimensions=768),
+        batching=True,
+    )
 
-vector_db = PgVector(
-    table_name="documents", 
-    db_url=db_url, 
-    search_type=SearchType.hybrid, 
-    embedder=embedder,
-)
+if os.getenv("VECTOR_DB") == "local":
+    # Single-node deployments: in-process index, no Postgres needed
+    vector_db = LocalVectorDb(
+        collection="documents",
+        path="tmp/local_vectordb",
+        embedder=embedder,
+        vector_index=IVF(lists=256, probes=16),
+        # "int8" or "binary": search compact codes, rescore with the float32 vectors on disk
+        quantization=os.getenv("LOCAL_VECTORDB_QUANTIZATION") or None,
+    )
+else:
+    # Index settings come from PGVECTOR_* variables, build it with: python -m agents.pgvector_index --create
+    vector_db = IndexedPgVector(
+        table_name="documents", 
+        db_url=db_url, 
+        search_type=SearchType.hybrid, 
+        embedder=embedder,
+        vector_index=vector_index_from_env(),
+        # "halfvec" or "binary": index quantized vectors, rescore with the full ones
+        quantization=os.getenv("PGVECTOR_QUANTIZATION") or None,
+    )
 
 knowledge_base = PDFKnowledgeBase(
     path="agents/data",
     vector_db=vector_db,
     num_documents=10,
-    chunking_strategy=FixedSizeChunking(
+    # Whole sentences packed up to 200 characters, sharing up to 50 characters of sentences
+    chunking_strategy=JapaneseSentenceChunking(
         chunk_size=200, 
         overlap=50, 
     )
 )
 # knowledge_base.load(recreate=True)
+# Incremental alternative, only embeds new or changed chunks: python -m agents.knowledge_sync
+
+# Japanese BM25 keyword index, fused with the vector results by reciprocal rank fusion.
+# Kept up to date by agents.knowledge_sync, (re)build it with: python -m agents.bm25_index --rebuild
+keyword_index = BM25Index(path="tmp/bm25_index.npz")
+# The PDFs are versions of the same document: agents.knowledge_sync embeds one chunk per group of
+# near-duplicates and records the other locations, reported as meta_data["sources"] of the results
+deduplicator = Deduplicator(path="tmp/dedup_index.npz", dimensions=768)
+# Re-score, merge adjacent and drop redundant chunks, then keep CONTEXT_TOKEN_BUDGET tokens of references
+compressor = ContextCompressor(token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500")), embedder=embedder)
+retriever = HybridRetriever(knowledge_base, keyword_index, deduplicator=deduplicator, compressor=compressor)
+
+# Answers of similar questions (cosine >= ANSWER_CACHE_THRESHOLD) are reused for a day,
+# agents.knowledge_sync drops the ones built on re-ingested documents
+answer_cache = AnswerCache(
+    embedder=embedder,
+    path="tmp/answer_cache.db",
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.9")),
+    ttl_seconds=24 * 3600,
+    max_entries=1000,
+)
 
-internal_document_agent = Agent(
+# References are added as compact, unescaped JSON (json.dumps would escape every Japanese character)
+internal_document_agent = CachedAnswerAgent(
     name="Internal Document Agent",
     model=OpenAIChat(id="gpt-4o-mini", api_key=os.getenv("OPENAI_API_KEY")) if os.getenv("LOCAL_MODEL") == "false" else Ollama(id="llama3.2:latest"),
     instructions=dedent("""\
@@ -46,8 +118,10 @@ internal_document_agent = Agent(
     Note: You have to answer directly to the question and don't give any other information.
     """),
     knowledge=knowledge_base,
+    retriever=retriever,
     add_references=True,
     search_knowledge=False,
     debug_mode=True,
+    answer_cache=answer_cache,
 )
 # internal_document_agent.print_response("入札書の提出場所どころですか")
@@ -0,0 +1,191 @@
+"""
+Benchmark of the direct article extraction against the scraper agent of the news
+report workflow, on saved HTML pages.
+
+- direct: workflows/article_extraction.py, newspaper4k + deterministic markdown,
+- agent:  an LLM agent with the instructions and response model of
+          GenerateNewsReport.article_scraper, whose Newspaper4k-style tool reads the
+          saved page instead of the network (--agent, needs phidata and Ollama).
+
+For every page the report shows the extraction time, the words and markdown
+structure (headings, list items, links) of the content and, with --agent, the agent
+time, its output tokens and the share of the direct content words found in the agent
+content. Pages the direct path rejects (consent walls, empty bodies) fall back to the
+agent in the workflow.
+
+    python benchmarks/article_extraction_benchmark.py
+    python benchmarks/article_extraction_benchmark.py --agent --model qwen2.5:7b
+    python benchmarks/article_extraction_benchmark.py --save https://example.com/news/story.html
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import sys
+import time
+import urllib.request
+from typing import Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from workflows.article_extraction import extract_article  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "articles")
+_CANONICAL = re.compile(r'<link[^>]+rel="canonical"[^>]+href="([^"]+)"', re.IGNORECASE)
+_WORD = re.compile(r"\w+")
+
+
+def load_fixtures(directory):
+    """(name, url, html) of the saved pages, the url taken from their canonical link."""
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        match = _CANONICAL.search(html)
+        name = os.path.splitext(os.path.basename(path))[0]
+        fixtures.append((name, match.group(1) if match else f"https://fixtures.local/{name}", html))
+    return fixtures
+
+
+def save_pages(urls, directory):
+    os.makedirs(directory, exist_ok=True)
+    for url in urls:
+        request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            html = response.read().decode(response.headers.get_content_charset() or "utf-8", errors="replace")
+        if not _CANONICAL.search(html):
+            html = html.replace("<head>", f'<head>\n<link rel="canonical" href="{url}">', 1)
+        name = re.sub(r"[^0-9A-Za-z]+", "-", url.split("://", 1)[-1]).strip("-")[:80]
+        with open(os.path.join(directory, f"{name}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"Saved {url} to {name}.html")
+
+
+def structure(markdown: str):
+    lines = markdown.splitlines()
+    return {
+        "headings": sum(line.startswith("#") for line in lines),
+        "items": sum(bool(re.match(r"(?:- |\d+\. )", line)) for line in lines),
+        "links": len(re.findall(r"\]\(http", markdown)),
+    }
+
+
+def words(text: Optional[str]):
+    return _WORD.findall((text or "").lower())
+
+
+def build_agent(model: str, html_by_url):
+    """The workflow's scraper agent, with a read_article tool that parses the saved page."""
+    from newspaper import Article
+    from phi.agent import Agent
+    from phi.model.ollama import Ollama
+    from pydantic import BaseModel, Field
+
+    # Same schema as ScrapedArticle in workflows/news_report_generator.py
+    class ScrapedArticle(BaseModel):
+        title: str = Field(..., description="Title of the article.")
+        url: str = Field(..., description="Link to the article.")
+        summary: Optional[str] = Field(..., description="Summary of the article if available.")
+        content: Optional[str] = Field(
+            ...,
+            description="Content of the in markdown format if available. Return None if the content is not available or does not make sense.",
+        )
+
+    def read_article(url: str) -> str:
+        """Use this function to read an article from a URL.
+
+        Args:
+            url (str): The URL of the article.
+
+        Returns:
+            str: JSON containing the article author, publish date, and text.
+        """
+        article = Article(url)
+        article.download(input_html=html_by_url.get(url, ""))
+        article.parse()
+        data = {"title": article.title, "authors": article.authors, "description": article.meta_description, "text": article.text}
+        return json.dumps(data)
+
+    return Agent(
+        model=Ollama(id=model),
+        tools=[read_article],
+        instructions=[
+            "Given a url, scrape the article and return the title, url, and markdown formatted content.",
+            "If the content is not available or does not make sense, return None as the content.",
+        ],
+        response_model=ScrapedArticle,
+    )
+
+
+def output_tokens(response) -> int:
+    tokens = (response.metrics or {}).get("output_tokens", 0)
+    return sum(tokens) if isinstance(tokens, list) else int(tokens or 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES, help="Directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=5, help="Direct extractions per page")
+    parser.add_argument("--min-words", type=int, default=100)
+    parser.add_argument("--agent", action="store_true", help="Also run the scraper agent on every page")
+    parser.add_argument("--model", default="qwen2.5:7b", help="Ollama model of the scraper agent")
+    parser.add_argument("--save", nargs="+", metavar="URL", help="Download pages into --fixtures and exit")
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.save, args.fixtures)
+        return
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        sys.exit(f"No .html fixtures in {args.fixtures}")
+    # Imports newspaper4k and its tokenizers outside of the timings
+    extract_article(fixtures[0][1], html=fixtures[0][2], min_words=args.min_words)
+
+    agent = build_agent(args.model, {url: html for _, url, html in fixtures}) if args.agent else None
+    print(f"{len(fixtures)} pages of {args.fixtures}, direct extraction x {args.repeat}")
+    header = f"{'page':<32} {'direct ms':>9} {'words':>6} {'head':>4} {'items':>5} {'links':>5}"
+    if agent is not None:
+        header += f" {'agent s':>8} {'out tok':>7} {'words':>6} {'overlap':>7} {'speedup':>8}"
+    print(header)
+
+    direct_total, agent_total = 0.0, 0.0
+    for name, url, html in fixtures:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            extracted = extract_article(url, html=html, min_words=args.min_words)
+            timings.append(time.perf_counter() - start)
+        direct = statistics.median(timings)
+        direct_total += direct
+        row = f"{name[:32]:<32} {direct * 1000:>9.1f} "
+        if extracted is None:
+            row += f"{'fallback to the agent':>23}"
+        else:
+            counts = structure(extracted.content)
+            row += f"{len(words(extracted.content)):>6} {counts['headings']:>4} {counts['items']:>5} {counts['links']:>5}"
+
+        if agent is not None:
+            start = time.perf_counter()
+            response = agent.deep_copy().run(url)
+            seconds = time.perf_counter() - start
+            agent_total += seconds
+            content = getattr(response.content, "content", None)
+            agent_words = words(content)
+            overlap = len(set(words(extracted.content)) & set(agent_words)) / max(len(set(words(extracted.content))), 1) if extracted else 0.0
+            row += f" {seconds:>8.1f} {output_tokens(response):>7} {len(agent_words):>6} {overlap:>7.0%} {seconds / direct:>7.0f}x"
+        print(row)
+
+    summary = f"total: direct {direct_total * 1000:.0f} ms"
+    if agent is not None:
+        summary += f", agent {agent_total:.1f} s"
+    print(summary)
+    print("overlap: share of the direct content words found in the agent content")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Speed and chunk-quality benchmark of the Japanese chunking strategies.
+
+Splits the pages of the PDFs in agents/data with:
+
+- fixed:   agno FixedSizeChunking (character windows, previously used by agents/rag_agent.py),
+- fugashi: JapaneseSentenceChunking from agents/ja_chunking.py,
+- spacy:   LangChain SpacyTextSplitter with ja_core_news_lg (previously used by agents/prepare.py),
+           skipped when spaCy or the pipeline is not installed.
+
+Every strategy runs in a fresh interpreter, and the report shows the set-up time
+(imports, dictionary / pipeline loading), the splitting throughput, the peak memory,
+the chunk size distribution and the share of chunks that end mid-sentence (not on
+。！？ or a closing bracket; bullets and headings without a full stop count as cuts
+for every strategy).
+
+    python benchmarks/chunking_benchmark.py --chunk-size 200 --overlap 50 --repeat 5
+    python benchmarks/chunking_benchmark.py --chunk-size 4000 --overlap 200 --strategies fugashi spacy
+"""
+
+import argparse
+import glob
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STRATEGIES = ["fixed", "fugashi", "spacy"]
+SENTENCE_ENDS = "。！？!?｡」』）)】〉》〕］"
+
+
+def load_texts(directory):
+    from agno.document.reader.pdf_reader import PDFReader
+
+    reader = PDFReader(chunk=False)
+    pdf_files = sorted(glob.glob(os.path.join(directory, "*.pdf")))
+    return [page.content for pdf_file in pdf_files for page in reader.read(pdf=pdf_file)]
+
+
+def build(strategy, chunk_size, overlap):
+    """Splitting function of a strategy, with its models loaded."""
+    if strategy == "fixed":
+        from agno.document.base import Document
+        from agno.document.chunking.fixed import FixedSizeChunking
+
+        chunking = FixedSizeChunking(chunk_size=chunk_size, overlap=overlap)
+        return lambda text: [chunk.content for chunk in chunking.chunk(Document(content=text))]
+    if strategy == "fugashi":
+        from agents.ja_chunking import JapaneseSentenceSplitter
+
+        splitter = JapaneseSentenceSplitter(chunk_size=chunk_size, overlap=overlap)
+        splitter.split_text("辞書を読み込む。" * (chunk_size // 8 + 1))
+        return splitter.split_text
+    from langchain_text_splitters import SpacyTextSplitter
+
+    splitter = SpacyTextSplitter(pipeline="ja_core_news_lg", chunk_size=chunk_size, chunk_overlap=overlap)
+    return splitter.split_text
+
+
+def peak_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def run(args):
+    """Benchmark one strategy in this interpreter and print the results as JSON."""
+    texts = load_texts(args.directory) * args.repeat
+    rss_before = peak_rss_mib()
+    start = time.perf_counter()
+    try:
+        split = build(args.run, args.chunk_size, args.overlap)
+    except (ImportError, OSError) as e:
+        print(json.dumps({"error": f"{type(e).__name__}: {e}"}))
+        return
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pages = [split(text) for text in texts]
+    split_seconds = time.perf_counter() - start
+
+    sizes = [len(chunk) for chunks in pages for chunk in chunks]
+    # The last chunk of a page ends where the page ends
+    inner = [chunk.rstrip() for chunks in pages for chunk in chunks[:-1]]
+    print(
+        json.dumps(
+            {
+                "load_seconds": load_seconds,
+                "split_seconds": split_seconds,
+                "chars_per_second": sum(len(text) for text in texts) / split_seconds,
+                "rss_mib": peak_rss_mib(),
+                "rss_delta_mib": peak_rss_mib() - rss_before,
+                "chunks": len(sizes),
+                "mean_size": statistics.mean(sizes),
+                "cv_size": statistics.pstdev(sizes) / statistics.mean(sizes),
+                "small": sum(size < args.chunk_size / 4 for size in sizes) / len(sizes),
+                "oversize": sum(size > args.chunk_size for size in sizes) / len(sizes),
+                "mid_sentence": sum(not chunk or chunk[-1] not in SENTENCE_ENDS for chunk in inner) / max(len(inner), 1),
+                "stored_ratio": sum(sizes) / sum(len(text) for text in texts),
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directory", default=os.path.join(ROOT, "agents", "data"))
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5, help="Split the pages this many times")
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=STRATEGIES)
+    parser.add_argument("--run", choices=STRATEGIES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(args)
+        return
+
+    print(f"chunk_size={args.chunk_size} overlap={args.overlap}, pages of {args.directory} x {args.repeat}")
+    print(
+        f"{'strategy':<8} {'load s':>7} {'split s':>8} {'kchars/s':>9} {'RSS MiB':>8} {'+MiB':>6}  "
+        f"{'chunks':>6} {'mean':>6} {'cv':>5} {'<1/4':>6} {'>size':>6} {'mid-sent':>8} {'stored':>6}"
+    )
+    for strategy in args.strategies:
+        command = [sys.executable, os.path.abspath(__file__), "--run", strategy]
+        command += ["--directory", args.directory, "--chunk-size", str(args.chunk_size)]
+        command += ["--overlap", str(args.overlap), "--repeat", str(args.repeat)]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if "error" in result:
+            print(f"{strategy:<8} skipped: {result['error']}")
+            continue
+        print(
+            f"{strategy:<8} {result['load_seconds']:>7.2f} {result['split_seconds']:>8.3f} "
+            f"{result['chars_per_second'] / 1000:>9.0f} {result['rss_mib']:>8.0f} {result['rss_delta_mib']:>6.0f}  "
+            f"{result['chunks']:>6} {result['mean_size']:>6.0f} {result['cv_size']:>5.2f} {result['small']:>6.1%} "
+            f"{result['oversize']:>6.1%} {result['mid_sentence']:>8.1%} {result['stored_ratio']:>6.2f}"
+        )
+    print("cv: size stdev / mean; <1/4: chunks under a quarter of chunk_size; stored: chunk chars / source chars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Throughput / latency benchmark for the micro-batching engine in agents/embedding_service.py.
+
+Fires single-text embed calls from many concurrent clients (like concurrent playground
+queries) and reports requests/s, p50/p99 latency and the engine's batch-size metrics
+for each --max-wait-ms window. Without --model a simulated encoder with a fixed
+per-call overhead is used, so the effect of batching can be measured without torch.
+
+    python benchmarks/embedding_service_benchmark.py --clients 32 --max-wait-ms 0 2 5 10
+    python benchmarks/embedding_service_benchmark.py --model cl-nagoya/sup-simcse-ja-base
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agents.embedder import load_sentence_transformer  # noqa: E402
+from agents.embedding_service import BatchingEngine  # noqa: E402
+
+
+def simulated_encoder(call_ms: float, text_ms: float, dimensions: int = 768):
+    """Encoder whose cost is a fixed per-call overhead plus a per-text cost."""
+
+    def encode(texts):
+        time.sleep((call_ms + text_ms * len(texts)) / 1000)
+        return [[0.0] * dimensions for _ in texts]
+
+    return encode
+
+
+def model_encoder(model_id: str):
+    model = load_sentence_transformer(model_id)
+    return lambda texts: model.encode(texts, batch_size=len(texts)).tolist()
+
+
+def run(engine: BatchingEngine, clients: int, requests: int):
+    def call(i):
+        start = time.perf_counter()
+        engine.embed([f"入札書の提出場所はどこですか {i}"])
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        latencies = sorted(executor.map(call, range(requests)))
+    elapsed = time.perf_counter() - start
+    p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+    return requests / elapsed, statistics.median(latencies), p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Benchmark a real SentenceTransformer model instead of the simulation")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[0, 2, 5, 10])
+    parser.add_argument("--call-ms", type=float, default=20.0, help="Simulated per-call overhead")
+    parser.add_argument("--text-ms", type=float, default=1.0, help="Simulated per-text cost")
+    args = parser.parse_args()
+
+    encode = model_encoder(args.model) if args.model else simulated_encoder(args.call_ms, args.text_ms)
+    # Load the model, if any, before timing
+    encode(["warm up"])
+
+    for max_wait_ms in args.max_wait_ms:
+        engine = BatchingEngine(encode, max_batch_size=args.max_batch_size, max_wait_ms=max_wait_ms)
+        throughput, p50, p99 = run(engine, args.clients, args.requests)
+        metrics = engine.metrics()
+        print(
+            f"max_wait_ms={max_wait_ms:<5} {throughput:8.1f} req/s  p50={1000 * p50:7.1f}ms  p99={1000 * p99:7.1f}ms  "
+            f"batches={metrics['batches']:<4} avg_batch={metrics['avg_batch_size']:5.1f}  "
+            f"avg_queue_wait={metrics['avg_queue_wait_ms']:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Throughput benchmark for the PDF parsing and chunking stage in agents/prepare.py.
+
+Runs `iter_file_chunks` over the sample PDFs in agents/data with a single worker and
+with a process pool, and reports files/s and chunks/s for each.
+
+    python benchmarks/ingest_benchmark.py --workers 1 4 8 --repeat 3
+    python benchmarks/ingest_benchmark.py --pipeline ja_core_news_lg   # spaCy splitter
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agents.prepare import find_pdf_files, iter_file_chunks  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directory", default=os.path.join(ROOT, "agents", "data"))
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--repeat", type=int, default=3, help="Process the directory this many times per run")
+    parser.add_argument("--pipeline", default=None, help="spaCy pipeline instead of the fugashi sentence splitter")
+    args = parser.parse_args()
+
+    # Repeat the small sample set so the pool start-up cost is amortized
+    files = find_pdf_files(args.directory) * args.repeat
+    print(f"{len(files)} files ({args.repeat} x {len(files) // args.repeat} PDFs from {args.directory})")
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        chunks = sum(1 for _ in iter_file_chunks(files, max_workers=workers, pipeline=args.pipeline))
+        elapsed = time.perf_counter() - start
+        print(
+            f"workers={workers:<3} {elapsed:7.2f}s  "
+            f"{len(files) / elapsed:7.2f} files/s  {chunks / elapsed:8.1f} chunks/s  ({chunks} chunks)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Latency / recall benchmark of agents/local_vectordb.py against the PgVector hybrid search.
+
+Ingests the chunks of the PDFs in agents/data (FixedSizeChunking(200, 50), as in
+agents/rag_agent.py), padded with synthetic chunks up to --size, into LocalVectorDb
+(exact, IVF and HNSW when hnswlib is installed) and, with --db-url, into PgVector.
+Then reports p50/p99 search latency and recall@k against the exact cosine top-k.
+
+By default a cheap deterministic embedder producing clustered vectors is used so the
+benchmark runs anywhere; --embedder simcse uses the real model (and the embedding cache).
+
+    python benchmarks/local_vectordb_benchmark.py --size 50000 --queries 200
+    python benchmarks/local_vectordb_benchmark.py --embedder simcse --db-url postgresql+psycopg://ai:ai@localhost:5532/ai
+"""
+
+import argparse
+import hashlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agno.document import Document  # noqa: E402
+from agno.document.chunking.fixed import FixedSizeChunking  # noqa: E402
+from agno.document.reader.pdf_reader import PDFReader  # noqa: E402
+from agno.embedder.base import Embedder  # noqa: E402
+
+from agents.local_vectordb import HNSW, IVF, LocalVectorDb  # noqa: E402
+
+
+@dataclass
+class ClusteredHashEmbedder(Embedder):
+    """Deterministic text -> vector mapping with `clusters` well separated groups."""
+
+    dimensions: int = 768
+    clusters: int = 64
+
+    def get_embedding(self, text: str):
+        seed = int(hashlib.md5(text.encode()).hexdigest()[:16], 16)
+        rng = np.random.default_rng(seed)
+        center = np.random.default_rng(seed % self.clusters).normal(size=self.dimensions)
+        return (center + 0.5 * rng.normal(size=self.dimensions)).tolist()
+
+    def get_embeddings(self, texts):
+        return [self.get_embedding(text) for text in texts]
+
+    def get_embedding_and_usage(self, text: str):
+        return self.get_embedding(text), None
+
+
+def load_corpus(directory: str, size: int):
+    reader = PDFReader(chunk=True, chunking_strategy=FixedSizeChunking(chunk_size=200, overlap=50))
+    documents = []
+    for pdf in sorted(Path(directory).glob("*.pdf")):
+        documents.extend(reader.read(pdf=pdf))
+    for i in range(len(documents), size):
+        documents.append(Document(content=f"合成チャンク {i}", name="synthetic", id=f"synthetic_{i}"))
+    for i, document in enumerate(documents):
+        document.id = document.id or f"chunk_{i}"
+    return documents[:size] if size else documents
+
+
+def measure(search, queries, k):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([document.id for document in search(query, k)])
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+    return statistics.median(latencies), p99, results
+
+
+def recall(results, truth):
+    return statistics.mean(len(set(r) & set(t)) / max(len(t), 1) for r, t in zip(results, truth))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directory", default=os.path.join(ROOT, "agents", "data"))
+    parser.add_argument("--size", type=int, default=20000, help="Corpus size, padded with synthetic chunks")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--embedder", choices=["hash", "simcse"], default="hash")
+    parser.add_argument("--db-url", help="Also benchmark PgVector (hybrid and vector search) on this database")
+    args = parser.parse_args()
+
+    if args.embedder == "simcse":
+        from agents.embedder import LazySentenceTransformerEmbedder
+        from agents.embedding_cache import EmbeddingCache
+
+        embedder = LazySentenceTransformerEmbedder(
+            cache=EmbeddingCache(model_id="cl-nagoya/sup-simcse-ja-base", dimensions=768)
+        )
+    else:
+        embedder = ClusteredHashEmbedder()
+
+    documents = load_corpus(args.directory, args.size)
+    queries = [f"質問 {i}: {documents[i * 7 % len(documents)].content[:30]}" for i in range(args.queries)]
+    start = time.perf_counter()
+    vectors = np.asarray(embedder.get_embeddings([d.content for d in documents]), dtype=np.float32)
+    for document, vector in zip(documents, vectors):
+        document.embedding = vector.tolist()
+    # Warm the query embeddings so that latencies measure the search only
+    embedder.get_embeddings(queries)
+    print(f"{len(documents)} chunks, {args.queries} queries, embedded in {time.perf_counter() - start:.1f}s")
+
+    ids = np.array([d.id for d in documents])
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    truth = []
+    for query in queries:
+        q = np.asarray(embedder.get_embedding(query), dtype=np.float32)
+        truth.append(ids[np.argsort(-(normalized @ q))[: args.k]].tolist())
+
+    systems = [("local exact", None), ("local ivf", IVF(lists=int(4 * np.sqrt(len(documents))), probes=16, min_rows=0))]
+    try:
+        import hnswlib  # noqa: F401
+
+        systems.append(("local hnsw", HNSW(min_rows=0)))
+    except ImportError:
+        print("hnswlib is not installed, skipping HNSW")
+
+    with tempfile.TemporaryDirectory() as path:
+        for name, index in systems:
+            db = LocalVectorDb(collection=name.replace(" ", "_"), path=path, embedder=embedder, vector_index=index)
+            start = time.perf_counter()
+            db.upsert(documents)
+            db.optimize()
+            build = time.perf_counter() - start
+            p50, p99, results = measure(db.search, queries, args.k)
+            print(
+                f"{name:<16} build={build:6.2f}s  p50={1000 * p50:7.2f}ms  p99={1000 * p99:7.2f}ms  "
+                f"recall@{args.k}={recall(results, truth):.3f}"
+            )
+
+    if args.db_url:
+        from agno.vectordb.pgvector import PgVector, SearchType
+
+        db = PgVector(table_name="local_vectordb_benchmark", db_url=args.db_url, embedder=embedder)
+        db.drop()
+        db.create()
+        start = time.perf_counter()
+        db.upsert(documents)
+        build = time.perf_counter() - start
+        for search_type in [SearchType.vector, SearchType.hybrid]:
+            db.search_type = search_type
+            p50, p99, results = measure(db.search, queries, args.k)
+            print(
+                f"{'pgvector ' + search_type.value:<16} build={build:6.2f}s  p50={1000 * p50:7.2f}ms  "
+                f"p99={1000 * p99:7.2f}ms  recall@{args.k}={recall(results, truth):.3f}"
+            )
+        db.drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Parity check and throughput benchmark for agents/onnx_embedder.py.
+
+Embeds the same texts (chunks of the PDFs in agents/data, or built-in sample sentences)
+with the PyTorch SentenceTransformer model and with the exported ONNX graphs, then
+reports texts/s for each backend and the cosine similarity between the PyTorch and
+ONNX vectors of every text. Exits with status 1 when the worst cosine drift
+(1 - cosine) exceeds --max-drift-fp32 or --max-drift-int8.
+
+    python -m agents.onnx_embedder --out tmp/onnx/sup-simcse-ja-base
+    python benchmarks/onnx_embedder_benchmark.py --model-dir tmp/onnx/sup-simcse-ja-base
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agents.embedder import load_sentence_transformer  # noqa: E402
+from agents.onnx_embedder import INT8_MODEL, OnnxEmbedder  # noqa: E402
+
+SAMPLE_TEXTS = [
+    "入札書の提出場所はどこですか",
+    "契約保証金は免除されますか",
+    "提出期限までに書類を郵送してください。",
+    "本件に関する問い合わせは総務課までお願いします。",
+    "落札者は契約締結後に履行保証を提出すること。",
+]
+
+
+def load_texts(directory: str, limit: int):
+    """`limit` distinct fixed-size chunks of the sample PDFs, falling back to the built-in sentences.
+
+    The embedders skip repeated texts, so every text is unique: when there are not
+    enough chunks, numbered variants of them are added.
+    """
+    texts = []
+    try:
+        from pypdf import PdfReader
+
+        for path in sorted(glob.glob(os.path.join(directory, "*.pdf"))):
+            for page in PdfReader(path).pages:
+                content = (page.extract_text() or "").replace("\n", "")
+                texts.extend(content[i : i + 200] for i in range(0, len(content), 200) if content[i : i + 200].strip())
+    except ImportError:
+        pass
+    texts = list(dict.fromkeys(texts or SAMPLE_TEXTS))
+    unique = texts[:limit]
+    for n in range(1, limit // len(texts) + 1):
+        unique.extend(f"{text}（{n}）" for text in texts[: limit - len(unique)])
+    return unique
+
+
+def timed(encode, texts):
+    start = time.perf_counter()
+    vectors = np.asarray(encode(texts), dtype=np.float32)
+    return vectors, len(texts) / (time.perf_counter() - start)
+
+
+def cosines(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="cl-nagoya/sup-simcse-ja-base")
+    parser.add_argument("--model-dir", default=os.path.join(ROOT, "tmp", "onnx", "sup-simcse-ja-base"))
+    parser.add_argument("--directory", default=os.path.join(ROOT, "agents", "data"))
+    parser.add_argument("--texts", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-drift-fp32", type=float, default=1e-4)
+    parser.add_argument("--max-drift-int8", type=float, default=0.02)
+    args = parser.parse_args()
+
+    texts = load_texts(args.directory, args.texts)
+    print(f"{len(texts)} texts, {len(set(texts))} unique")
+
+    model = load_sentence_transformer(args.model)
+    reference, throughput = timed(lambda t: model.encode(t, batch_size=args.batch_size), texts)
+    print(f"{'pytorch fp32':<14} {throughput:8.1f} texts/s")
+
+    backends = [("onnx fp32", False, args.max_drift_fp32)]
+    if os.path.exists(os.path.join(args.model_dir, INT8_MODEL)):
+        backends.append(("onnx int8", True, args.max_drift_int8))
+
+    failed = False
+    for name, quantized, max_drift in backends:
+        embedder = OnnxEmbedder(
+            id=args.model,
+            dimensions=reference.shape[1],
+            model_dir=args.model_dir,
+            quantized=quantized,
+            batch_size=args.batch_size,
+        )
+        embedder.get_embeddings(texts[:1])  # load the session outside the timing
+        vectors, throughput = timed(embedder.get_embeddings, texts)
+        similarity = cosines(reference, vectors)
+        drift = float(1 - similarity.min())
+        status = "ok" if drift <= max_drift else f"FAIL (> {max_drift})"
+        print(
+            f"{name:<14} {throughput:8.1f} texts/s  "
+            f"cosine min={similarity.min():.5f} mean={similarity.mean():.5f}  drift={drift:.5f} {status}"
+        )
+        failed |= drift > max_drift
+
+    if failed:
+        print("❌ ONNX embeddings drift too far from the PyTorch model")
+        sys.exit(1)
+    print("✅ ONNX embeddings match the PyTorch model")
+
+
+if __name__ == "__main__":
+    main()
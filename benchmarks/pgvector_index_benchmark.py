@@ -0,0 +1,130 @@
+"""
+Recall / latency benchmark of the PgVector ANN indexes managed by agents/pgvector_index.py.
+
+Loads the chunks built from agents/data (FixedSizeChunking(200, 50), padded with
+synthetic chunks up to --size) into a scratch table, computes the exact top-k of
+every query with a sequential scan, then for each index (HNSW, IVFFlat) and each
+query-time setting (ef_search, probes) reports recall@k and p50/p99 latency of the
+vector search and of the index-backed hybrid search (recall against PgVector's
+sequential-scan hybrid search).
+
+    python benchmarks/pgvector_index_benchmark.py --db-url postgresql+psycopg://ai:ai@localhost:5532/ai
+    python benchmarks/pgvector_index_benchmark.py --size 1000000 --ef-search 20 40 100 --probes 1 10 30
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agno.vectordb.pgvector import PgVector, SearchType  # noqa: E402
+from agno.vectordb.pgvector.index import HNSW, Ivfflat  # noqa: E402
+
+from agents.pgvector_index import IndexedPgVector  # noqa: E402
+from local_vectordb_benchmark import ClusteredHashEmbedder, load_corpus  # noqa: E402
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies), latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+
+
+def recall(results, truth):
+    return statistics.mean(len(set(r) & set(t)) / max(len(t), 1) for r, t in zip(results, truth))
+
+
+def run(search, queries):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        latencies.append(time.perf_counter() - start)
+    return results, percentiles(latencies)
+
+
+def report(label, results, truth, latencies, k):
+    p50, p99 = latencies
+    print(f"  {label:<28} recall@{k}={recall(results, truth):.3f}  p50={1000 * p50:7.2f}ms  p99={1000 * p99:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default="postgresql+psycopg://ai:ai@localhost:5532/ai")
+    parser.add_argument("--directory", default=os.path.join(ROOT, "agents", "data"))
+    parser.add_argument("--size", type=int, default=50000, help="Corpus size, padded with synthetic chunks")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--embedder", choices=["hash", "simcse"], default="hash")
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=64)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 20, 40, 100])
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch table")
+    args = parser.parse_args()
+
+    if args.embedder == "simcse":
+        from agents.embedder import LazySentenceTransformerEmbedder
+        from agents.embedding_cache import EmbeddingCache
+
+        embedder = LazySentenceTransformerEmbedder(
+            cache=EmbeddingCache(model_id="cl-nagoya/sup-simcse-ja-base", dimensions=768)
+        )
+    else:
+        embedder = ClusteredHashEmbedder()
+
+    documents = load_corpus(args.directory, args.size)
+    queries = [f"質問 {i}: {documents[i * 7 % len(documents)].content[:30]}" for i in range(args.queries)]
+    query_embeddings = embedder.get_embeddings(queries)
+
+    db = IndexedPgVector(
+        table_name="pgvector_index_benchmark",
+        db_url=args.db_url,
+        embedder=embedder,
+        search_type=SearchType.hybrid,
+        vector_index=None,
+    )
+    db.drop()
+    db.create()
+    start = time.perf_counter()
+    for i in range(0, len(documents), 1000):
+        db.insert(documents[i : i + 1000])
+    print(f"Inserted {len(documents)} chunks in {time.perf_counter() - start:.1f}s, {args.queries} queries")
+
+    # Ground truth: sequential scans, no index exists yet
+    truth, latencies = run(lambda e: db.nearest_ids(e, args.k, exact=True), query_embeddings)
+    report("exact vector (seq scan)", truth, truth, latencies, args.k)
+    baseline = PgVector(
+        table_name="pgvector_index_benchmark", db_url=args.db_url, embedder=embedder, search_type=SearchType.hybrid
+    )
+    hybrid_truth, latencies = run(lambda q: [d.id for d in baseline.hybrid_search(q, args.k)], queries)
+    report("PgVector hybrid (seq scan)", hybrid_truth, hybrid_truth, latencies, args.k)
+
+    indexes = [
+        (HNSW(m=args.m, ef_construction=args.ef_construction), "ef_search", args.ef_search),
+        (Ivfflat(probes=1), "probes", args.probes),
+    ]
+    for index, parameter, values in indexes:
+        index.name = f"pgvector_index_benchmark_{type(index).__name__.lower()}"
+        db.vector_index = index
+        start = time.perf_counter()
+        db.create_index(concurrently=False)
+        size = next(i["bytes"] for i in db.index_info() if i["name"] == index.name)
+        print(f"{type(index).__name__}: built in {time.perf_counter() - start:.1f}s, {size / 2**20:.1f} MiB")
+        for value in values:
+            db.set_search_params(**{parameter: value})
+            results, latencies = run(lambda e: db.nearest_ids(e, args.k), query_embeddings)
+            report(f"vector  {parameter}={value}", results, truth, latencies, args.k)
+            results, latencies = run(lambda q: [d.id for d in db.hybrid_search(q, args.k)], queries)
+            report(f"hybrid  {parameter}={value}", results, hybrid_truth, latencies, args.k)
+        db.drop_index()
+
+    if not args.keep:
+        db.drop()
+
+
+if __name__ == "__main__":
+    main()
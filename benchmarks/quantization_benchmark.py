@@ -0,0 +1,112 @@
+"""
+Memory and recall report for the quantized vector codes in agents/quantization.py.
+
+Embeds the chunks of the PDFs in agents/data (FixedSizeChunking(200, 50), padded with
+synthetic chunks up to --size) and, for float32, halfvec (PgVector), int8 and binary
+codes, reports the in-memory index size and recall@k against the exact float32
+search, both on the codes alone and after rescoring `k * oversampling` candidates
+with the full-precision vectors.
+
+    python benchmarks/quantization_benchmark.py --size 100000 --oversampling 1 2 4 8
+    python benchmarks/quantization_benchmark.py --embedder simcse
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agents.quantization import BinaryQuantizer, ScalarQuantizer, rescore  # noqa: E402
+from local_vectordb_benchmark import ClusteredHashEmbedder, load_corpus  # noqa: E402
+
+
+class HalfQuantizer:
+    """float16 copy, what PgVector's halfvec expression index stores."""
+
+    dtype = np.float16
+
+    def fit(self, vectors):
+        return self
+
+    def encode(self, vectors):
+        return vectors.astype(np.float16)
+
+    def scores(self, codes, query):
+        return codes.astype(np.float32) @ query
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directory", default=os.path.join(ROOT, "agents", "data"))
+    parser.add_argument("--size", type=int, default=50000, help="Corpus size, padded with synthetic chunks")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--oversampling", type=float, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--embedder", choices=["hash", "simcse"], default="hash")
+    args = parser.parse_args()
+
+    if args.embedder == "simcse":
+        from agents.embedder import LazySentenceTransformerEmbedder
+        from agents.embedding_cache import EmbeddingCache
+
+        embedder = LazySentenceTransformerEmbedder(
+            cache=EmbeddingCache(model_id="cl-nagoya/sup-simcse-ja-base", dimensions=768)
+        )
+    else:
+        embedder = ClusteredHashEmbedder()
+
+    documents = load_corpus(args.directory, args.size)
+    texts = [d.content for d in documents]
+    vectors = np.asarray(embedder.get_embeddings(texts), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = np.asarray(
+        embedder.get_embeddings([f"質問 {i}: {texts[i * 7 % len(texts)][:30]}" for i in range(args.queries)]),
+        dtype=np.float32,
+    )
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = [set(np.argsort(-(vectors @ q))[: args.k]) for q in queries]
+    count, dimensions = vectors.shape
+    text_bytes = sum(len(t.encode()) for t in texts)
+    print(f"{count} chunks x {dimensions} dims, {args.queries} queries, chunk text {text_bytes / 2**20:.1f} MiB")
+
+    header = f"{'codes':<8} {'bytes/vec':>9} {'index MiB':>10} {'ratio':>6}  {'codes only':>10}  "
+    header += "  ".join(f"{'x' + format(o, 'g'):>6}" for o in args.oversampling) + f"  {'ms/query':>8}"
+    print(header)
+    print(f"{'float32':<8} {4 * dimensions:>9} {vectors.nbytes / 2**20:>10.1f} {1:>6.1f}  {1:>10.3f}")
+
+    for name, quantizer in [("halfvec", HalfQuantizer()), ("int8", ScalarQuantizer()), ("binary", BinaryQuantizer())]:
+        quantizer.fit(vectors)
+        codes = quantizer.encode(vectors)
+        recalls = {}
+        latencies = []
+        for oversampling in [1.0] + args.oversampling:
+            hits = []
+            for q, expected in zip(queries, truth):
+                start = time.perf_counter()
+                approximate = quantizer.scores(codes, q)
+                shortlist = np.argpartition(-approximate, int(args.k * oversampling) - 1)[: int(args.k * oversampling)]
+                if oversampling == 1.0 and not recalls:
+                    # Codes only: rank the shortlist by the approximate scores
+                    found = shortlist[np.argsort(-approximate[shortlist])][: args.k]
+                else:
+                    found, _ = rescore(shortlist, vectors, q, args.k)
+                latencies.append(time.perf_counter() - start)
+                hits.append(len(set(found) & expected) / args.k)
+            recalls[oversampling if recalls else "codes"] = statistics.mean(hits)
+        print(
+            f"{name:<8} {codes.nbytes // count:>9} {codes.nbytes / 2**20:>10.1f} {vectors.nbytes / codes.nbytes:>6.1f}  "
+            f"{recalls['codes']:>10.3f}  "
+            + "  ".join(f"{recalls[o]:>6.3f}" for o in args.oversampling)
+            + f"  {1000 * statistics.median(latencies):>8.2f}"
+        )
+    print("recall@k against exact float32 search; xN = rescoring k*N candidates with the float32 vectors")
+
+
+if __name__ == "__main__":
+    main()
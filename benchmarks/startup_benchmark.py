@@ -0,0 +1,117 @@
+"""
+Startup / import-time benchmark for the playground.
+
+Imports `playground` in fresh interpreters and reports the wall time plus the
+slowest modules from `python -X importtime`. Exits with status 1 when the
+median import time exceeds --max-seconds or when a heavy module (torch,
+sentence_transformers, agno, ...) is imported at boot, so regressions are caught.
+
+    python benchmarks/startup_benchmark.py --runs 5 --max-seconds 1.0
+    python benchmarks/startup_benchmark.py --build   # also time building every entry
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported just by booting a worker
+HEAVY_MODULES = ["agno", "torch", "sentence_transformers", "sqlalchemy", "openai", "ollama"]
+
+CHECK_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import playground
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed)
+print(",".join(heavy))
+"""
+
+BUILD_SCRIPT = """
+import time
+from registry import registry
+for name in registry.names():
+    try:
+        registry.get(name)
+        print(f"{name}\\t{registry.build_times[name]:.3f}")
+    except Exception as e:
+        print(f"{name}\\tfailed: {e}")
+"""
+
+
+def time_import(python: str):
+    """Import playground in a fresh interpreter, return (seconds, heavy modules)."""
+    output = subprocess.run(
+        [python, "-c", CHECK_SCRIPT.format(heavy=HEAVY_MODULES)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split("\n")
+    return float(output[0]), [m for m in output[1].split(",") if m]
+
+
+def slowest_imports(python: str, top: int = 10):
+    """Return the `top` slowest modules (cumulative microseconds) from -X importtime."""
+    stderr = subprocess.run(
+        [python, "-X", "importtime", "-c", "import playground"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative), module))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=1.0)
+    parser.add_argument("--build", action="store_true", help="Also time building every registered entry")
+    args = parser.parse_args()
+
+    timings = []
+    heavy = []
+    for _ in range(args.runs):
+        elapsed, heavy = time_import(sys.executable)
+        timings.append(elapsed)
+
+    median = statistics.median(timings)
+    print(f"import playground: median {median * 1000:.1f} ms, min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms over {args.runs} runs")
+    print("Slowest imports (cumulative):")
+    for cumulative, module in slowest_imports(sys.executable):
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+    if args.build:
+        print("Build time per entry:")
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", BUILD_SCRIPT], cwd=ROOT, capture_output=True, text=True).stdout
+        for line in output.splitlines():
+            print(f"  {line}")
+        print(f"  total {time.perf_counter() - start:.2f}s")
+
+    failed = False
+    if median > args.max_seconds:
+        print(f"❌ Median import time {median:.2f}s exceeds budget of {args.max_seconds:.2f}s")
+        failed = True
+    if heavy:
+        print(f"❌ Heavy modules imported at boot: {', '.join(heavy)}")
+        failed = True
+    if not failed:
+        print("✅ Startup within budget")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
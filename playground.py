@@ -1,18 +1,58 @@
-from agno.playground import Playground, serve_playground_app
-from teams.discussion_team import discussion_team
-from teams.news_agency_team import news_agency_team
-from teams.multi_language_team import multi_language_team
-from agents.rag_agent import internal_document_agent
-from agents.calendar_agent import calendar_agent        
-from agents.web_search_agent import web_search_agent
-from workflows.employee_recruiter_workflow import employee_recruiter_workflow
-
-
-app = Playground(
-    agents=[internal_document_agent, calendar_agent, web_search_agent],
-    teams=[discussion_team, multi_language_team],
-    workflows=[employee_recruiter_workflow],
-).get_app()
+import asyncio
+import os
+import threading
+
+from registry import registry
+
+
+class LazyPlaygroundApp:
+    """ASGI app that builds the agno Playground on the first request.
+
+    Importing this module only records factories in the registry, so a worker
+    boots without importing agno or building any agent. Set PLAYGROUND_PREWARM=true
+    to build everything in a background thread as soon as the worker starts.
+    """
+
+    def __init__(self, prewarm: bool = False):
+        self.prewarm = prewarm
+        self._app = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    from agno.playground import Playground
+
+                    self._app = Playground(
+                        agents=registry.materialize("agent"),
+                        teams=registry.materialize("team"),
+                        workflows=registry.materialize("workflow"),
+                    ).get_app()
+        return self._app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        app = self._app or await asyncio.to_thread(self.build)
+        await app(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if self.prewarm:
+                    threading.Thread(target=self.build, name="playground-prewarm", daemon=True).start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+app = LazyPlaygroundApp(prewarm=os.getenv("PLAYGROUND_PREWARM") == "true")
 
 if __name__ == "__main__":
+    from agno.playground import serve_playground_app
+
     serve_playground_app("playground:app", reload=True)
@@ -0,0 +1,118 @@
+"""
+Lazy registry of the agents, teams and workflows served by the playground.
+
+Entries are recorded as factories ("module:attribute" import paths or callables)
+and are only materialized the first time they are requested, so importing this
+module does not import agno, build any model client or load any embedding model.
+"""
+
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+Factory = Union[str, Callable[[], Any]]
+
+KINDS = ("agent", "team", "workflow")
+
+
+class Registry:
+    """Records factories and builds each agent, team or workflow on first request."""
+
+    def __init__(self):
+        self._factories: Dict[str, Factory] = {}
+        self._kinds: Dict[str, str] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.build_times: Dict[str, float] = {}
+
+    def register(self, kind: str, name: str, factory: Factory) -> None:
+        """Record a factory for an agent, team or workflow without building it."""
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind '{kind}', expected one of {KINDS}")
+        with self._lock:
+            self._factories[name] = factory
+            self._kinds[name] = kind
+            self._locks[name] = threading.Lock()
+            self._instances.pop(name, None)
+
+    def agent(self, name: str, factory: Factory) -> None:
+        self.register("agent", name, factory)
+
+    def team(self, name: str, factory: Factory) -> None:
+        self.register("team", name, factory)
+
+    def workflow(self, name: str, factory: Factory) -> None:
+        self.register("workflow", name, factory)
+
+    def names(self, kind: Optional[str] = None) -> List[str]:
+        return [name for name, k in self._kinds.items() if kind is None or k == kind]
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    def get(self, name: str) -> Any:
+        """Return the instance for `name`, building it on first request."""
+        if name in self._instances:
+            return self._instances[name]
+        if name not in self._factories:
+            raise KeyError(f"'{name}' is not registered")
+
+        # One lock per entry so two threads never build the same entry twice,
+        # while unrelated entries can still be built concurrently.
+        with self._locks[name]:
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._build(self._factories[name])
+                self.build_times[name] = time.perf_counter() - start
+                logger.info(f"Built {self._kinds[name]} '{name}' in {self.build_times[name]:.2f}s")
+        return self._instances[name]
+
+    def materialize(self, kind: str) -> List[Any]:
+        """Build (if needed) and return every registered entry of one kind."""
+        return [self.get(name) for name in self.names(kind)]
+
+    def prewarm(
+        self, names: Optional[Iterable[str]] = None, background: bool = True
+    ) -> Optional[threading.Thread]:
+        """Build entries ahead of the first request, optionally in a daemon thread."""
+        targets = list(names) if names is not None else self.names()
+
+        def _warm():
+            for name in targets:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.warning(f"Could not pre-warm '{name}': {e}")
+
+        if not background:
+            _warm()
+            return None
+        thread = threading.Thread(target=_warm, name="registry-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _build(factory: Factory) -> Any:
+        if callable(factory):
+            return factory()
+        module_name, _, attribute = factory.partition(":")
+        module = importlib.import_module(module_name)
+        return getattr(module, attribute) if attribute else module
+
+
+registry = Registry()
+
+registry.agent("internal_document_agent", "agents.rag_agent:internal_document_agent")
+registry.agent("calendar_agent", "agents.calendar_agent:calendar_agent")
+registry.agent("web_search_agent", "agents.web_search_agent:web_search_agent")
+registry.team("discussion_team", "teams.discussion_team:discussion_team")
+registry.team("multi_language_team", "teams.multi_language_team:multi_language_team")
+registry.workflow(
+    "employee_recruiter_workflow",
+    "workflows.employee_recruiter_workflow:employee_recruiter_workflow",
+)
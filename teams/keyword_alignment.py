@@ -0,0 +1,158 @@
+"""
+Deterministic alignment pre-pass for keyword extraction.
+
+Aligns 処理名称 against 基準名称 (longest common subsequence, with `#` standing
+for any number) and returns everything that is not part of the alignment as
+bracketed unimportant parts, split at punctuation. Each result carries a
+confidence so that only ambiguous rows need to be sent to the Extractor agent.
+"""
+
+import re
+from typing import List, Tuple
+
+from pydantic import BaseModel, Field
+
+# Separators between unimportant parts; `_` is kept inside words (see [#EXP_J])
+PUNCTUATION = set("-+~.・･,、。/／()（）[]［］「」 　")
+
+_NUMBER = re.compile(r"[0-9０-９]+|#")
+
+
+class AlignmentResult(BaseModel):
+    unimportant_parts: str = Field(..., description="Unimportant parts in brackets like [part1][part2]")
+    confidence: float = Field(..., description="0.0 (must be checked by the LLM) to 1.0 (mechanical)")
+
+
+def _units(text: str) -> Tuple[List[str], List[str]]:
+    """Split text into alignment units; a number or `#` becomes a single `#` unit.
+
+    Returns the comparison keys and the original text of every unit.
+    """
+    keys, originals = [], []
+    position = 0
+    for match in _NUMBER.finditer(text):
+        for char in text[position : match.start()]:
+            keys.append(char)
+            originals.append(char)
+        keys.append("#")
+        originals.append(match.group())
+        position = match.end()
+    for char in text[position:]:
+        keys.append(char)
+        originals.append(char)
+    return keys, originals
+
+
+def _script(char: str) -> str:
+    if "一" <= char <= "鿿" or "぀" <= char <= "ゟ" or char == "々":
+        return "kanji"
+    if "゠" <= char <= "ヿ" or "ｦ" <= char <= "ﾟ":
+        return "katakana"
+    return "other"
+
+
+def _lcs_matches(a: List[str], b: List[str], rightmost: bool = False) -> List[int]:
+    """Indices of `a` matched by a longest common subsequence with `b`.
+
+    With rightmost=False each unit of `b` is matched as early as possible in `a`,
+    with rightmost=True as late as possible. Differing results mean the
+    alignment is ambiguous.
+    """
+    if rightmost:
+        n = len(a)
+        return sorted(n - 1 - i for i in _lcs_matches(a[::-1], b[::-1]))
+
+    n, m = len(a), len(b)
+    # suffix[i][j] = LCS length of a[i:] and b[j:]
+    suffix = [[0] * (m + 1) for _ in range(n + 1)]
+    for i in range(n - 1, -1, -1):
+        row, below = suffix[i], suffix[i + 1]
+        for j in range(m - 1, -1, -1):
+            if a[i] == b[j]:
+                row[j] = below[j + 1] + 1
+            else:
+                row[j] = row[j + 1] if row[j + 1] > below[j] else below[j]
+
+    matched = []
+    i = j = 0
+    while i < n and j < m:
+        if a[i] == b[j] and suffix[i][j] == suffix[i + 1][j + 1] + 1:
+            matched.append(i)
+            i += 1
+            j += 1
+        elif suffix[i + 1][j] >= suffix[i][j + 1]:
+            i += 1
+        else:
+            j += 1
+    return matched
+
+
+def _blocks(indices: List[int]) -> List[Tuple[int, int]]:
+    """Group sorted indices into contiguous [start, end) blocks."""
+    blocks: List[Tuple[int, int]] = []
+    for i in indices:
+        if blocks and blocks[-1][1] == i:
+            blocks[-1] = (blocks[-1][0], i + 1)
+        else:
+            blocks.append((i, i + 1))
+    return blocks
+
+
+def align_unimportant_parts(processed: str, standard: str) -> AlignmentResult:
+    """Compute the bracketed unimportant parts of `processed` relative to `standard`."""
+    processed, standard = str(processed).strip(), str(standard).strip()
+    keys, originals = _units(processed)
+    standard_keys, _ = _units(standard)
+
+    matched = _lcs_matches(keys, standard_keys)
+    if len(matched) < len(standard_keys):
+        # Part of 基準名称 is missing or reordered, e.g. ｸﾘｱﾗｯｶｰ塗り(CL) → CL塗り
+        return AlignmentResult(unimportant_parts="", confidence=0.0)
+
+    confidence = 1.0
+    if matched != _lcs_matches(keys, standard_keys, rightmost=True):
+        # The same 基準名称 characters can be taken from more than one place
+        confidence -= 0.5
+
+    blocks = _blocks(matched)
+    confidence -= 0.15 * max(0, len(blocks) - 1)
+    for start, end in blocks:
+        # A single matched character inside an unmatched word (窓 in 換気窓付) is
+        # more likely a coincidence than the important term
+        embedded = (
+            0 < start
+            and end < len(keys)
+            and start - 1 not in matched
+            and end not in matched
+            and _script(keys[start - 1]) == _script(keys[start]) == _script(keys[end]) != "other"
+        )
+        if end - start == 1 and embedded:
+            confidence -= 0.4
+
+    # Collect the unmatched runs and split them at punctuation
+    matched_set = set(matched)
+    parts: List[str] = []
+    current = ""
+    for i, original in enumerate(originals):
+        if i in matched_set or original in PUNCTUATION:
+            if current:
+                parts.append(current)
+            current = ""
+        else:
+            current += original
+    if current:
+        parts.append(current)
+
+    for part in parts:
+        # A script change after kanji/katakana (欄間ｶﾞﾗﾘ → [欄間][ｶﾞﾗﾘ], 階段H袖 → [階段][H袖])
+        # or a long kanji run (小窓付片開) usually means several words, and where
+        # to split them needs the LLM's judgement. Prefixes such as #m超 or EV枠 are fine.
+        scripts = [_script(char) for char in part]
+        boundaries = sum(1 for x, y in zip(scripts, scripts[1:]) if x != y and x != "other")
+        boundaries += len(re.findall(r"(?:kanji){5,}", "".join(scripts)))
+        confidence -= 0.3 * boundaries
+
+    return AlignmentResult(
+        unimportant_parts="".join(f"[{part}]" for part in parts),
+        confidence=round(max(0.0, confidence), 2),
+    )
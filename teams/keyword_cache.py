@@ -0,0 +1,78 @@
+"""
+Persistent cache of keyword extraction results.
+
+Results are stored in SQLite keyed on the normalized (処理名称, 基準名称) pair,
+so a pair answered by the Extractor once is never sent to the model again,
+in the same run or in any later run over other files.
+
+Every answer is stored under a namespace, the model id and a hash of the prompts
+(see `KeywordExtractor.cache_namespace`): answers of another model or prompt are
+never served, and `prune()` deletes them.
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+
+def normalize_pair(processed: str, standard: str) -> Tuple[str, str]:
+    """Normalize a pair for cache lookup: trim and collapse whitespace.
+
+    Character width is kept as is (ﾃﾗｽ and テラス stay different), because the
+    cached unimportant parts are copied verbatim into the output.
+    """
+    return " ".join(str(processed).split()), " ".join(str(standard).split())
+
+
+class KeywordCache:
+    def __init__(self, path: str = "tmp/keyword_cache.db", namespace: str = "default"):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.namespace = namespace
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS keyword_answers (
+                namespace TEXT NOT NULL,
+                processed TEXT NOT NULL,
+                standard TEXT NOT NULL,
+                unimportant_parts TEXT NOT NULL,
+                PRIMARY KEY (namespace, processed, standard)
+            )"""
+        )
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """Look up normalized pairs, returning only the ones found in the cache."""
+        pairs = list(pairs)
+        found: Dict[Tuple[str, str], str] = {}
+        # Stay below SQLite's limit on bound parameters
+        for start in range(0, len(pairs), 400):
+            batch = pairs[start : start + 400]
+            conditions = " OR ".join(["(processed = ? AND standard = ?)"] * len(batch))
+            rows = self.connection.execute(
+                f"SELECT processed, standard, unimportant_parts FROM keyword_answers WHERE namespace = ? AND ({conditions})",
+                [self.namespace] + [value for pair in batch for value in pair],
+            )
+            found.update({(processed, standard): parts for processed, standard, parts in rows})
+        self.hits += len(found)
+        self.misses += len(pairs) - len(found)
+        return found
+
+    def put_many(self, results: Dict[Tuple[str, str], str]):
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO keyword_answers (namespace, processed, standard, unimportant_parts) VALUES (?, ?, ?, ?)",
+            [(self.namespace, processed, standard, parts) for (processed, standard), parts in results.items()],
+        )
+        self.connection.commit()
+
+    def prune(self) -> int:
+        """Delete the answers of other models and prompts, returns how many were deleted."""
+        deleted = self.connection.execute("DELETE FROM keyword_answers WHERE namespace != ?", (self.namespace,)).rowcount
+        self.connection.commit()
+        return deleted
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -1,13 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+import hashlib
+import os
+import re
+import threading
+import time
 import pandas as pd
 from agno.agent import Agent
 from agno.models.openai.chat import OpenAIChat
 from agno.models.ollama import Ollama
 from dotenv import dotenv_values
-from typing import List
+from typing import Dict, List, Optional, Set, Tuple
 from pydantic import BaseModel, Field
 from tqdm import tqdm
 
+from teams.keyword_alignment import AlignmentResult, align_unimportant_parts
+from teams.keyword_cache import KeywordCache, normalize_pair
+
 config = dotenv_values(".env")
 
 # Define more detailed example patterns for training
@@ -38,6 +47,36 @@ Important terms in different positions:
 """
 
 
+INSTRUCTIONS = [
+    "Given a pair of original text (名称) and standardized text (基準名称):",
+    "1. Identify ALL parts that were removed or changed in the standardization process",
+    "2. Put each unimportant part in brackets like [part1][part2][part3]",
+    "3. Break down unimportant parts into meaningful chunks/words, not individual characters",
+    "4. Separate words at punctuation marks like -, +, ~, _, ., etc.",
+    "5. When # appears in 基準名称, it represents any number in the original text",
+    "6. For cases with prefixes like AW-, SD-, etc., handle them as separate parts",
+    "7. Pay attention to where the important terms appear - the unimportant parts can be before, within, or after the important terms",
+    "8. Return ONLY the unimportant parts in brackets, nothing else - no explanations",
+    "9. Use the provided examples as a guide for extraction",
+    EXAMPLES,
+]
+
+BATCH_INSTRUCTIONS = [
+    "You will receive several numbered pairs in one request.",
+    "Return exactly one item per pair, with the index of the pair and its unimportant parts.",
+    "Handle every pair independently, exactly as you would handle it alone.",
+]
+
+# A valid answer is zero or more non-empty bracketed parts
+UNIMPORTANT_PARTS_PATTERN = re.compile(r"^(\[[^\[\]]+\])*$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one token per Japanese character, one per 4 other characters."""
+    japanese = sum(1 for char in text if char >= "\u3000")
+    return japanese + (len(text) - japanese) // 4 + 1
+
+
 # Define Pydantic models for structured data
 class KeywordPair(BaseModel):
     processed: str = Field(..., description="Processed text (処理名称)")
@@ -51,54 +90,94 @@ class ExtractedKeyword(BaseModel):
     )
 
 
+class BatchKeywordItem(BaseModel):
+    index: int = Field(..., description="Index of the pair in the request")
+    unimportant_parts: str = Field(
+        ...,
+        description="The unimportant parts of this pair, with each part in brackets like [part1][part2]",
+    )
+
+
+class ExtractedKeywordBatch(BaseModel):
+    items: List[BatchKeywordItem] = Field(..., description="One item per pair in the request")
+
+
 class KeywordResult(BaseModel):
+    行番号: int = Field(..., description="Record number of the row in the input file, from 0")
     名称: str = Field(..., description="Original text")
     処理名称: str = Field(..., description="Processed text")
     基準名称: str = Field(..., description="Standardized text")
     不要部分: str = Field(..., description="Unimportant parts extracted, in brackets")
+    信頼度: Optional[float] = Field(
+        None, description="Confidence of the alignment pre-pass, empty when extracted by the Extractor agent"
+    )
 
 
 class KeywordExtractor:
-    def __init__(self, input_file: str, output_file: str):
-        self.extractor = Agent(
+    def __init__(
+        self,
+        input_file: str,
+        output_file: str,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 2.0,
+        alignment_threshold: Optional[float] = 0.8,
+        batch_size: int = 1,
+        context_window: int = 8192,
+        cache_file: Optional[str] = "tmp/keyword_cache.db",
+        model_id: str = "gemma3:12b",
+    ):
+        self.model_id = model_id
+        self.extractor = self._build_extractor()
+        self.input_file = input_file
+        self.output_file = output_file
+        # Number of rows sent to Ollama in parallel (1 = sequential)
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        # Rows the alignment pre-pass resolves with at least this confidence skip
+        # the Extractor agent (None = send every row to the LLM)
+        self.alignment_threshold = alignment_threshold
+        # Maximum number of pairs packed into one request (1 = one pair per request);
+        # batches are shrunk further so the prompt and answer fit in context_window
+        self.batch_size = max(1, batch_size)
+        self.context_window = context_window
+        # Extractor answers are cached on disk across runs (None = no cache), per model and prompt
+        self.cache = KeywordCache(cache_file, namespace=self.cache_namespace()) if cache_file else None
+        self._local = threading.local()
+        self.stats: Dict[str, int] = {}
+
+    def _build_extractor(self, batch: bool = False) -> Agent:
+        return Agent(
             name="Extractor",
             role="Extracts unimportant parts from text pairs",
-            model=Ollama(id="gemma3:12b"),
+            model=Ollama(id=self.model_id),
             description="You analyze pairs of original and standardized Japanese text to identify unimportant parts",
-            instructions=[
-                "Given a pair of original text (名称) and standardized text (基準名称):",
-                "1. Identify ALL parts that were removed or changed in the standardization process",
-                "2. Put each unimportant part in brackets like [part1][part2][part3]",
-                "3. Break down unimportant parts into meaningful chunks/words, not individual characters",
-                "4. Separate words at punctuation marks like -, +, ~, _, ., etc.",
-                "5. When # appears in 基準名称, it represents any number in the original text",
-                "6. For cases with prefixes like AW-, SD-, etc., handle them as separate parts",
-                "7. Pay attention to where the important terms appear - the unimportant parts can be before, within, or after the important terms",
-                "8. Return ONLY the unimportant parts in brackets, nothing else - no explanations",
-                "9. Use the provided examples as a guide for extraction",
-                EXAMPLES,
-            ],
-            response_model=ExtractedKeyword,
+            instructions=INSTRUCTIONS + BATCH_INSTRUCTIONS if batch else INSTRUCTIONS,
+            response_model=ExtractedKeywordBatch if batch else ExtractedKeyword,
         )
-        self.input_file = input_file
-        self.output_file = output_file
-
-    def process_file(self):
-        # Read input CSV
-        df = pd.read_csv(self.input_file)
-        results = []
 
-        # Process each row
-        for idx, row in tqdm(df.iterrows(), total=len(df)):
-            original = row["名称"] if "名称" in row else row["keyword"]
-            standard = row["基準名称"]
-            processed = row["処理名称"]
+    def _get_extractor(self, batch: bool = False) -> Agent:
+        """Agents keep per-run state, so every worker thread gets its own Extractor."""
+        if self.max_workers == 1 and not batch:
+            return self.extractor
+        name = "batch_extractor" if batch else "extractor"
+        if not hasattr(self._local, name):
+            setattr(self._local, name, self._build_extractor(batch=batch))
+        return getattr(self._local, name)
 
-            # Create structured input
-            keyword_input = KeywordPair(processed=processed, standard=standard)
+    def cache_namespace(self) -> str:
+        """Model id and a hash of the prompts: changing either starts from an empty cache."""
+        prompts = "\n".join(
+            INSTRUCTIONS
+            + BATCH_INSTRUCTIONS
+            + [self.build_prompt("{processed}", "{standard}"), self.build_batch_prompt([KeywordPair(processed="{processed}", standard="{standard}")])]
+        )
+        return f"{self.model_id}:{hashlib.sha256(prompts.encode()).hexdigest()[:12]}"
 
-            # Get extractor response with structured output
-            prompt = f"""Extract unimportant parts from:
+    @staticmethod
+    def build_prompt(processed: str, standard: str) -> str:
+        return f"""Extract unimportant parts from:
 名称: {processed}
 基準名称: {standard}
 
@@ -114,31 +193,343 @@ Important notes:
 Examples:
 'E-#EXP_J~EV枠取合ﾊﾟﾈﾙ' with important part '取合ﾊﾟﾈﾙ' → '[E][#EXP_J][EV枠]'
 'HWCｽﾃﾝﾚｽ面台' with important part 'WC面台' → '[H][ｽﾃﾝﾚｽ]'"""
-            response = self.extractor.run(prompt)
 
-            # The response.content is already structured as ExtractedKeyword
-            extracted = response.content
+    @staticmethod
+    def build_batch_prompt(pairs: List[KeywordPair]) -> str:
+        lines = "\n".join(
+            f"{i}. 名称: {pair.processed} | 基準名称: {pair.standard}" for i, pair in enumerate(pairs)
+        )
+        return f"""Extract unimportant parts from each of the following {len(pairs)} pairs:
+{lines}
+
+For every pair, identify ALL unimportant parts and put each part in brackets like [part1][part2].
+When # appears in 基準名称, it represents any number in the original.
+Separate words at punctuation marks like -, +, ~, _, ., etc.
+Return one item per pair with its index (0 to {len(pairs) - 1})."""
+
+    def make_batches(self, indices: List[int], pairs: List[KeywordPair]) -> List[List[int]]:
+        """Pack pair indices into batches of at most `batch_size` that fit the context window."""
+        if self.batch_size == 1:
+            return [[i] for i in indices]
+
+        # The instructions and examples are sent once per request, a quarter of the
+        # window is kept free for the response schema and the model's own overhead
+        prefix = estimate_tokens("\n".join(INSTRUCTIONS + BATCH_INSTRUCTIONS))
+        prefix += estimate_tokens(self.build_batch_prompt([]))
+        budget = max(self.context_window * 3 // 4 - prefix, 0)
+
+        batches: List[List[int]] = []
+        batch: List[int] = []
+        used = 0
+        for i in indices:
+            pair = pairs[i]
+            # Input line plus the JSON item the model answers with
+            cost = estimate_tokens(f"{i}. 名称: {pair.processed} | 基準名称: {pair.standard}")
+            cost += estimate_tokens(pair.processed) + 15
+            if batch and (len(batch) == self.batch_size or used + cost > budget):
+                batches.append(batch)
+                batch, used = [], 0
+            batch.append(i)
+            used += cost
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def extract_batch(self, pairs: List[KeywordPair], attempt: int = 0) -> Dict[int, str]:
+        """Ask the Extractor for several pairs in one request.
+
+        Items are validated one at a time; only valid items are returned, keyed by
+        their position in `pairs`, so the caller can re-queue the rest.
+        """
+        if attempt:
+            time.sleep(self.retry_backoff ** (attempt - 1))
+        response = self._get_extractor(batch=True).run(self.build_batch_prompt(pairs))
+        if not isinstance(response.content, ExtractedKeywordBatch):
+            raise ValueError(f"Invalid response type: {type(response.content).__name__}")
+
+        valid: Dict[int, str] = {}
+        for item in response.content.items:
+            parts = item.unimportant_parts.strip()
+            if 0 <= item.index < len(pairs) and item.index not in valid and UNIMPORTANT_PARTS_PATTERN.match(parts):
+                valid[item.index] = parts
+        return valid
+
+    def extract(self, pair: KeywordPair) -> str:
+        """Ask the Extractor for one pair, retrying with exponential backoff."""
+        prompt = self.build_prompt(pair.processed, pair.standard)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._get_extractor().run(prompt)
+                # The response.content is already structured as ExtractedKeyword
+                if not isinstance(response.content, ExtractedKeyword):
+                    raise ValueError(f"Invalid response type: {type(response.content).__name__}")
+                # Validated like the batch items, an invalid answer is retried and never cached
+                parts = response.content.unimportant_parts.strip()
+                if not UNIMPORTANT_PARTS_PATTERN.match(parts):
+                    raise ValueError(f"Invalid unimportant parts: {parts!r}")
+                return parts
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff**attempt
+                tqdm.write(f"Retry {attempt + 1}/{self.max_retries} for '{pair.processed}' in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    def extract_all(self, pairs: List[KeywordPair], desc: Optional[str] = None) -> List[Optional[str]]:
+        """Extract every pair with at most `max_workers` requests in flight.
+
+        With batch_size > 1 pairs are sent in batches; items missing or invalid in
+        a batch answer are re-queued in new batches, and after `max_retries`
+        rounds each leftover pair is asked on its own. Results are returned in
+        input order; pairs that still fail after all retries are returned as None.
+        """
+        results: List[Optional[str]] = [None] * len(pairs)
+        failed = 0
+        requests = 0
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor, tqdm(
+            total=len(pairs), unit="row", desc=desc
+        ) as progress:
+            futures = {}
 
-            # Add to results
+            def submit(indices: List[int], attempt: int):
+                if len(indices) == 1 and (self.batch_size == 1 or attempt > self.max_retries):
+                    future = executor.submit(self.extract, pairs[indices[0]])
+                else:
+                    future = executor.submit(self.extract_batch, [pairs[i] for i in indices], attempt)
+                futures[future] = (indices, attempt)
+
+            for batch in self.make_batches(list(range(len(pairs))), pairs):
+                submit(batch, 0)
+
+            while futures:
+                future = next(as_completed(futures))
+                indices, attempt = futures.pop(future)
+                requests += 1
+                try:
+                    answer = future.result()
+                    answers = {0: answer} if isinstance(answer, str) else answer
+                except Exception as e:
+                    if len(indices) == 1 and (self.batch_size == 1 or attempt > self.max_retries):
+                        failed += 1
+                        progress.update(1)
+                        tqdm.write(f"Failed to extract '{pairs[indices[0]].processed}': {e}")
+                        continue
+                    tqdm.write(f"Batch of {len(indices)} pairs failed on attempt {attempt + 1}: {e}")
+                    answers = {}
+
+                for position, parts in answers.items():
+                    results[indices[position]] = parts
+                progress.update(len(answers))
+
+                # Re-queue only the items that were missing or invalid
+                retry = [i for position, i in enumerate(indices) if position not in answers]
+                if retry:
+                    if attempt < self.max_retries:
+                        for batch in self.make_batches(retry, pairs):
+                            submit(batch, attempt + 1)
+                    else:
+                        for i in retry:
+                            submit([i], self.max_retries + 1)
+
+                elapsed = time.perf_counter() - start
+                progress.set_postfix(
+                    rows_per_s=f"{progress.n / elapsed:.2f}",
+                    requests=requests,
+                    workers=self.max_workers,
+                    failed=failed,
+                )
+        return results
+
+    def align(self, pairs: List[KeywordPair]) -> List[Optional[AlignmentResult]]:
+        """Resolve the mechanical rows without the LLM; ambiguous rows are returned as None."""
+        if self.alignment_threshold is None:
+            return [None] * len(pairs)
+        alignments = [align_unimportant_parts(pair.processed, pair.standard) for pair in pairs]
+        return [a if a.confidence >= self.alignment_threshold else None for a in alignments]
+
+    def process_chunk(self, df: pd.DataFrame, desc: Optional[str] = None) -> pd.DataFrame:
+        """Extract the unimportant parts for one chunk of input rows.
+
+        The index of `df` is written as the record number of each row. Rows whose
+        extraction failed are left out of the result, so that a resumed run retries them.
+        """
+        original_column = "名称" if "名称" in df.columns else "keyword"
+
+        pairs = [
+            KeywordPair(processed=processed, standard=standard)
+            for processed, standard in zip(df["処理名称"], df["基準名称"])
+        ]
+
+        # Process each unique pair once and fan the answer back out to all of its rows
+        keys = [normalize_pair(pair.processed, pair.standard) for pair in pairs]
+        unique = list(dict.fromkeys(keys))
+        self.stats["rows"] += len(pairs)
+        self.stats["unique"] += len(unique)
+
+        # (unimportant parts, alignment confidence) per unique pair, None when the extraction failed
+        answers: Dict[Tuple[str, str], Tuple[Optional[str], Optional[float]]] = {}
+        if self.cache:
+            answers.update({key: (parts, None) for key, parts in self.cache.get_many(unique).items()})
+        misses = [key for key in unique if key not in answers]
+
+        # Resolve mechanical pairs by alignment, send only the ambiguous ones to the LLM
+        alignments = self.align([KeywordPair(processed=p, standard=s) for p, s in misses])
+        pending = []
+        for key, alignment in zip(misses, alignments):
+            if alignment:
+                answers[key] = (alignment.unimportant_parts, alignment.confidence)
+            else:
+                pending.append(key)
+        self.stats["aligned"] += len(misses) - len(pending)
+        self.stats["llm"] += len(pending)
+
+        if pending:
+            extracted = self.extract_all([KeywordPair(processed=p, standard=s) for p, s in pending], desc=desc)
+            answers.update({key: (parts, None) for key, parts in zip(pending, extracted)})
+            if self.cache:
+                # Failed pairs are not cached so that the next run retries them
+                self.cache.put_many({key: parts for key, parts in zip(pending, extracted) if parts is not None})
+
+        results = []
+        for row, original, pair, key in zip(df.index, df[original_column], pairs, keys):
+            unimportant_parts, confidence = answers[key]
+            if unimportant_parts is None:
+                self.stats["failed"] += 1
+                continue
             results.append(
                 KeywordResult(
+                    行番号=row,
                     名称=original,
-                    処理名称=processed,
-                    基準名称=standard,
-                    不要部分=extracted.unimportant_parts,
+                    処理名称=pair.processed,
+                    基準名称=pair.standard,
+                    不要部分=unimportant_parts,
+                    信頼度=confidence,
                 )
             )
+        return pd.DataFrame([item.model_dump() for item in results], columns=list(KeywordResult.model_fields))
+
+    def process_file(self, chunk_size: int = 1000, resume: bool = True):
+        """Stream the input in chunks and append each chunk's results to the output.
+
+        Memory stays bounded by `chunk_size` whatever the input size. The output is
+        a CSV file, or a directory of Parquet part files when it ends in `.parquet`.
+        With resume=True, the records whose 行番号 is already in the output are skipped,
+        so a crashed run continues where it stopped and the rows that failed are retried.
+        """
+        if self.output_file.endswith(".parquet"):
+            writer = ParquetChunkWriter(self.output_file)
+        else:
+            writer = CsvChunkWriter(self.output_file)
+        if resume:
+            done = writer.done_rows()
+        else:
+            writer.reset()
+            done = set()
+        if done:
+            print(f"Resuming with {len(done)} rows already in {self.output_file}")
 
-        # Convert to DataFrame and save
-        results_dict = [item.model_dump() for item in results]
-        results_df = pd.DataFrame(results_dict)
-        results_df.to_csv(self.output_file, index=False, encoding="utf-8")
+        self.stats = {"rows": 0, "unique": 0, "aligned": 0, "llm": 0, "failed": 0}
+        if self.cache:
+            self.cache.hits = self.cache.misses = 0
+        # Chunks keep numbering the records from 0, whatever the line breaks in quoted fields
+        for chunk in pd.read_csv(self.input_file, chunksize=chunk_size):
+            start, end = chunk.index[0], chunk.index[-1] + 1
+            chunk = chunk[~chunk.index.isin(done)]
+            if len(chunk):
+                writer.append(self.process_chunk(chunk, desc=f"rows {start}-{end}"))
+
+        print(f"Processed {self.stats['rows']} rows with {self.stats['unique']} unique pairs")
+        if self.stats["failed"]:
+            print(f"{self.stats['failed']} rows failed and were not written, run again to retry them")
+        if self.cache:
+            print(
+                f"Cache: {self.cache.hits} hits, {self.cache.misses} misses "
+                f"(hit rate {self.cache.hit_rate:.1%})"
+            )
+        print(
+            f"Alignment resolved {self.stats['aligned']} pairs, "
+            f"{self.stats['llm']} pairs were sent to the Extractor"
+        )
         print(f"Processing completed. Results saved to {self.output_file}")
 
 
+# Column of the output holding the record number of each input row
+ROW_COLUMN = "行番号"
+
+
+class CsvChunkWriter:
+    """Appends result chunks to a CSV file, writing the header only once."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def done_rows(self) -> Set[int]:
+        """Record numbers of the rows in the output, after dropping a partially written last record."""
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return set()
+        # A record ends at a line break outside quotes: quotes are escaped by doubling them,
+        # so the count of quotes read so far is even there
+        end = quotes = 0
+        with open(self.path, "rb+") as f:
+            while line := f.readline():
+                quotes += line.count(b'"')
+                if line.endswith(b"\n") and quotes % 2 == 0:
+                    end = f.tell()
+            if end != f.tell():
+                # Left behind by a crash while appending
+                f.truncate(end)
+        if end == 0:
+            # Not even the header was complete
+            return set()
+        return {row for chunk in pd.read_csv(self.path, usecols=[ROW_COLUMN], chunksize=100_000) for row in chunk[ROW_COLUMN]}
+
+    def reset(self):
+        self.path.unlink(missing_ok=True)
+
+    def append(self, df: pd.DataFrame):
+        header = not self.path.exists() or self.path.stat().st_size == 0
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            f.write(df.to_csv(index=False, header=header))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class ParquetChunkWriter:
+    """Writes each result chunk as a new part file in a Parquet dataset directory."""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is not installed. Please install it using `pip install pyarrow`")
+        self.pa, self.pq = pa, pq
+        self.path = Path(path)
+
+    def _parts(self) -> List[Path]:
+        return sorted(self.path.glob("part-*.parquet")) if self.path.exists() else []
+
+    def done_rows(self) -> Set[int]:
+        return {row for part in self._parts() for row in self.pq.read_table(part, columns=[ROW_COLUMN]).column(0).to_pylist()}
+
+    def reset(self):
+        for part in self._parts():
+            part.unlink()
+
+    def append(self, df: pd.DataFrame):
+        self.path.mkdir(parents=True, exist_ok=True)
+        part = self.path / f"part-{len(self._parts()):06d}.parquet"
+        # Write to a temporary name first so a crash never leaves a truncated part
+        tmp = part.with_suffix(".tmp")
+        self.pq.write_table(self.pa.Table.from_pandas(df, preserve_index=False), tmp)
+        tmp.rename(part)
+
+
 if __name__ == "__main__":
     input_file = "preprocess_keyword.csv"
     output_file = "extraction_results_ollama.csv"
 
-    extractor = KeywordExtractor(input_file, output_file)
+    extractor = KeywordExtractor(input_file, output_file, max_workers=4, batch_size=10)
     extractor.process_file()
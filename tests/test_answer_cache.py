@@ -0,0 +1,47 @@
+import zlib
+
+import numpy as np
+
+from agents.answer_cache import AnswerCache
+
+
+class HashEmbedder:
+    """Same vector for the same question, unrelated vectors otherwise."""
+
+    def get_embedding(self, text):
+        return np.random.default_rng(zlib.crc32(text.encode())).standard_normal(32).tolist()
+
+
+def test_two_caches_on_the_same_file(tmp_path):
+    path = str(tmp_path / "answer_cache.db")
+    agent = AnswerCache(HashEmbedder(), path=path)
+    sync = AnswerCache(HashEmbedder(), path=path)
+
+    assert agent.lookup("入札書の提出場所はどこですか") is None
+
+    # Stored by another process: seen without restarting
+    sync.put("入札書の提出場所はどこですか", "総務課です。", ["23252100060956_1"])
+    assert agent.lookup("入札書の提出場所はどこですか") == "総務課です。"
+
+    # Deleted by another process: a miss, not a crash
+    assert sync.invalidate(["23252100060956_1"]) == 1
+    assert agent.lookup("入札書の提出場所はどこですか") is None
+
+    sync.put("契約保証金は免除されますか", "免除されます。", ["23252100060956_2"])
+    assert agent.lookup("契約保証金は免除されますか") == "免除されます。"
+    sync.clear()
+    assert agent.lookup("契約保証金は免除されますか") is None
+    assert agent.stats()["hits"] == 2
+
+
+def test_missing_row_is_dropped_from_the_index(tmp_path):
+    path = str(tmp_path / "answer_cache.db")
+    cache = AnswerCache(HashEmbedder(), path=path)
+    cache.put("入札書の提出場所はどこですか", "総務課です。", ["23252100060956_1"])
+    assert cache.lookup("入札書の提出場所はどこですか") == "総務課です。"
+
+    # Row gone while the index is current (data_version not yet bumped for this connection)
+    cache.connection.execute("DELETE FROM answers")
+    cache.connection.commit()
+    assert cache.lookup("入札書の提出場所はどこですか") is None
+    assert cache._ids is not None and len(cache._ids) == 0
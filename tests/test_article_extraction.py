@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+pytest.importorskip("phi")
+pytest.importorskip("newspaper")
+
+from workflows.article_extraction import count_words, extract_article  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "articles")
+URL = "https://techdaily.example.com/2024/11/25/model-context-protocol.html"
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_count_words_counts_every_cjk_character():
+    assert count_words("Model Context Protocol") == 3
+    assert count_words("入札書を提出") == 6
+    assert count_words("MCP サーバー") == 5
+
+
+def test_article_is_converted_to_markdown_without_boilerplate():
+    article = extract_article(URL, html=fixture("model-context-protocol.html"))
+
+    assert article.title == "Anthropic introduces the Model Context Protocol"
+    assert article.url == URL
+    assert article.summary
+    content = article.content
+    assert "## How the protocol works" in content
+    assert "- Local MCP server support in the Claude Desktop apps" in content
+    assert "[Model Context Protocol](https://modelcontextprotocol.io)" in content
+    assert "**isolation from data**" in content
+    assert "> Open technologies like the Model Context Protocol" in content
+    assert "```\nnpx -y @modelcontextprotocol/server-filesystem ~/Documents\n```" in content
+    # Ads, bylines, share links and related stories are dropped, the title is returned separately
+    for boilerplate in ("Advertisement", "Sponsored", "Jane Doe", "Share on", "Related stories", "# Anthropic introduces"):
+        assert boilerplate not in content
+
+
+def test_pages_without_an_article_body_are_rejected():
+    assert extract_article("https://news.example.org/story/12345", html=fixture("consent-wall.html")) is None
+    html = fixture("model-context-protocol.html")
+    assert extract_article(URL, html=html, min_words=10_000) is None
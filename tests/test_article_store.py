@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip("phi")
+
+from workflows import article_store  # noqa: E402
+from workflows.article_store import ArticleStore, normalize_topic, normalize_url  # noqa: E402
+
+ARTICLE = {"title": "MCP", "url": "https://example.com/news/mcp", "content": "Model Context Protocol の発表"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(article_store.time, "time", clock)
+    return clock
+
+
+def test_links_to_one_article_share_a_key():
+    url = "https://example.com/news/mcp?id=7&page=2"
+    for variant in (
+        "http://www.Example.com/news/mcp/?page=2&id=7",
+        "https://example.com:443/news/mcp?utm_source=x&id=7&fbclid=abc&page=2#comments",
+    ):
+        assert normalize_url(variant) == normalize_url(url)
+    assert normalize_url("https://example.com/news/other") != normalize_url(url)
+    assert normalize_url("https://example.com:8443/news/mcp?id=7&page=2") != normalize_url(url)
+    assert normalize_topic("  ＭＣＰ   Servers ") == normalize_topic("mcp servers")
+
+
+def test_articles_and_searches_are_shared_across_instances(tmp_path, clock):
+    path = str(tmp_path / "article_store.db")
+    ArticleStore(path).put_articles({"https://www.example.com/news/mcp?utm_medium=rss": ARTICLE})
+    ArticleStore(path).put_search("MCP servers", {"articles": [ARTICLE]})
+
+    store = ArticleStore(path)
+    # Returned by URL as asked for
+    assert store.get_articles(["http://example.com/news/mcp/", "https://example.com/missing"]) == {
+        "http://example.com/news/mcp/": ARTICLE
+    }
+    assert store.get_search("ｍｃｐ  SERVERS") == {"articles": [ARTICLE]}
+    assert store.stats()["articles"] == 1 and store.stats()["searches"] == 1
+
+
+def test_expired_entries_are_not_returned(tmp_path, clock):
+    store = ArticleStore(str(tmp_path / "article_store.db"), ttl_seconds=100, search_ttl_seconds=10)
+    store.put_article(ARTICLE["url"], ARTICLE)
+    store.put_search("mcp", {"articles": []})
+
+    clock.now += 50
+    assert store.get_article(ARTICLE["url"]) == ARTICLE
+    assert store.get_search("mcp") is None
+    clock.now += 51
+    assert store.get_article(ARTICLE["url"]) is None
+    # Deleted on the next write
+    store.put_article("https://example.com/news/other", ARTICLE)
+    assert store.stats()["articles"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    article = {"content": "x" * 1000}
+    store = ArticleStore(str(tmp_path / "article_store.db"), max_bytes=3500)
+    for name in ("a", "b", "c"):
+        store.put_article(f"https://example.com/{name}", article)
+        clock.now += 1
+    # Read last, "a" is now the most recently used
+    assert store.get_article("https://example.com/a") == article
+    clock.now += 1
+
+    store.put_article("https://example.com/d", article)
+    assert store.stats()["articles"] == 3
+    assert store.stats()["articles_bytes"] <= 3500
+    assert store.get_article("https://example.com/b") is None
+    for name in ("a", "c", "d"):
+        assert store.get_article(f"https://example.com/{name}") == article
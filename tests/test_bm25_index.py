@@ -0,0 +1,41 @@
+from agents.bm25_index import BM25Index
+from agents.dedup import Deduplicator
+
+
+def test_index_saved_by_another_process_is_reloaded(tmp_path):
+    path = str(tmp_path / "bm25_index.npz")
+    agent, sync = BM25Index(path=path), BM25Index(path=path)
+    assert agent.search("入札書") == []
+
+    sync.add("23252100060956_1", "入札書は総務課に提出すること。", name="23252100060956")
+    sync.save()
+    assert [id for id, _ in agent.search("入札書")] == ["23252100060956_1"]
+
+    sync.remove_chunks("23252100060956")
+    sync.save()
+    assert agent.search("入札書") == []
+    assert agent.document("23252100060956_1") is None
+
+
+def test_unsaved_changes_are_not_reloaded_over(tmp_path):
+    path = str(tmp_path / "bm25_index.npz")
+    index, other = BM25Index(path=path), BM25Index(path=path)
+    index.add("23252100060956_1", "入札書は総務課に提出すること。")
+    other.add("23252100060956_2", "契約保証金は免除する。")
+    other.save()
+    assert index.document("23252100060956_1") is not None
+
+
+def test_deduplicator_saved_by_another_process_is_reloaded(tmp_path):
+    path = str(tmp_path / "dedup_index.npz")
+    agent, sync = Deduplicator(path=path), Deduplicator(path=path)
+    assert agent.sources("23252100060956_1") == []
+
+    sync.add("23252100060956_1", "入札書は総務課に提出すること。", {"name": "23252100060956", "page": 1})
+    sync.add_location("23252100060956_1", {"name": "23252100060956_2", "page": 1})
+    sync.save()
+    assert len(agent.sources("23252100060956_1")) == 2
+
+    sync.remove("23252100060956_1")
+    sync.save()
+    assert agent.sources("23252100060956_1") == []
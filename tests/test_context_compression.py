@@ -0,0 +1,35 @@
+from agno.document import Document
+
+from agents.context_compression import ContextCompressor
+
+
+class FixedEmbedder:
+    """Query along the first axis, chunks at the given angles from it."""
+
+    def get_embedding(self, text):
+        return [1.0, 0.0]
+
+    def get_embeddings(self, texts):
+        raise AssertionError("chunks come with their embeddings")
+
+
+def chunk(content, embedding):
+    return Document(name="仕様書.pdf", content=content, embedding=embedding, meta_data={"page": 1})
+
+
+def test_negative_scores_keep_the_best_chunks():
+    compressor = ContextCompressor(embedder=FixedEmbedder(), semantic_weight=1.0)
+    documents = [
+        chunk("入札書は総務課に提出すること。", [-0.2, 0.98]),
+        chunk("契約保証金は免除する。", [-0.25, 0.97]),
+        chunk("本件は郵送による入札を認めない。", [-1.0, 0.0]),
+    ]
+    kept = compressor.compress("入札書の提出場所", documents)
+    assert [d.content for d in kept] == [documents[0].content, documents[1].content]
+
+
+def test_best_chunk_is_always_kept():
+    compressor = ContextCompressor(embedder=FixedEmbedder(), semantic_weight=1.0)
+    documents = [chunk("入札書は総務課に提出すること。", [0.0, 1.0]), chunk("契約保証金は免除する。", [-1.0, 0.0])]
+    kept = compressor.compress("入札書の提出場所", documents)
+    assert [d.content for d in kept] == [documents[0].content]
@@ -0,0 +1,39 @@
+from langchain_core.documents import Document
+
+from agents.dedup import Deduplicator, dedup_chunks
+
+CLAUSE = "第3条 入札者は、入札書を総務課に提出しなければならない。郵送による入札は認めない。入札保証金は免除する。"
+
+
+def chunk(content, source, page):
+    return Document(page_content=content, metadata={"source": source, "page": page})
+
+
+def test_near_duplicates_collapse_into_the_first_chunk(tmp_path):
+    chunks = [
+        chunk(CLAUSE, "23252100060956.pdf", 1),
+        # Next version of the document: same clause, the last sentence reworded
+        chunk(CLAUSE.replace("免除する。", "免除します。"), "23252100060956_1.pdf", 1),
+        chunk("第4条 契約保証金は契約金額の百分の十以上とする。", "23252100060956_1.pdf", 2),
+    ]
+    deduplicator = Deduplicator(path=str(tmp_path / "dedup_index.npz"), dimensions=768)
+    kept = list(
+        dedup_chunks(
+            chunks,
+            deduplicator,
+            key=lambda c: f"{c.metadata['source']}:{c.metadata['page']}",
+            location=lambda c: {"name": c.metadata["source"], "page": c.metadata["page"]},
+        )
+    )
+
+    assert kept == [chunks[0], chunks[2]]
+    assert deduplicator.sources("23252100060956.pdf:1") == [
+        {"name": "23252100060956.pdf", "page": 1},
+        {"name": "23252100060956_1.pdf", "page": 1},
+    ]
+    assert (deduplicator.stats.duplicates, deduplicator.stats.exact_duplicates) == (1, 0)
+    assert deduplicator.stats.vector_bytes_saved == 4 * 768
+
+    # Saved and loaded, the index still finds the duplicate
+    deduplicator.save()
+    assert Deduplicator(path=str(tmp_path / "dedup_index.npz")).find(chunks[1].page_content) == "23252100060956.pdf:1"
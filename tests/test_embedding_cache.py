@@ -0,0 +1,45 @@
+import zlib
+from multiprocessing import get_context
+
+import numpy as np
+
+from agents.embedding_cache import EmbeddingCache
+
+
+def vector(text):
+    return np.random.default_rng(zlib.crc32(text.encode())).standard_normal(8).astype(np.float32)
+
+
+def fill(path, worker):
+    cache = EmbeddingCache("model", 8, path=path, max_entries=300)
+    for batch in range(40):
+        texts = [f"{worker}-{batch}-{i}" for i in range(10)]
+        cache.put_many(texts, [vector(text) for text in texts])
+
+
+def test_processes_sharing_the_cache_never_share_slots(tmp_path):
+    path = str(tmp_path / "embedding_cache")
+    context = get_context("spawn")
+    processes = [context.Process(target=fill, args=(path, worker)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [process.exitcode for process in processes] == [0] * 4
+
+    cache = EmbeddingCache("model", 8, path=path, max_entries=300)
+    slots = [slot for _, slot in cache.connection.execute("SELECT key, slot FROM entries")]
+    assert len(slots) == len(set(slots)) == 300
+
+    texts = [f"{worker}-{batch}-{i}" for worker in range(4) for batch in range(40) for i in range(10)]
+    cached = [(text, result) for text, result in zip(texts, cache.get_many(texts)) if result is not None]
+    assert len(cached) == 300
+    assert all(np.allclose(result, vector(text)) for text, result in cached)
+
+
+def test_slot_being_replaced_is_a_miss(tmp_path):
+    cache = EmbeddingCache("model", 8, path=str(tmp_path / "embedding_cache"), max_entries=10)
+    cache.put("入札書", vector("入札書"))
+    slot = cache.connection.execute("SELECT slot FROM entries").fetchone()[0]
+    cache.owners[slot] = 0
+    assert cache.get("入札書") is None
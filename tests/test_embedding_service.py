@@ -0,0 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.embedding_service import BatchingEngine
+
+
+def test_no_forward_batch_exceeds_max_batch_size():
+    batches = []
+
+    def encode(texts):
+        batches.append(len(texts))
+        return [[float(text)] for text in texts]
+
+    engine = BatchingEngine(encode, max_batch_size=16, max_wait_ms=20.0)
+    requests = [[str(i) for i in range(1000)]] + [[str(i) for i in range(n)] for n in (1, 5, 12, 16, 40)]
+    with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+        results = list(executor.map(engine.embed, requests))
+
+    assert results == [[[float(text)] for text in texts] for texts in requests]
+    assert max(batches) <= 16
+    assert sum(batches) == sum(len(texts) for texts in requests)
@@ -0,0 +1,10 @@
+from agno.document import Document
+
+from agents.ja_chunking import JapaneseSentenceChunking
+
+
+def test_lines_are_joined_with_a_space_between_latin_sentences():
+    chunking = JapaneseSentenceChunking(chunk_size=200, overlap=0)
+    document = Document(name="仕様書.pdf", content="This is a test.\nSecond sentence.\n入札書は\n総務課に提出すること。")
+    [chunk] = chunking.chunk(document)
+    assert chunk.content == "This is a test. Second sentence.入札書は総務課に提出すること。"
@@ -0,0 +1,39 @@
+import pytest
+
+from teams.keyword_alignment import align_unimportant_parts
+
+# KeywordExtractor's default alignment_threshold
+THRESHOLD = 0.8
+
+
+@pytest.mark.parametrize(
+    "processed, standard, parts",
+    [
+        ("ボルトM8", "ボルト", "[M8]"),
+        ("EV枠-1", "枠", "[EV][1]"),
+        ("欄間ｶﾞﾗﾘ", "ｶﾞﾗﾘ", "[欄間]"),
+        # Numbers match the # of 基準名称
+        ("12m超EXP_J", "#m超EXP_J", ""),
+    ],
+)
+def test_mechanical_rows_are_resolved(processed, standard, parts):
+    result = align_unimportant_parts(processed, standard)
+    assert result.unimportant_parts == parts
+    assert result.confidence >= THRESHOLD
+
+
+@pytest.mark.parametrize(
+    "processed, standard",
+    [
+        # Reordered: 基準名称 cannot be aligned
+        ("ｸﾘｱﾗｯｶｰ塗り(CL)", "CL塗り"),
+        # 窓 taken from inside the word 換気窓付
+        ("換気窓付", "窓"),
+        # Which A is the important one
+        ("AA", "A"),
+        # Long kanji run, where to split it is the LLM's call
+        ("小窓付片開扉", "扉"),
+    ],
+)
+def test_ambiguous_rows_are_left_to_the_extractor(processed, standard):
+    assert align_unimportant_parts(processed, standard).confidence < THRESHOLD
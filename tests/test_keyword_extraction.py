@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+from teams.keyword_extraction_team import CsvChunkWriter, ExtractedKeyword, KeywordExtractor, KeywordPair, ROW_COLUMN
+
+ROWS = pd.DataFrame(
+    {
+        "名称": ["ボルト M8", "ナット\nM8", "ワッシャー 8mm", "ボルト M10"],
+        "処理名称": ["ボルトM8", "ナットM8", "ワッシャー8mm", "ボルトM10"],
+        "基準名称": ["ボルト", "ナット", "ワッシャー", "ボルト"],
+    }
+)
+
+
+def test_failed_rows_are_retried_on_resume(tmp_path, monkeypatch):
+    input_file, output_file = tmp_path / "input.csv", tmp_path / "output.csv"
+    ROWS.to_csv(input_file, index=False)
+    extractor = KeywordExtractor(str(input_file), str(output_file), alignment_threshold=None, cache_file=None)
+
+    # First run: the extraction of ナットM8 fails
+    monkeypatch.setattr(extractor, "extract_all", lambda pairs, desc=None: [None if p.processed == "ナットM8" else "[M8]" for p in pairs])
+    extractor.process_file(chunk_size=2)
+    assert pd.read_csv(output_file)[ROW_COLUMN].tolist() == [0, 2, 3]
+    assert extractor.stats["failed"] == 1
+
+    # Second run: only the failed row is sent again
+    sent = []
+    monkeypatch.setattr(extractor, "extract_all", lambda pairs, desc=None: sent.extend(pairs) or ["[M8]"] * len(pairs))
+    extractor.process_file(chunk_size=2)
+    output = pd.read_csv(output_file)
+    assert [pair.processed for pair in sent] == ["ナットM8"]
+    assert sorted(output[ROW_COLUMN]) == [0, 1, 2, 3]
+    assert output.set_index(ROW_COLUMN).loc[1, "名称"] == "ナット\nM8"
+
+
+def test_partial_last_record_is_dropped(tmp_path):
+    writer = CsvChunkWriter(str(tmp_path / "output.csv"))
+    writer.append(pd.DataFrame({ROW_COLUMN: [0, 1], "名称": ["ボルト", "ナット\nM8"]}))
+    size = writer.path.stat().st_size
+    # Crash while writing a record with a line break in a quoted field
+    with open(writer.path, "a", encoding="utf-8") as f:
+        f.write('2,"ワッシャー\n8')
+    assert writer.done_rows() == {0, 1}
+    assert writer.path.stat().st_size == size
+
+
+def test_invalid_single_answer_is_retried(monkeypatch):
+    extractor = KeywordExtractor("input.csv", "output.csv", cache_file=None, retry_backoff=0.0)
+    answers = iter([ExtractedKeyword(unimportant_parts="M8"), ExtractedKeyword(unimportant_parts="[M8]")])
+    monkeypatch.setattr(extractor, "_get_extractor", lambda batch=False: SimpleNamespace(run=lambda prompt: SimpleNamespace(content=next(answers))))
+    assert extractor.extract(KeywordPair(processed="ボルトM8", standard="ボルト")) == "[M8]"
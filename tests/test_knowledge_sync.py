@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+from agno.document import Document
+
+from agents.knowledge_sync import KnowledgeSync
+
+
+class LineReader:
+    """One chunk per line of the (text) file."""
+
+    def read(self, pdf):
+        lines = pdf.read_text(encoding="utf-8").splitlines()
+        return [Document(name=pdf.stem, content=line, meta_data={"page": 1, "chunk": i}) for i, line in enumerate(lines)]
+
+
+class RecordingVectorDb:
+    def __init__(self):
+        self.rows = {}
+        self.upserted = []
+
+    def create(self):
+        pass
+
+    def upsert_available(self):
+        return True
+
+    def upsert(self, documents):
+        self.upserted.extend(document.content for document in documents)
+        self.rows.update({document.id: document for document in documents})
+
+    def delete_chunks(self, name, content_hashes=None):
+        for id, document in list(self.rows.items()):
+            if document.name == name and (content_hashes is None or id.split("_")[-1] in content_hashes):
+                del self.rows[id]
+
+
+def contents(vector_db):
+    return sorted(document.content for document in vector_db.rows.values())
+
+
+def test_only_changed_chunks_are_embedded(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "仕様書.pdf").write_text("入札書は総務課に提出すること。\n契約保証金は免除する。", encoding="utf-8")
+    (data / "要項.pdf").write_text("質問は書面で受け付ける。", encoding="utf-8")
+    vector_db = RecordingVectorDb()
+    knowledge_base = SimpleNamespace(path=str(data), exclude_files=[], reader=LineReader(), vector_db=vector_db)
+
+    def sync():
+        vector_db.upserted = []
+        return KnowledgeSync(knowledge_base, manifest_path=str(tmp_path / "manifest.json")).sync()
+
+    assert sync()["chunks_added"] == 3
+
+    # Unchanged files are not read again
+    stats = sync()
+    assert stats["files_unchanged"] == 2 and vector_db.upserted == []
+
+    # One line changed: one chunk embedded, one deleted, one kept
+    (data / "仕様書.pdf").write_text("入札書は総務課に提出すること。\n契約保証金は納付を要する。", encoding="utf-8")
+    stats = sync()
+    assert vector_db.upserted == ["契約保証金は納付を要する。"]
+    assert (stats["chunks_deleted"], stats["chunks_kept"]) == (1, 1)
+
+    # Removed file: all of its rows are deleted
+    (data / "要項.pdf").unlink()
+    assert sync()["files_removed"] == 1
+    assert contents(vector_db) == ["入札書は総務課に提出すること。", "契約保証金は納付を要する。"]
@@ -0,0 +1,61 @@
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+from agno.document import Document
+from agno.embedder.base import Embedder
+
+from agents.local_vectordb import IVF, LocalVectorDb
+
+
+@dataclass
+class HashEmbedder(Embedder):
+    """Same vector for the same text, unrelated vectors otherwise."""
+
+    dimensions: int = 16
+
+    def get_embedding(self, text):
+        return np.random.default_rng(zlib.crc32(text.encode())).standard_normal(self.dimensions).tolist()
+
+    def get_embeddings(self, texts):
+        return [self.get_embedding(text) for text in texts]
+
+
+TEXTS = [f"仕様書 第{i}条の規定による" for i in range(200)]
+
+
+def chunk(i, name="仕様書"):
+    return Document(id=f"{name}_{i}", name=name, content=TEXTS[i], meta_data={"page": i // 10})
+
+
+def test_upsert_search_delete_and_reopen(tmp_path):
+    vector_db = LocalVectorDb(path=str(tmp_path), embedder=HashEmbedder())
+    vector_db.upsert([chunk(i) for i in range(100)])
+    vector_db.upsert([chunk(i, "要項") for i in range(100, 110)], filters={"kind": "要項"})
+
+    [top] = vector_db.vector_search(TEXTS[42], limit=1)
+    assert (top.id, top.meta_data) == ("仕様書_42", {"page": 4})
+
+    # Same id: the row is replaced, not duplicated
+    vector_db.upsert([chunk(42)])
+    assert vector_db.get_count() == 110
+    assert {d.name for d in vector_db.vector_search(TEXTS[3], limit=5, filters={"kind": "要項"})} == {"要項"}
+
+    vector_db.delete_chunks("要項")
+    assert vector_db.get_count() == 100
+    assert vector_db.vector_search(TEXTS[105], limit=1)[0].name == "仕様書"
+
+    reopened = LocalVectorDb(path=str(tmp_path), embedder=HashEmbedder())
+    assert reopened.get_count() == 100
+    assert reopened.vector_search(TEXTS[7], limit=1)[0].id == "仕様書_7"
+
+
+def test_ivf_scanning_every_list_matches_the_exact_search(tmp_path):
+    exact = LocalVectorDb(path=str(tmp_path / "exact"), embedder=HashEmbedder())
+    ivf = LocalVectorDb(path=str(tmp_path / "ivf"), embedder=HashEmbedder(), vector_index=IVF(lists=8, probes=8, min_rows=0))
+    for vector_db in (exact, ivf):
+        vector_db.upsert([chunk(i) for i in range(200)])
+    ivf.optimize()
+
+    query = "入札書の提出場所"
+    assert [d.id for d in ivf.vector_search(query, limit=10)] == [d.id for d in exact.vector_search(query, limit=10)]
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+from agents.onnx_embedder import OnnxEmbedder, export_onnx  # noqa: E402
+
+MODEL = "cl-nagoya/sup-simcse-ja-base"
+TEXTS = [
+    "入札書の提出場所はどこですか",
+    "契約保証金は免除されますか",
+    "本件に関する問い合わせは総務課までお願いします。",
+    # Longer than max_seq_length: both backends must truncate it the same way
+    "落札者は契約締結後に履行保証を提出すること。" * 60,
+]
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    out = tmp_path_factory.mktemp("onnx")
+    try:
+        export_onnx(MODEL, str(out))
+    except OSError as e:
+        pytest.skip(f"{MODEL} is not available: {e}")
+    return out
+
+
+def cosines(a, b):
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+@pytest.mark.parametrize("quantized, max_drift", [(False, 1e-4), (True, 0.02)])
+def test_onnx_matches_sentence_transformers(model_dir, quantized, max_drift):
+    from agents.embedder import load_sentence_transformer
+
+    reference = load_sentence_transformer(MODEL).encode(TEXTS)
+    embedder = OnnxEmbedder(id=MODEL, dimensions=reference.shape[1], model_dir=str(model_dir), quantized=quantized)
+    vectors = np.asarray(embedder.get_embeddings(TEXTS), dtype=np.float32)
+    assert 1 - cosines(reference, vectors).min() <= max_drift
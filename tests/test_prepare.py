@@ -0,0 +1,49 @@
+import shutil
+import time
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+
+from agents import prepare
+from agents.dedup import Deduplicator, dedup_chunks
+from agents.prepare import chunk_location, iter_chunks, point_id, upsert_chunks
+
+load_and_split = prepare._load_and_split
+
+
+class HashEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return np.random.default_rng(zlib.crc32(text.encode())).standard_normal(8).tolist()
+
+
+def load_first_file_last(pdf_file):
+    if pdf_file.endswith("a.pdf"):
+        time.sleep(1.0)
+    return load_and_split(pdf_file)
+
+
+def ingest(client, directory, max_workers):
+    deduplicator = Deduplicator(path=None, dimensions=8)
+    chunks = dedup_chunks(iter_chunks(directory, max_workers=max_workers), deduplicator, key=point_id, location=chunk_location)
+    upsert_chunks(client, "documents", chunks, HashEmbeddings(), batch_size=4)
+    return {str(point.id) for point in client.scroll("documents", limit=1000)[0]}
+
+
+def test_reingestion_upserts_the_same_points(tmp_path, monkeypatch):
+    # Two versions of one document: every chunk of b.pdf duplicates a chunk of a.pdf
+    shutil.copy("agents/data/23252100060956_1.pdf", tmp_path / "a.pdf")
+    shutil.copy("agents/data/23252100060956_1.pdf", tmp_path / "b.pdf")
+    client = QdrantClient(":memory:")
+    client.create_collection("documents", vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+
+    first = ingest(client, str(tmp_path), max_workers=1)
+    # Forked workers see the patched loader: a.pdf now finishes after b.pdf
+    monkeypatch.setattr(prepare, "_load_and_split", load_first_file_last)
+    second = ingest(client, str(tmp_path), max_workers=2)
+    assert second == first
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+pytest.importorskip("phi")
+
+from workflows.writer_input import build_writer_input, estimate_tokens  # noqa: E402
+
+TOPIC = "Model Context Protocol adoption"
+FILLER = "The weather in the city stayed mild for most of the week, and traffic was light on the main roads."
+RELEVANT = "Enterprises report faster Model Context Protocol adoption across their internal tools."
+
+
+def long_article(number):
+    paragraphs = [f"Article {number} opens with a short lead about the week in technology news."]
+    paragraphs += [" ".join([FILLER] * 5) for _ in range(15)]
+    # Deep in the article, far from the lead
+    paragraphs.insert(10, f"{FILLER} {RELEVANT}")
+    return {
+        "title": f"Story {number}",
+        "url": f"https://example.com/{number}",
+        "summary": "A week of technology news.",
+        "content": "\n\n".join(paragraphs + ["Subscribe to our newsletter", "© 2024 Example News. All rights reserved."]),
+    }
+
+
+def test_writer_input_fits_the_budget_and_keeps_relevant_sentences():
+    articles = [long_article(n) for n in range(4)]
+    assert estimate_tokens(json.dumps({"topic": TOPIC, "articles": articles}, indent=4)) > 3000
+
+    writer_input = build_writer_input(TOPIC, articles, token_budget=1500)
+
+    assert estimate_tokens(writer_input) <= 1500
+    data = json.loads(writer_input)
+    assert data["topic"] == TOPIC
+    assert [article["url"] for article in data["articles"]] == [article["url"] for article in articles]
+    for article in data["articles"]:
+        assert article["summary"] == "A week of technology news."
+        assert RELEVANT in article["content"]
+        assert article["content"].startswith("Article ")
+        assert "Subscribe" not in article["content"]
+        assert "All rights reserved" not in article["content"]
+
+
+def test_writer_input_is_compact_json_with_non_ascii_characters():
+    article = {
+        "title": "MCP の導入が進む",
+        "url": "https://example.jp/mcp",
+        "content": "企業での導入が進んでいる。\n\n[![写真](https://example.jp/a.jpg)](https://example.jp/a)\n\nCookie ではありません。",
+    }
+
+    writer_input = build_writer_input("MCP", [article])
+
+    assert "MCP の導入が進む" in writer_input
+    assert "\\u" not in writer_input
+    assert "\n" not in writer_input.replace("\\n", "")
+    assert ": " not in writer_input and ", " not in writer_input
+    content = json.loads(writer_input)["articles"][0]["content"]
+    # The image link line is dropped, the rest is kept whole
+    assert content == "企業での導入が進んでいる。\n\nCookie ではありません。"
@@ -0,0 +1,207 @@
+"""
+Direct article extraction for the news report workflow.
+
+`GenerateNewsReport.article_scraper` is an LLM agent that calls the Newspaper4k tool
+and copies its output into a `ScrapedArticle`, a full generation of the article
+just to reformat it. `extract_article(url)` does the same without a model:
+newspaper4k downloads the page, removes the boilerplate (navigation, ads,
+footers, bylines) and finds the article body, which is then converted to
+markdown deterministically: headings, paragraphs, lists, quotes, code blocks,
+links and emphasis.
+
+It returns None when the page cannot be downloaded or the body is too short to be
+the article, the workflow then falls back to the scraper agent. Compare both paths
+with benchmarks/article_extraction_benchmark.py.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from phi.utils.log import logger
+
+HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+LISTS = {"ul", "ol"}
+# Containers walked into, their text is kept only when they have no block children
+CONTAINERS = {"div", "section", "article", "main", "header", "figure", "figcaption", "span", "td", "body"}
+BLOCKS = set(HEADINGS) | LISTS | CONTAINERS | {"p", "pre", "blockquote", "table"}
+SKIPPED = {"script", "style", "noscript", "iframe", "form", "button", "nav", "aside", "footer", "svg", "img"}
+# class / id of the ads, share buttons, bylines, ... newspaper4k leaves in the article node
+BOILERPLATE = re.compile(
+    r"(?:^|[\s_-])(?:ads?|advert\w*|sponsor\w*|promo\w*|share|social|related|newsletter|subscribe|signup"
+    r"|byline|author|caption|tags?|cookie\w*|consent)(?:$|[\s_-])",
+    re.IGNORECASE,
+)
+# Kana, kanji and full-width forms: one word each, CJK text has no spaces between words
+_CJK = re.compile(r"[　-ヿ㐀-䶿一-鿿豈-﫿＀-￯]")
+
+
+@dataclass
+class ExtractedArticle:
+    title: str
+    url: str
+    summary: Optional[str]
+    content: str
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def count_words(text: str) -> int:
+    """Space-separated words, with every CJK character counted as one word (about one token)."""
+    cjk = len(_CJK.findall(text))
+    return cjk + len(_CJK.sub(" ", text).split())
+
+
+def _inline(node, base_url: str) -> str:
+    """Markdown of the text of a node: links, emphasis, inline code and line breaks."""
+    parts = [node.text or ""]
+    for child in node:
+        tag = child.tag if isinstance(child.tag, str) else ""
+        text = _inline(child, base_url) if tag not in SKIPPED else ""
+        if tag == "a" and child.get("href") and text.strip():
+            text = f"[{text.strip()}]({urljoin(base_url, child.get('href'))})"
+        elif tag in ("strong", "b") and text.strip():
+            text = f"**{text.strip()}**"
+        elif tag in ("em", "i") and text.strip():
+            text = f"*{text.strip()}*"
+        elif tag == "code" and text.strip():
+            text = f"`{text.strip()}`"
+        elif tag == "br":
+            text = "\n"
+        parts.append(text)
+        parts.append(child.tail or "")
+    return "\n".join(" ".join(line.split()) for line in "".join(parts).split("\n")).strip()
+
+
+def _is_boilerplate(node) -> bool:
+    return bool(BOILERPLATE.search(f"{node.get('class', '')} {node.get('id', '')}"))
+
+
+def _link_density(node) -> float:
+    """Share of the text of a node that is link text, high for menus and link lists."""
+    text = len(_normalize(node.text_content()))
+    links = sum(len(_normalize(link.text_content())) for link in node.iter("a"))
+    return links / text if text else 0.0
+
+
+def _has_blocks(node) -> bool:
+    return any(isinstance(child.tag, str) and child.tag in BLOCKS for child in node)
+
+
+def _blocks(node, base_url: str) -> Iterator[Tuple[str, str, str]]:
+    """(kind, plain text, markdown) of the blocks under a node, in document order."""
+    for child in node:
+        tag = child.tag if isinstance(child.tag, str) else ""
+        if not tag or tag in SKIPPED or _is_boilerplate(child):
+            continue
+        if tag in HEADINGS:
+            text = _normalize(child.text_content())
+            if text:
+                yield "heading", text, f"{'#' * HEADINGS[tag]} {_normalize(_inline(child, base_url))}"
+        elif tag in LISTS:
+            if _link_density(child) > 0.5:
+                continue
+            items = [li for li in child if li.tag == "li"]
+            for number, item in enumerate(items, start=1):
+                text = _normalize(item.text_content())
+                if text:
+                    bullet = f"{number}." if tag == "ol" else "-"
+                    yield "item", text, f"{bullet} {_normalize(_inline(item, base_url))}"
+        elif tag == "pre":
+            code = child.text_content().strip("\n")
+            if code.strip():
+                yield "code", _normalize(code), f"```\n{code}\n```"
+        elif tag == "blockquote":
+            inner = list(_blocks(child, base_url)) if _has_blocks(child) else []
+            text = _normalize(child.text_content())
+            markdown = "\n>\n".join(md for _, _, md in inner) if inner else _inline(child, base_url)
+            if text:
+                yield "quote", text, "\n".join(f"> {line}" if line != ">" else line for line in markdown.splitlines())
+        elif tag == "table":
+            rows = [[_normalize(cell.text_content()) for cell in row if cell.tag in ("td", "th")] for row in child.iter("tr")]
+            rows = [cells for cells in rows if any(cells)]
+            if rows:
+                lines = ["| " + " | ".join(cells) + " |" for cells in rows]
+                # The first row is the header
+                lines.insert(1, "|" + " --- |" * len(rows[0]))
+                yield "table", " ".join(" ".join(cells) for cells in rows), "\n".join(lines)
+        elif tag in CONTAINERS and _has_blocks(child):
+            yield from _blocks(child, base_url)
+        else:
+            text = _normalize(child.text_content())
+            if text:
+                yield "paragraph", text, _inline(child, base_url)
+
+
+def to_markdown(node, base_url: str, body_text: str, title: str = "") -> str:
+    """Markdown of an article node, keeping the blocks newspaper4k kept in the article text.
+
+    Blocks with a boilerplate class (ads, share links, bylines, captions, ...) and link
+    lists are dropped, and paragraphs are kept only when newspaper4k kept their text in
+    `body_text`. The title heading is left out, it is returned separately.
+    """
+    body = _normalize(body_text)
+    title = _normalize(title)
+    lines: List[str] = []
+    previous = None
+    for kind, text, markdown in _blocks(node, base_url):
+        if kind == "heading" and text == title:
+            continue
+        if kind == "paragraph" and text not in body:
+            continue
+        # List items are kept together, every other block is a paragraph
+        if lines and not (kind == "item" and previous == "item"):
+            lines.append("")
+        lines.append(markdown)
+        previous = kind
+    return "\n".join(lines)
+
+
+def _summary(description: Optional[str], content: str, max_length: int = 300) -> Optional[str]:
+    if description and description.strip():
+        return description.strip()
+    for paragraph in content.split("\n\n"):
+        if paragraph and not paragraph.startswith(("#", "-", ">", "`", "|")) and not re.match(r"\d+\. ", paragraph):
+            text = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", paragraph).replace("**", "")
+            return text if len(text) <= max_length else text[: max_length - 1].rstrip() + "…"
+    return None
+
+
+def extract_article(url: str, html: Optional[str] = None, timeout: float = 10.0, min_words: int = 100) -> Optional[ExtractedArticle]:
+    """Download (unless `html` is given) and extract an article as markdown.
+
+    Returns None when the download fails or the article body has fewer than
+    `min_words` words, CJK characters counted as words (paywalls, consent pages,
+    video pages, ...).
+    """
+    try:
+        from newspaper import Article, Config
+    except ImportError:
+        raise ImportError("newspaper4k is not installed. Please install it using `pip install newspaper4k lxml_html_clean`")
+
+    config = Config()
+    config.request_timeout = timeout
+    config.fetch_images = False
+    article = Article(url, config=config)
+    try:
+        article.download(input_html=html)
+        article.parse()
+    except Exception as e:
+        logger.warning(f"Could not extract {url}: {e}")
+        return None
+
+    if article.top_node is None or count_words(article.text) < min_words:
+        logger.info(f"No article body found in {url}")
+        return None
+    content = to_markdown(article.top_node, article.url or url, article.text, article.title)
+    if not content:
+        return None
+    return ExtractedArticle(
+        title=article.title or url,
+        url=url,
+        summary=_summary(article.meta_description, content),
+        content=content,
+    )
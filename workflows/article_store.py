@@ -0,0 +1,184 @@
+"""
+Article and search result store shared by the news workflows.
+
+`GenerateNewsReport` kept its scraped articles and search results in the session
+state of a topic-derived session, so two topics sharing a URL scraped it twice, and
+every run validated the whole cached dict. `ArticleStore` keeps them in one SQLite
+file for every session and workflow:
+
+- articles are keyed by normalized URL (scheme / host case, default ports,
+  fragments, tracking parameters and query order do not matter),
+- search results are keyed by normalized topic,
+- entries expire after `ttl_seconds` (articles) or `search_ttl_seconds` (searches),
+- the least recently used entries are evicted once the stored JSON exceeds `max_bytes`,
+- rows are only read and decoded for the URLs / topic asked for, and returned as
+  plain dicts that the workflows validate into their models.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from phi.utils.log import logger
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMETERS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref", "ref_src", "cmpid"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TABLES = ("articles", "searches")
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL, the same for the links search engines and sites give for one article."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host if parts.port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{parts.port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMETERS
+    )
+    path = parts.path.rstrip("/") or "/"
+    # http and https serve the same article
+    return urlunsplit(("https" if scheme == "http" else scheme, netloc, path, urlencode(query), ""))
+
+
+def normalize_topic(topic: str) -> str:
+    """Topic key: width, case and whitespace normalized."""
+    return " ".join(unicodedata.normalize("NFKC", topic).casefold().split())
+
+
+class ArticleStore:
+    def __init__(
+        self,
+        path: str = "tmp/article_store.db",
+        ttl_seconds: float = 7 * 24 * 3600,
+        search_ttl_seconds: float = 6 * 3600,
+        max_bytes: int = 64 * 2**20,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = {"articles": ttl_seconds, "searches": search_ttl_seconds}
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        # Opened on first use, defining a workflow class does not touch the disk
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def __copy__(self):
+        # Shared by the copies of a workflow
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._connection is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._connection = sqlite3.connect(self.path, check_same_thread=False)
+                for table in TABLES:
+                    self._connection.execute(
+                        f"""CREATE TABLE IF NOT EXISTS {table} (
+                            key TEXT PRIMARY KEY,
+                            data TEXT NOT NULL,
+                            size INTEGER NOT NULL,
+                            created REAL NOT NULL,
+                            last_used REAL NOT NULL
+                        )"""
+                    )
+                    self._connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table} (last_used)")
+                self._connection.commit()
+            return self._connection
+
+    def _get(self, table: str, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT key, data FROM {table} WHERE key IN ({','.join('?' * len(keys))}) AND created >= ?",
+                (*keys, now - self.ttl_seconds[table]),
+            ).fetchall()
+            if rows:
+                self.connection.executemany(f"UPDATE {table} SET last_used = ? WHERE key = ?", [(now, key) for key, _ in rows])
+                self.connection.commit()
+        return {key: json.loads(data) for key, data in rows}
+
+    def _put(self, table: str, items: Dict[str, Dict[str, Any]]):
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            data = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+            rows.append((key, data, len(data.encode()), now, now))
+        with self._lock:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {table} (key, data, size, created, last_used) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._evict(now)
+            self.connection.commit()
+
+    def _evict(self, now: float):
+        """Delete the expired entries, then the least recently used ones beyond `max_bytes`."""
+        for table in TABLES:
+            self.connection.execute(f"DELETE FROM {table} WHERE created < ?", (now - self.ttl_seconds[table],))
+        total = sum(self.connection.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0] for table in TABLES)
+        if total <= self.max_bytes:
+            return
+        entries = self.connection.execute(
+            " UNION ALL ".join(f"SELECT '{table}', key, size, last_used FROM {table}" for table in TABLES) + " ORDER BY last_used"
+        ).fetchall()
+        evicted = 0
+        for table, key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            self.connection.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"Evicted {evicted} entries from the article store")
+
+    def get_articles(self, urls: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Fresh stored articles of the given URLs, by URL as given."""
+        keys = {normalize_url(url): url for url in urls}
+        return {keys[key]: article for key, article in self._get("articles", keys).items()}
+
+    def get_article(self, url: str) -> Optional[Dict[str, Any]]:
+        return self.get_articles([url]).get(url)
+
+    def put_articles(self, articles: Dict[str, Dict[str, Any]]):
+        """Store articles by URL, replacing older versions."""
+        self._put("articles", {normalize_url(url): article for url, article in articles.items()})
+
+    def put_article(self, url: str, article: Dict[str, Any]):
+        self.put_articles({url: article})
+
+    def get_search(self, topic: str) -> Optional[Dict[str, Any]]:
+        """Fresh stored search results of a topic."""
+        return self._get("searches", [normalize_topic(topic)]).get(normalize_topic(topic))
+
+    def put_search(self, topic: str, search_results: Dict[str, Any]):
+        self._put("searches", {normalize_topic(topic): search_results})
+
+    def clear(self):
+        with self._lock:
+            for table in TABLES:
+                self.connection.execute(f"DELETE FROM {table}")
+            self.connection.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = {}
+            for table in TABLES:
+                count, size = self.connection.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {table}").fetchone()
+                stats[table] = count
+                stats[f"{table}_bytes"] = size
+            return stats
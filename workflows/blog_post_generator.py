@@ -1,4 +1,3 @@
-import json
 from typing import Optional, Iterator
 
 from pydantic import BaseModel, Field
@@ -10,10 +9,11 @@ from phi.storage.workflow.sqlite import SqlWorkflowStorage
 from phi.tools.duckduckgo import DuckDuckGo
 from phi.utils.pprint import pprint_run_response
 from phi.utils.log import logger
-from dotenv import dotenv_values
 
-config = dotenv_values(".env")
-print(config["OPENROUTER_API_KEY"])
+from workflows.article_store import ArticleStore
+from workflows.report_store import ReportStore
+from workflows.writer_input import build_writer_input
+
 
 class NewsArticle(BaseModel):
     title: str = Field(..., description="Title of the article.")
@@ -49,6 +49,13 @@ class BlogPostGenerator(Workflow):
         markdown=True,
     )
 
+    # Search results, shared across sessions and with GenerateNewsReport
+    article_store: ArticleStore = ArticleStore()
+    # Blog posts by topic, kept out of the session state
+    report_store: ReportStore = ReportStore(namespace="blog_post")
+    # Tokens of articles sent to the writer, leaves room for the post in qwen2.5:7b's context
+    writer_token_budget: int = 3000
+
     def run(self, topic: str, use_cache: bool = True) -> Iterator[RunResponse]:
         """This is where the main logic of the workflow is implemented."""
 
@@ -62,7 +69,7 @@ class BlogPostGenerator(Workflow):
                 return
 
         # Step 2: Search the web for articles on the topic
-        search_results: Optional[SearchResults] = self.get_search_results(topic)
+        search_results: Optional[SearchResults] = self.get_search_results(topic, use_cache)
         # If no search_results are found for the topic, end the workflow
         if search_results is None or len(search_results.articles) == 0:
             yield RunResponse(
@@ -78,17 +85,29 @@ class BlogPostGenerator(Workflow):
         """Get the cached blog post for a topic."""
 
         logger.info("Checking if cached blog post exists")
-        return self.session_state.get("blog_posts", {}).get(topic)
+        # Sessions created before the report store still carry their posts, move them out
+        for cached_topic, blog_post in self.session_state.pop("blog_posts", {}).items():
+            self.report_store.put(cached_topic, blog_post)
+        return self.report_store.get(topic)
 
     def add_blog_post_to_cache(self, topic: str, blog_post: Optional[str]):
         """Add a blog post to the cache."""
 
         logger.info(f"Saving blog post for topic: {topic}")
-        self.session_state.setdefault("blog_posts", {})
-        self.session_state["blog_posts"][topic] = blog_post
+        self.report_store.put(topic, blog_post)
+
+    def get_search_results(self, topic: str, use_cache: bool = True) -> Optional[SearchResults]:
+        """Get the search results for a topic, from the article store when use_cache is True."""
 
-    def get_search_results(self, topic: str) -> Optional[SearchResults]:
-        """Get the search results for a topic."""
+        if use_cache:
+            try:
+                cached_search_results = self.article_store.get_search(topic)
+                if cached_search_results is not None:
+                    search_results = SearchResults.model_validate(cached_search_results)
+                    logger.info(f"Found {len(search_results.articles)} articles in cache")
+                    return search_results
+            except Exception as e:
+                logger.warning(f"Could not read search results from cache: {e}")
 
         MAX_ATTEMPTS = 3
 
@@ -107,6 +126,7 @@ class BlogPostGenerator(Workflow):
 
                 article_count = len(searcher_response.content.articles)
                 logger.info(f"Found {article_count} articles on attempt {attempt + 1}")
+                self.article_store.put_search(topic, searcher_response.content.model_dump())
                 return searcher_response.content
 
             except Exception as e:
@@ -119,10 +139,12 @@ class BlogPostGenerator(Workflow):
         """Write a blog post on a topic."""
 
         logger.info("Writing blog post")
-        # Prepare the input for the writer
-        writer_input = {"topic": topic, "articles": [v.model_dump() for v in search_results.articles]}
+        # Prepare the input for the writer: compact JSON, summaries trimmed to the token budget
+        writer_input = build_writer_input(
+            topic, [v.model_dump() for v in search_results.articles], token_budget=self.writer_token_budget
+        )
         # Run the writer and yield the response
-        yield from self.writer.run(json.dumps(writer_input, indent=4), stream=True)
+        yield from self.writer.run(writer_input, stream=True)
         # Save the blog post in the cache
         self.add_blog_post_to_cache(topic, self.writer.run_response.content)
 
@@ -1,6 +1,10 @@
-import json
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict
 from textwrap import dedent
-from typing import Optional, Dict, Iterator
+from typing import Optional, Dict, Iterator, List
 
 from pydantic import BaseModel, Field
 
@@ -12,10 +16,11 @@ from phi.tools.duckduckgo import DuckDuckGo
 from phi.tools.newspaper4k import Newspaper4k
 from phi.utils.pprint import pprint_run_response
 from phi.utils.log import logger
-from dotenv import dotenv_values
 
-config = dotenv_values(".env")
-print(config["OPENROUTER_API_KEY"])
+from workflows.article_extraction import extract_article
+from workflows.article_store import ArticleStore
+from workflows.report_store import ReportStore
+from workflows.writer_input import build_writer_input
 
 
 class NewsArticle(BaseModel):
@@ -61,6 +66,17 @@ class GenerateNewsReport(Workflow):
         ],
         response_model=ScrapedArticle,
     )
+    # Articles scraped in parallel, and the seconds a single scrape may take
+    max_scrape_workers: int = 5
+    scrape_timeout: float = 60.0
+    # Extract articles from their HTML without a model, the scraper agent is only a fallback
+    direct_extraction: bool = True
+    # Scraped articles and search results, shared across sessions and with BlogPostGenerator
+    article_store: ArticleStore = ArticleStore()
+    # Generated reports by topic, kept out of the session state
+    report_store: ReportStore = ReportStore(namespace="news_report")
+    # Tokens of articles sent to the writer, leaves room for the report in qwen2.5:7b's context
+    writer_token_budget: int = 3000
 
     writer: Agent = Agent(
         model=Ollama(id="qwen2.5:7b"),
@@ -131,36 +147,43 @@ class GenerateNewsReport(Workflow):
             - Otherwise, perform a new web search.
         3. Scrape the content of each article:
             - Use cached scraped articles if available and use_scrape_cache is True.
-            - Scrape new articles that aren't in the cache.
-        4. Generate the final report using the scraped article contents.
+            - Scrape new articles that aren't in the cache in parallel, skipping the ones that fail or time out.
+            - Extract the articles from their HTML, with the article_scraper agent as a fallback.
+        4. Generate the final report using the scraped article contents, trimmed to writer_token_budget tokens.
 
-        The function utilizes the `session_state` to store and retrieve cached data.
+        Search results and scraped articles are cached in the `article_store`, reports in
+        the `report_store`, both shared by every session.
         """
         logger.info(f"Generating a report on: {topic}")
 
+        # Sessions created before the stores were added still carry their caches, move the reports out
+        for cached_report in self.session_state.pop("reports", []):
+            self.report_store.put(cached_report["topic"], cached_report["report"])
+        self.session_state.pop("search_results", None)
+        self.session_state.pop("scraped_articles", None)
+
         # Use the cached report if use_cached_report is True
-        if use_cached_report and "reports" in self.session_state:
+        if use_cached_report:
             logger.info("Checking if cached report exists")
-            for cached_report in self.session_state["reports"]:
-                if cached_report["topic"] == topic:
-                    yield RunResponse(
-                        run_id=self.run_id,
-                        event=RunEvent.workflow_completed,
-                        content=cached_report["report"],
-                    )
-                    return
+            cached_report = self.report_store.get(topic)
+            if cached_report:
+                yield RunResponse(
+                    run_id=self.run_id,
+                    event=RunEvent.workflow_completed,
+                    content=cached_report,
+                )
+                return
 
         ####################################################
         # Step 1: Search the web for articles on the topic
         ####################################################
 
-        # 1.1: Get cached search_results from the session state if use_search_cache is True
+        # 1.1: Get cached search_results from the article store if use_search_cache is True
         search_results: Optional[SearchResults] = None
         try:
-            if use_search_cache and "search_results" in self.session_state:
-                search_results = SearchResults.model_validate(
-                    self.session_state["search_results"]
-                )
+            cached_search_results = self.article_store.get_search(topic) if use_search_cache else None
+            if cached_search_results is not None:
+                search_results = SearchResults.model_validate(cached_search_results)
                 logger.info(f"Found {len(search_results.articles)} articles in cache.")
         except Exception as e:
             logger.warning(f"Could not read search results from cache: {e}")
@@ -177,8 +200,8 @@ class GenerateNewsReport(Workflow):
                     f"WebSearcher identified {len(web_searcher_response.content.articles)} articles."
                 )
                 search_results = web_searcher_response.content
-                # Save the search_results in the session state
-                self.session_state["search_results"] = search_results.model_dump()
+                # Save the search_results in the article store
+                self.article_store.put_search(topic, search_results.model_dump())
 
         # 1.3: If no search_results are found for the topic, end the workflow
         if search_results is None or len(search_results.articles) == 0:
@@ -193,89 +216,162 @@ class GenerateNewsReport(Workflow):
         # Step 2: Scrape each article
         ####################################################
 
-        # 2.1: Get cached scraped_articles from the session state if use_scrape_cache is True
+        # 2.1: Get the cached scraped_articles of the search results if use_scrape_cache is True
         scraped_articles: Dict[str, ScrapedArticle] = {}
-        if (
-            use_scrape_cache
-            and "scraped_articles" in self.session_state
-            and isinstance(self.session_state["scraped_articles"], dict)
-        ):
-            for url, scraped_article in self.session_state["scraped_articles"].items():
+        if use_scrape_cache:
+            cached_articles = self.article_store.get_articles(article.url for article in search_results.articles)
+            for url, scraped_article in cached_articles.items():
                 try:
-                    validated_scraped_article = ScrapedArticle.model_validate(
-                        scraped_article
-                    )
-                    scraped_articles[validated_scraped_article.url] = (
-                        validated_scraped_article
-                    )
+                    scraped_articles[url] = ScrapedArticle.model_validate(scraped_article)
                 except Exception as e:
                     logger.warning(f"Could not read scraped article from cache: {e}")
             logger.info(f"Found {len(scraped_articles)} scraped articles in cache.")
 
-        # 2.2: Scrape the articles that are not in the cache
+        # 2.2: Scrape the articles that are not in the cache, in parallel
+        urls: List[str] = []
         for article in search_results.articles:
             if article.url in scraped_articles:
                 logger.info(f"Found scraped article in cache: {article.url}")
-                continue
+            elif article.url not in urls:
+                urls.append(article.url)
+        scraped = self.scrape_articles(urls)
 
-            article_scraper_response: RunResponse = self.article_scraper.run(
-                article.url
-            )
-            if (
-                article_scraper_response
-                and article_scraper_response.content
-                and isinstance(article_scraper_response.content, ScrapedArticle)
-            ):
-                scraped_articles[article_scraper_response.content.url] = (
-                    article_scraper_response.content
-                )
-                logger.info(f"Scraped article: {article_scraper_response.content.url}")
-
-        # 2.3: Save the scraped_articles in the session state
-        self.session_state["scraped_articles"] = {
-            k: v.model_dump() if hasattr(v, "model_dump") else v
-            for k, v in scraped_articles.items()
-        }
+        # 2.3: Save the newly scraped_articles in the article store
+        self.article_store.put_articles({url: article.model_dump() for url, article in scraped.items()})
+        scraped_articles.update(scraped)
 
         ####################################################
         # Step 3: Write a report
         ####################################################
 
-        # 3.1: Generate the final report
+        # 3.1: Generate the final report from the articles, in search ranking order and within the token budget
         logger.info("Generating final report")
-        writer_input = {
-            "topic": topic,
-            "articles": [
-                v.model_dump() if hasattr(v, "model_dump") else v
-                for v in scraped_articles.values()
+        writer_input = build_writer_input(
+            topic,
+            [
+                scraped_articles[url].model_dump()
+                for url in dict.fromkeys(article.url for article in search_results.articles)
+                if url in scraped_articles
             ],
-        }
-        yield from self.writer.run(json.dumps(writer_input, indent=4), stream=True)
-
-        # 3.2: Save the writer_response in the session state
-        if "reports" not in self.session_state:
-            self.session_state["reports"] = []
-        self.session_state["reports"].append(
-            {"topic": topic, "report": self.writer.run_response.content}
+            token_budget=self.writer_token_budget,
+        )
+        yield from self.writer.run(writer_input, stream=True)
+
+        # 3.2: Save the writer_response in the report store
+        self.report_store.put(topic, self.writer.run_response.content)
+
+    def scrape_article(self, url: str) -> Optional[ScrapedArticle]:
+        """Extract one article directly, or with its own copy of the scraper, agents keep per-run state."""
+        if self.direct_extraction:
+            extracted = extract_article(url, timeout=self.scrape_timeout / 2)
+            if extracted is not None:
+                return ScrapedArticle(**asdict(extracted))
+            logger.info(f"Direct extraction failed, scraping {url} with the scraper agent")
+        article_scraper = self.article_scraper.deep_copy()
+        # Bound every model request, the tool call and the answer take two of them
+        article_scraper.model.timeout = self.scrape_timeout / 2
+        article_scraper_response: RunResponse = article_scraper.run(url)
+        if (
+            article_scraper_response
+            and article_scraper_response.content
+            and isinstance(article_scraper_response.content, ScrapedArticle)
+        ):
+            return article_scraper_response.content
+        return None
+
+    def scrape_articles(self, urls: List[str]) -> Dict[str, ScrapedArticle]:
+        """Scrape the urls with at most `max_scrape_workers` scrapes in flight, returns the articles by url.
+
+        A scrape running for more than `scrape_timeout` seconds is abandoned, and so is
+        every scrape still pending once the whole batch has had its share of time, so
+        the articles scraped in time are returned even when some sites hang or fail.
+
+        Abandoning a scrape does not stop it: its thread keeps running until the download
+        or model request returns, and the interpreter waits for it at exit. The direct
+        extraction and each request of the scraper agent's model are given a timeout
+        derived from `scrape_timeout` to bound that wait.
+        """
+        scraped_articles: Dict[str, ScrapedArticle] = {}
+        if not urls:
+            return scraped_articles
+
+        workers = max(1, min(self.max_scrape_workers, len(urls)))
+        start = time.perf_counter()
+        batch_deadline = start + self.scrape_timeout * math.ceil(len(urls) / workers)
+        started: Dict[str, float] = {}
+        lock = threading.Lock()
+
+        def scrape(url: str) -> Optional[ScrapedArticle]:
+            with lock:
+                started[url] = time.perf_counter()
+            return self.scrape_article(url)
+
+        def elapsed(url: str) -> float:
+            return time.perf_counter() - started.get(url, time.perf_counter())
+
+        # Not a context manager: exiting it would wait for the abandoned scrapes
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="article-scraper")
+        futures = {executor.submit(scrape, url): url for url in urls}
+        pending = set(futures)
+        try:
+            while pending:
+                now = time.perf_counter()
+                with lock:
+                    deadlines = [started[futures[f]] + self.scrape_timeout for f in pending if futures[f] in started]
+                # Wake up at the next deadline, or soon to notice scrapes that just started
+                timeout = max(0.0, min(deadlines + [batch_deadline, now + 1.0]) - now)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = futures[future]
+                    try:
+                        scraped_article = future.result()
+                    except Exception as e:
+                        logger.warning(f"Could not scrape {url} ({elapsed(url):.1f}s): {e}")
+                        continue
+                    if scraped_article is None:
+                        logger.warning(f"No article scraped from {url} ({elapsed(url):.1f}s)")
+                        continue
+                    scraped_articles[url] = scraped_article
+                    logger.info(f"Scraped article in {elapsed(url):.1f}s: {url}")
+
+                now = time.perf_counter()
+                with lock:
+                    expired = {
+                        f
+                        for f in pending
+                        if now >= batch_deadline or (futures[f] in started and now - started[futures[f]] > self.scrape_timeout)
+                    }
+                for future in expired:
+                    future.cancel()
+                    logger.warning(f"Gave up scraping {futures[future]} after {elapsed(futures[future]):.1f}s")
+                pending -= expired
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        logger.info(
+            f"Scraped {len(scraped_articles)}/{len(urls)} articles in {time.perf_counter() - start:.1f}s "
+            f"with {workers} workers"
         )
+        return scraped_articles
 
 
-# The topic to generate a report on
-topic = "Introducing the Model Context Protocol"
+if __name__ == "__main__":
+    # The topic to generate a report on
+    topic = "Introducing the Model Context Protocol"
 
-# Instantiate the workflow
-generate_news_report = GenerateNewsReport(
-    session_id=f"generate-report-on-{topic}",
-    storage=SqlWorkflowStorage(
-        table_name="generate_news_report_workflows",
-        db_file="tmp/workflows.db",
-    ),
-)
+    # Instantiate the workflow
+    generate_news_report = GenerateNewsReport(
+        session_id=f"generate-report-on-{topic}",
+        storage=SqlWorkflowStorage(
+            table_name="generate_news_report_workflows",
+            db_file="tmp/workflows.db",
+        ),
+    )
 
-# Run workflow
-report_stream: Iterator[RunResponse] = generate_news_report.run(
-    topic=topic, use_search_cache=True, use_scrape_cache=True, use_cached_report=False
-)
+    # Run workflow
+    report_stream: Iterator[RunResponse] = generate_news_report.run(
+        topic=topic, use_search_cache=True, use_scrape_cache=True, use_cached_report=False
+    )
 
-# Print the response
-pprint_run_response(report_stream, markdown=True)
+    # Print the response
+    pprint_run_response(report_stream, markdown=True)
@@ -0,0 +1,148 @@
+"""
+Report and blog post cache of the news workflows.
+
+`GenerateNewsReport` appended every report to `session_state["reports"]` and scanned
+the list for a cached one, `BlogPostGenerator` kept every post in
+`session_state["blog_posts"]`, and the whole session state is written back to
+tmp/workflows.db after every run, so each run stored the full history again.
+
+`ReportStore` keeps them in their own SQLite table instead: one row per normalized
+topic and namespace ("news_report", "blog_post"), looked up by primary key, with the
+least recently used rows evicted beyond `max_entries` or `max_bytes` per namespace.
+A run writes its own report only.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from phi.utils.log import logger
+
+from workflows.article_store import normalize_topic
+
+
+class ReportStore:
+    def __init__(
+        self,
+        namespace: str,
+        path: str = "tmp/report_store.db",
+        max_entries: int = 200,
+        max_bytes: int = 16 * 2**20,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.namespace = namespace
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Reports do not expire by default, news reports can be given a TTL
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        # Opened on first use, defining a workflow class does not touch the disk
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def __copy__(self):
+        # Shared by the copies of a workflow
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._connection is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._connection = sqlite3.connect(self.path, check_same_thread=False)
+                self._connection.execute(
+                    """CREATE TABLE IF NOT EXISTS reports (
+                        namespace TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        topic TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created REAL NOT NULL,
+                        last_used REAL NOT NULL,
+                        PRIMARY KEY (namespace, key)
+                    )"""
+                )
+                self._connection.execute("CREATE INDEX IF NOT EXISTS reports_last_used ON reports (namespace, last_used)")
+                self._connection.commit()
+            return self._connection
+
+    def get(self, topic: str) -> Optional[str]:
+        """Cached report of a topic, if any (and not expired)."""
+        key = normalize_topic(topic)
+        now = time.time()
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT content, created FROM reports WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            content, created = row
+            if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                self.connection.execute("DELETE FROM reports WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self.connection.commit()
+                return None
+            self.connection.execute(
+                "UPDATE reports SET last_used = ? WHERE namespace = ? AND key = ?", (now, self.namespace, key)
+            )
+            self.connection.commit()
+            return content
+
+    def put(self, topic: str, content: Optional[str]):
+        """Cache the report of a topic, replacing the previous one."""
+        if not content:
+            return
+        now = time.time()
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO reports (namespace, key, topic, content, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, normalize_topic(topic), topic, content, len(content.encode()), now, now),
+            )
+            self._evict()
+            self.connection.commit()
+
+    def _evict(self):
+        """Delete the least recently used reports beyond `max_entries` or `max_bytes`."""
+        count, total = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        evicted = []
+        # Newest report last, it is never evicted
+        rows = self.connection.execute(
+            "SELECT key, size FROM reports WHERE namespace = ? ORDER BY last_used, created LIMIT ?",
+            (self.namespace, count - 1),
+        )
+        for key, size in rows.fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            evicted.append((self.namespace, key))
+            count -= 1
+            total -= size
+        self.connection.executemany("DELETE FROM reports WHERE namespace = ? AND key = ?", evicted)
+        logger.info(f"Evicted {len(evicted)} {self.namespace} entries from the report store")
+
+    def delete(self, topic: str):
+        with self._lock:
+            self.connection.execute(
+                "DELETE FROM reports WHERE namespace = ? AND key = ?", (self.namespace, normalize_topic(topic))
+            )
+            self.connection.commit()
+
+    def clear(self):
+        with self._lock:
+            self.connection.execute("DELETE FROM reports WHERE namespace = ?", (self.namespace,))
+            self.connection.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count, size = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+            return {"entries": count, "bytes": size}
@@ -0,0 +1,196 @@
+"""
+Token-budgeted writer input for the news workflows.
+
+`GenerateNewsReport` and `BlogPostGenerator` sent `json.dumps(writer_input, indent=4)`
+of every full article to the writer: the indentation alone costs tokens, and a few
+long articles push qwen2.5:7b past its context window, where Ollama silently drops
+the start of the prompt. `build_writer_input(topic, articles, token_budget)`:
+
+1. strips boilerplate lines left in the articles (subscribe / cookie / share
+   prompts, copyright lines, image and link-only lines, repeated lines),
+2. shares the budget between the articles: short articles are kept whole and the
+   rest of the budget is split evenly between the long ones,
+3. trims the long articles extractively: the sentences sharing the most words with
+   the topic, with a bonus for the lead of the article and of each paragraph, are
+   kept in their original order, with the headings of their sections,
+4. serializes the input as compact JSON, without escaping non-ASCII characters.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from phi.utils.log import logger
+
+# Kana, kanji and full-width forms: about one token per character
+_CJK = re.compile(r"[　-ヿ㐀-䶿一-鿿豈-﫿＀-￯]")
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s+(?=\S)|(?<=[。！？])(?=\S)")
+_HEADING = re.compile(r"#{1,6}\s")
+BOILERPLATE = re.compile(
+    r"^(?:advertisement|sponsored|subscribe|sign up|log ?in|share (?:on|this)|follow us|read more|click here"
+    r"|related (?:articles|stories)|recommended|we use cookies|accept (?:all )?cookies|all rights reserved"
+    r"|©|copyright|image:|photo:|getty images)",
+    re.IGNORECASE,
+)
+_MARKDOWN_LINK = re.compile(r"!?\[([^\[\]]*)\]\([^)]*\)")
+# Words that say nothing about the topic
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it", "of", "on", "or",
+    "that", "the", "this", "to", "was", "what", "when", "where", "which", "who", "why", "will", "with",
+}  # fmt: skip
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count of a text, with tiktoken's o200k_base when installed."""
+    try:
+        import tiktoken
+    except ImportError:
+        cjk = len(_CJK.findall(text))
+        return cjk + (len(text) - cjk + 3) // 4
+    return len(tiktoken.get_encoding("o200k_base").encode(text, disallowed_special=()))
+
+
+def compact_json(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _sub_links(text: str, replacement: str) -> str:
+    # Innermost links first, an image link [![alt](src)](href) takes two passes
+    while True:
+        replaced = _MARKDOWN_LINK.sub(replacement, text)
+        if replaced == text:
+            return text
+        text = replaced
+
+
+def strip_boilerplate(text: Optional[str]) -> str:
+    """Text without boilerplate, image / link-only and repeated lines."""
+    lines, seen = [], set()
+    for line in (text or "").splitlines():
+        stripped = line.strip()
+        plain = _sub_links(stripped, r"\1").strip(" -*>|")
+        link_only = _MARKDOWN_LINK.search(stripped) and not _sub_links(stripped, "").strip(" -*|")
+        if stripped and (BOILERPLATE.match(plain) or link_only):
+            continue
+        # Repeated sentences (pull quotes, page furniture), not short lines like table separators
+        if len(plain) >= 20 and plain in seen:
+            continue
+        seen.add(plain)
+        lines.append(line.rstrip())
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def terms(text: str) -> Set[str]:
+    return {word for word in _WORD.findall(text.lower()) if word not in STOPWORDS}
+
+
+def _units(text: str) -> List[Tuple[int, int, str]]:
+    """(section, paragraph, text) of the headings and sentences of a text, in order."""
+    units = []
+    section = 0
+    for paragraph, block in enumerate(re.split(r"\n\s*\n", text)):
+        block = block.strip()
+        if not block:
+            continue
+        if _HEADING.match(block) and "\n" not in block:
+            section += 1
+            units.append((section, -1, block))
+            continue
+        # List items and table rows are kept as units, paragraphs are split into sentences
+        for line in block.splitlines():
+            pieces = [line] if re.match(r"\s*(?:[-*|>]|\d+\.)\s", line) else _SENTENCE_END.split(line)
+            units.extend((section, paragraph, piece.strip()) for piece in pieces if piece.strip())
+    return units
+
+
+def trim_to_tokens(text: str, budget: int, topic: str = "", count_tokens=estimate_tokens) -> str:
+    """The most relevant sentences of a text that fit in `budget` tokens, in their original order."""
+    if count_tokens(text) <= budget:
+        return text
+    units = _units(text)
+    topic_terms = terms(topic)
+    sentences = [i for i, (_, paragraph, _) in enumerate(units) if paragraph >= 0]
+    positions = {i: position for position, i in enumerate(sentences)}
+    leads = {units[i][1]: i for i in reversed(sentences)}
+
+    def score(i: int) -> float:
+        _, paragraph, sentence = units[i]
+        overlap = len(topic_terms & terms(sentence)) / len(topic_terms) if topic_terms else 0.0
+        lead = 1.0 if i == sentences[0] else 0.3 if leads.get(paragraph) == i else 0.0
+        return overlap + lead + 0.2 / (1 + positions[i] / 10)
+
+    selected: Set[int] = set()
+    headings: Dict[int, int] = {section: i for i, (section, paragraph, _) in enumerate(units) if paragraph < 0}
+    used = 0
+    for i in sorted(sentences, key=score, reverse=True):
+        section = units[i][0]
+        cost = count_tokens(units[i][2]) + 1
+        # The heading of a section comes with its first selected sentence
+        heading = headings.get(section)
+        if heading is not None and heading not in selected:
+            cost += count_tokens(units[heading][2]) + 2
+        if used + cost > budget:
+            continue
+        selected.add(i)
+        if heading is not None:
+            selected.add(heading)
+        used += cost
+
+    parts: List[str] = []
+    previous: Optional[Tuple[int, int]] = None
+    for i in sorted(selected):
+        section, paragraph, unit = units[i]
+        if previous is None:
+            parts.append(unit)
+        elif (section, paragraph) == previous and paragraph >= 0:
+            parts.append(("\n" if re.match(r"\s*(?:[-*|>]|\d+\.)\s", unit) else " ") + unit)
+        else:
+            parts.append("\n\n" + unit)
+        previous = (section, paragraph)
+    return "".join(parts)
+
+
+def build_writer_input(
+    topic: str,
+    articles: List[Dict[str, Any]],
+    token_budget: int = 3000,
+    content_keys: Tuple[str, ...] = ("content", "summary"),
+    count_tokens=estimate_tokens,
+) -> str:
+    """Compact JSON writer input of a topic and its articles, within `token_budget` tokens.
+
+    The `content_keys` of the articles are cleaned and trimmed, the other fields (title,
+    url, ...) are kept as they are. Articles are expected best first: when even their
+    other fields do not fit, the last ones are left out.
+    """
+    tokens_before = count_tokens(json.dumps({"topic": topic, "articles": articles}, indent=4))
+    articles = [
+        {key: strip_boilerplate(value) if key in content_keys and isinstance(value, str) else value for key, value in article.items()}
+        for article in articles
+    ]
+
+    def skeleton(kept: List[Dict[str, Any]]) -> int:
+        return count_tokens(compact_json({"topic": topic, "articles": [{k: v for k, v in a.items() if k not in content_keys} for a in kept]}))
+
+    while len(articles) > 1 and skeleton(articles) > token_budget:
+        articles = articles[:-1]
+    budget = token_budget - skeleton(articles) - 4 * len(content_keys) * len(articles)
+
+    # Short fields are kept whole, the rest of the budget is split evenly between the long ones
+    fields = sorted(
+        (count_tokens(article[key]), i, key)
+        for i, article in enumerate(articles)
+        for key in content_keys
+        if isinstance(article.get(key), str) and article[key]
+    )
+    for n, (size, i, key) in enumerate(fields):
+        share = max(budget // (len(fields) - n), 0)
+        if size > share:
+            articles[i][key] = trim_to_tokens(articles[i][key], share, topic, count_tokens)
+            size = count_tokens(articles[i][key])
+        budget -= size
+
+    writer_input = compact_json({"topic": topic, "articles": articles})
+    logger.info(f"Writer input: {tokens_before} -> {count_tokens(writer_input)} tokens, {len(articles)} articles")
+    return writer_input